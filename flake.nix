@@ -20,6 +20,7 @@
                 python-pkgs.flake8
                 python-pkgs.flake8-docstrings
                 python-pkgs.mypy
+                python-pkgs.numpy
                 python-pkgs.pytest
                 python-pkgs.sympy
               ]))
@@ -25,7 +25,7 @@ let
     buildInputs = [ librsvg ];
     buildPhase = ''
       python3 "$src/scripts/recolor.py" "$src/wallpapers/${name}.svg" \
-        ${paletteArgs} > ${name}.svg
+        ${paletteArgs} -o ${name}.svg
       rsvg-convert -a -w ${toString width} ${name}.svg -o ${name}.png
     '';
 
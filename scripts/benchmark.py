@@ -0,0 +1,249 @@
+"""Script to benchmark the wallpaper generation pipeline."""
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from functools import partial
+import argparse
+import json
+import pathlib
+import random
+import re
+import sys
+import timeit
+
+from lib.gosper import gosper_island
+from lib.grid import generate_grid
+from lib.koch import koch_island
+from lib.minkowski import minkowski_island
+from lib.svg import generate_svg
+from recolor import extract_palette, replace_palette
+import hexagons
+
+SCRIPTS_DIR = pathlib.Path(__file__).resolve().parent
+WALLPAPERS_DIR = SCRIPTS_DIR.parent / "wallpapers"
+DEFAULT_BASELINE = SCRIPTS_DIR.parent / ".benchmark-baseline.json"
+
+# Iteration counts of islands per backend
+ISLAND_ITERATIONS = {"sympy": (1, 2), "numpy": (2, 4, 6)}
+
+# Grid resolutions, all divisible by the hexagon grid spacings
+RESOLUTIONS = [(480, 270), (960, 540), (1920, 1080)]
+
+
+@dataclass(kw_only=True)
+class Benchmark:
+    """A named benchmark of a pipeline stage.
+
+    Function `setup` prepares the inputs of the stage outside of the timing
+    and returns a callable that runs the stage once.
+    """
+
+    name: str
+    setup: Callable[[], Callable[[], object]]
+
+    def run(self, repeat: int = 5) -> float:
+        """Return the best time in seconds of a single run of the stage.
+
+        The stage is run repeatedly in batches of automatically determined
+        size lasting at least 0.2 s, and the fastest batch is taken.
+        """
+        timer = timeit.Timer(self.setup())
+        number, _ = timer.autorange()
+        return min(timer.repeat(repeat, number)) / number
+
+
+def main() -> None:  # noqa: D103
+    args = parse_arguments()
+    benchmarks = [
+        benchmark
+        for benchmark in make_benchmarks()
+        if re.search(args.filter, benchmark.name)
+    ]
+    results = {}
+    for benchmark in benchmarks:
+        results[benchmark.name] = benchmark.run(args.repeat)
+        print(
+            format_result(
+                benchmark.name,
+                results[benchmark.name],
+                args.baseline_data.get(benchmark.name),
+            )
+        )
+    if args.save:
+        args.baseline.write_text(
+            json.dumps(args.baseline_data | results, indent=2, sort_keys=True)
+        )
+        return
+    regressions = find_regressions(results, args.baseline_data, args.threshold)
+    if regressions:
+        sys.exit(f"regressed beyond threshold: {' '.join(regressions)}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Time the stages of the wallpaper generation pipeline and compare "
+            "them to baseline results."
+        )
+    )
+    parser.add_argument(
+        "-k",
+        "--filter",
+        metavar="PATTERN",
+        default="",
+        help="only run benchmarks whose names match this regular expression",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        type=int,
+        default=5,
+        help="number of timed batches per benchmark (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--baseline",
+        metavar="BASELINE_FILE",
+        default=DEFAULT_BASELINE,
+        help="JSON file of baseline results (default: %(default)s)",
+        type=pathlib.Path,
+    )
+    parser.add_argument(
+        "--save",
+        action="store_true",
+        help="save the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--threshold",
+        metavar="FRACTION",
+        type=float,
+        default=0.25,
+        help=(
+            "fail if a benchmark is slower than its baseline by more than "
+            "this fraction (default: %(default)s)"
+        ),
+    )
+    args = parser.parse_args()
+    try:
+        args.baseline_data = json.loads(args.baseline.read_text())
+    except FileNotFoundError:
+        args.baseline_data = {}
+    return args
+
+
+def make_benchmarks() -> list[Benchmark]:
+    """Return the benchmarks of all pipeline stages at several sizes."""
+    benchmarks = []
+    for island_fn in (koch_island, gosper_island, minkowski_island):
+        for backend, iterations in ISLAND_ITERATIONS.items():
+            for n in iterations:
+                benchmarks.append(
+                    Benchmark(
+                        name=f"{island_fn.__name__}[{backend},{n}]",
+                        setup=partial(_island_stage, island_fn, n, backend),
+                    )
+                )
+    for backend in ("sympy", "numpy"):
+        for resolution in RESOLUTIONS:
+            size = "x".join(map(str, resolution))
+            benchmarks.append(
+                Benchmark(
+                    name=f"generate_grid[{backend},{size}]",
+                    setup=partial(_grid_stage, backend, resolution),
+                )
+            )
+        benchmarks.append(
+            Benchmark(
+                name=f"SVGPath.__str__[{backend}]",
+                setup=partial(_path_str_stage, backend),
+            )
+        )
+        benchmarks.append(
+            Benchmark(
+                name=f"generate_svg[{backend}]",
+                setup=partial(_generate_svg_stage, backend),
+            )
+        )
+    for path in sorted(WALLPAPERS_DIR.glob("*.svg")):
+        benchmarks.append(
+            Benchmark(
+                name=f"replace_palette[{path.stem}]",
+                setup=partial(_replace_palette_stage, path),
+            )
+        )
+    return benchmarks
+
+
+def format_result(name: str, seconds: float, baseline: float | None) -> str:
+    """Return a line reporting a benchmark result and its baseline."""
+    line = f"{name:<40} {seconds * 1000:>10.3f} ms"
+    if baseline is not None:
+        line += f" {seconds / baseline:>8.2f}x baseline"
+    return line
+
+
+def find_regressions(
+    results: dict[str, float], baseline: dict[str, float], threshold: float
+) -> list[str]:
+    """Return the names of results slower than baseline beyond `threshold`.
+
+    The `threshold` is the tolerated slowdown as a fraction of the baseline.
+    Results without a baseline never count as regressions.
+    """
+    return [
+        name
+        for name, seconds in results.items()
+        if name in baseline and seconds > baseline[name] * (1 + threshold)
+    ]
+
+
+def _island_stage(
+    island_fn: Callable, iterations: int, backend: str
+) -> Callable[[], object]:
+    return lambda: island_fn(iterations, backend=backend)
+
+
+def _hexagon_grid(backend: str, resolution: tuple[int, int]) -> list:
+    # Generate the seeded grid of the hexagons wallpaper at any resolution
+    random.seed(1)
+    return generate_grid(
+        element_paths=hexagons.make_element_paths(backend),
+        spacings=hexagons.SPACINGS,
+        offsets_fn=hexagons.offsets_fn,
+        resolution=resolution,
+        element_style_fn=hexagons.element_style_fn,
+    )
+
+
+def _grid_stage(
+    backend: str, resolution: tuple[int, int]
+) -> Callable[[], object]:
+    return lambda: _hexagon_grid(backend, resolution)
+
+
+def _path_str_stage(backend: str) -> Callable[[], object]:
+    paths = _hexagon_grid(backend, RESOLUTIONS[-1])
+    return lambda: [str(path) for path in paths]
+
+
+def _generate_svg_stage(backend: str) -> Callable[[], object]:
+    paths = _hexagon_grid(backend, RESOLUTIONS[-1])
+    return lambda: generate_svg(
+        author="benchmark",
+        title="benchmark",
+        palette=hexagons.PALETTE,
+        background_color=hexagons.PALETTE[0],
+        paths=paths,
+        resolution=RESOLUTIONS[-1],
+    )
+
+
+def _replace_palette_stage(path: pathlib.Path) -> Callable[[], object]:
+    svg = path.read_text()
+    old = extract_palette(svg)
+    new = list(reversed(old))
+    return lambda: replace_palette(svg, old, new)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""Script to build all wallpapers in parallel, skipping up-to-date ones."""
+
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+import argparse
+import ast
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = pathlib.Path(__file__).resolve().parent
+DEFAULT_OUTPUT_DIR = SCRIPTS_DIR.parent / "wallpapers"
+
+# Build manifest kept in the output directory
+MANIFEST_NAME = ".build-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def main() -> None:  # noqa: D103
+    args, generator_args = parse_arguments()
+    generators = discover_generators(SCRIPTS_DIR)
+    if args.wallpapers:
+        unknown = set(args.wallpapers) - set(generators)
+        if unknown:
+            sys.exit(f"unknown wallpapers: {' '.join(sorted(unknown))}")
+        generators = {name: generators[name] for name in args.wallpapers}
+    targets = [
+        make_target(name, script, args.output_dir, generator_args, args.png)
+        for name, script in generators.items()
+    ]
+    results = build(
+        targets, args.output_dir, force=args.force, max_workers=args.jobs
+    )
+    failed = [name for name, success in results.items() if not success]
+    if failed:
+        sys.exit(f"failed to build: {' '.join(failed)}")
+
+
+def parse_arguments() -> tuple[argparse.Namespace, list[str]]:
+    """Parse command-line arguments.
+
+    Arguments following a `--` separator are returned separately to be passed
+    on to each generator script.
+    """
+    parser = argparse.ArgumentParser(
+        description=(
+            "Build wallpapers by running the generator scripts in parallel. "
+            "Arguments following a -- separator (e.g. -- --backend numpy) "
+            "are passed on to the generators."
+        )
+    )
+    parser.add_argument(
+        "wallpapers",
+        metavar="WALLPAPER",
+        nargs="*",
+        help="name of a wallpaper to build (default: all of them)",
+    )
+    parser.add_argument(
+        "-d",
+        "--output-dir",
+        default=DEFAULT_OUTPUT_DIR,
+        help="output directory (default: the wallpapers directory)",
+        type=pathlib.Path,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="number of generators run concurrently (default: CPU count)",
+    )
+    parser.add_argument(
+        "--png",
+        action="store_true",
+        help="also rasterize each wallpaper into a PNG file",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rebuild wallpapers even if they are up to date",
+    )
+    argv = sys.argv[1:]
+    generator_args = []
+    if "--" in argv:
+        separator = argv.index("--")
+        generator_args = argv[separator:][1:]
+        argv = argv[:separator]
+    return parser.parse_args(argv), generator_args
+
+
+@dataclass(kw_only=True)
+class Target:
+    """A wallpaper to be built by running a generator script."""
+
+    name: str
+    script: pathlib.Path
+    arguments: list[str]
+    outputs: dict[str, pathlib.Path]
+    digest: str
+
+    def command(self, outputs: dict[str, pathlib.Path]) -> list[str]:
+        """Return the command line writing to given `outputs`.
+
+        The `outputs` map command-line options to output file paths.
+        """
+        output_args = [str(a) for item in outputs.items() for a in item]
+        return [
+            sys.executable,
+            str(self.script),
+            *output_args,
+            *self.arguments,
+        ]
+
+
+def discover_generators(directory: pathlib.Path) -> dict[str, pathlib.Path]:
+    """Return the generator scripts of a directory keyed by wallpaper name.
+
+    Generator scripts are recognized by their use of the shared command-line
+    interface of `lib.cli`.
+    """
+    return {
+        path.stem: path
+        for path in sorted(directory.glob("*.py"))
+        if "lib.cli" in _imported_modules(path)
+    }
+
+
+def dependencies(script: pathlib.Path) -> list[pathlib.Path]:
+    """Return the script and all `lib` modules it depends on transitively."""
+    seen: set[pathlib.Path] = set()
+    pending = [script]
+    while pending:
+        path = pending.pop()
+        if path in seen:
+            continue
+        seen.add(path)
+        for module in _imported_modules(path):
+            if path.parent.name == "lib" and module.startswith("."):
+                dependency = path.parent / f"{module[1:]}.py"
+            elif module.startswith("lib."):
+                dependency = script.parent / "lib" / f"{module[4:]}.py"
+            else:
+                continue
+            if dependency.exists():
+                pending.append(dependency)
+    return sorted(seen)
+
+
+@functools.cache
+def _imported_modules(path: pathlib.Path) -> frozenset[str]:
+    # Return the names of modules imported by a Python file, with leading dots
+    # for relative imports
+    modules: set[str] = set()
+    for node in ast.walk(ast.parse(path.read_bytes(), filename=str(path))):
+        if isinstance(node, ast.Import):
+            modules.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            modules.add("." * node.level + (node.module or ""))
+    return frozenset(modules)
+
+
+def make_target(
+    name: str,
+    script: pathlib.Path,
+    output_dir: pathlib.Path,
+    arguments: Sequence[str],
+    png: bool = False,
+) -> Target:
+    """Return the build target of a generator script.
+
+    Its digest is a content hash of the script, its `lib` dependencies and the
+    generator `arguments`.
+    """
+    outputs = {"-o": output_dir / f"{name}.svg"}
+    if png:
+        outputs["--png"] = output_dir / f"{name}.png"
+    digest = hashlib.sha256()
+    for path in dependencies(script):
+        digest.update(path.relative_to(script.parent).as_posix().encode())
+        digest.update(b"\0" + path.read_bytes() + b"\0")
+    digest.update(json.dumps([sorted(outputs), *arguments]).encode())
+    return Target(
+        name=name,
+        script=script,
+        arguments=list(arguments),
+        outputs=outputs,
+        digest=digest.hexdigest(),
+    )
+
+
+def load_manifest(output_dir: pathlib.Path) -> dict[str, dict]:
+    """Return the entries of the build manifest of an output directory."""
+    try:
+        manifest = json.loads((output_dir / MANIFEST_NAME).read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    entries: dict[str, dict] = manifest["entries"]
+    return entries
+
+
+def save_manifest(output_dir: pathlib.Path, entries: dict[str, dict]) -> None:
+    """Atomically write the entries of the build manifest."""
+    manifest = {"version": MANIFEST_VERSION, "entries": entries}
+    fd, tmp_name = tempfile.mkstemp(dir=output_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_name, output_dir / MANIFEST_NAME)
+
+
+def stamp(path: pathlib.Path) -> dict[str, int]:
+    """Return the size and modification time of a file."""
+    stat = path.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def is_up_to_date(target: Target, entry: dict | None) -> bool:
+    """Check whether the outputs recorded in a manifest `entry` are valid.
+
+    They are valid if the target digest is unchanged and no output file has
+    been modified or removed since it was built.
+    """
+    if entry is None or entry["digest"] != target.digest:
+        return False
+    try:
+        return all(
+            entry["outputs"].get(path.name) == stamp(path)
+            for path in target.outputs.values()
+        )
+    except FileNotFoundError:
+        return False
+
+
+def build_target(target: Target) -> dict:
+    """Build a target and return its manifest entry.
+
+    The generator writes to temporary files that replace the outputs only upon
+    success.
+    """
+    tmp_outputs = {
+        option: path.with_name(f".{path.name}.tmp")
+        for option, path in target.outputs.items()
+    }
+    try:
+        subprocess.run(
+            target.command(tmp_outputs), check=True, stdout=subprocess.DEVNULL
+        )
+        for option, path in target.outputs.items():
+            os.replace(tmp_outputs[option], path)
+    finally:
+        for tmp_path in tmp_outputs.values():
+            tmp_path.unlink(missing_ok=True)
+    return {
+        "digest": target.digest,
+        "outputs": {
+            path.name: stamp(path) for path in target.outputs.values()
+        },
+    }
+
+
+def build(
+    targets: Sequence[Target],
+    output_dir: pathlib.Path,
+    force: bool = False,
+    max_workers: int | None = None,
+) -> dict[str, bool]:
+    """Build outdated targets concurrently.
+
+    Each generator runs in its own process, with as many processes at once as
+    CPUs by default. The names of the outdated targets are returned mapped to
+    the success of their builds. The manifest is updated with every successful
+    build even if others fail.
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    entries = load_manifest(output_dir)
+    outdated = [
+        target
+        for target in targets
+        if force or not is_up_to_date(target, entries.get(target.name))
+    ]
+    for target in targets:
+        if target not in outdated:
+            print(f"{target.name}: up to date", file=sys.stderr)
+    results = {}
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(
+            max_workers=max_workers or os.cpu_count()
+        ) as executor:
+            futures = {
+                executor.submit(build_target, target): target
+                for target in outdated
+            }
+            for future in as_completed(futures):
+                name = futures[future].name
+                elapsed = time.perf_counter() - start
+                try:
+                    entries[name] = future.result()
+                except subprocess.CalledProcessError:
+                    print(f"{name}: failed", file=sys.stderr)
+                    results[name] = False
+                else:
+                    print(
+                        f"{name}: built after {elapsed:.1f} s", file=sys.stderr
+                    )
+                    results[name] = True
+    finally:
+        save_manifest(output_dir, entries)
+    return results
+
+
+if __name__ == "__main__":
+    main()
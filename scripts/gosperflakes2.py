@@ -4,21 +4,78 @@ __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
 
-from sympy import sqrt
-import random
+from collections.abc import Iterator
+from dataclasses import replace
+import functools
 
-from lib.gosper import gosper_island
-from lib.grid import generate_grid, make_random_color_element_style_fn
+from lib.backend import numbers
+from lib.cache import IslandCache, cached_island
+from lib.cli import make_island_cache, parse_arguments, write_wallpapers
+from lib.gosper import gosper_lattice_island, iter_gosper_island
+from lib.grid import (
+    iter_grid,
+    make_random_color_element_style_fn,
+    simplified_grid_paths,
+)
 from lib.path import scale
-from lib.svg import generate_svg
+from lib.profiling import profiling
+from lib.typing import TChunksFn, TNum, TPoints
 
 
 PALETTE = ["#202020", "#303030", "#404040", "#505050"]
 RESOLUTION = (1920, 1080)
+ITERATIONS = 2
 CELL_SIZE = (32, 36)
 SPACINGS = (CELL_SIZE[0], 3 * CELL_SIZE[1] // 4)
-ISLE = gosper_island(iterations=2)
-ELEMENT_PATHS = [scale(ISLE, (CELL_SIZE[0] / sqrt(3), CELL_SIZE[1] // 2))]
+# Number of rows after which the row offsets of the grid repeat
+ROW_PERIOD = 2
+
+
+def make_element_paths(
+    backend: str,
+    cache: IslandCache | None,
+    lod: float = 0.0,
+    tolerance: float = 0.0,
+    iterations: int = ITERATIONS,
+) -> list[TPoints]:
+    """Return the path(s) of a grid element using `backend` points.
+
+    The island is constructed with a given number of `iterations`. If
+    positive, island segments are only refined down to `lod` pixels, and the
+    island is simplified within `tolerance` pixels consistently with its
+    neighbors in the grid.
+    """
+    factors = scale_factors(backend)
+    min_length = lod / min(float(f) for f in factors)
+    isle = cached_island(
+        gosper_lattice_island, iterations, backend, cache, min_length
+    )
+    isle = scale(isle, factors)
+    if tolerance > 0:
+        return simplified_grid_paths(
+            [isle],
+            spacings=SPACINGS,
+            offsets_fn=offsets_fn,
+            tolerance=tolerance,
+        )
+    return [isle]
+
+
+def iter_element_path(iterations: int, backend: str) -> Iterator[TPoints]:
+    """Yield the points of the island of a grid element in chunks.
+
+    This is the lazy counterpart of `make_element_paths`, whose island is
+    neither cached nor held in memory as a whole.
+    """
+    factors = scale_factors(backend)
+    for chunk in iter_gosper_island(iterations, backend):
+        yield scale(chunk, factors)
+
+
+def scale_factors(backend: str) -> tuple[TNum, TNum]:
+    """Return the factors scaling the island to a grid cell."""
+    sqrt = numbers(backend).sqrt
+    return (CELL_SIZE[0] / sqrt(3), CELL_SIZE[1] // 2)
 
 
 def offsets_fn(ix: int, iy: int) -> tuple[int, int]:
@@ -34,23 +91,54 @@ element_style_fn = make_random_color_element_style_fn(
 
 
 def main() -> None:  # noqa: D103
-    random.seed(1)
-    print(
-        generate_svg(
+    args = parse_arguments(
+        __doc__,
+        resolution=RESOLUTION,
+        spacings=SPACINGS,
+        row_period=ROW_PERIOD,
+        islands=True,
+    )
+    iterations = ITERATIONS if args.iterations is None else args.iterations
+    with profiling(args.profile, args.profile_dump) as profiler:
+        with profiler.stage("islands"):
+            element_paths: list[TPoints | TChunksFn] = (
+                [
+                    functools.partial(
+                        iter_element_path, iterations, args.backend
+                    )
+                ]
+                if args.streamed
+                else list(
+                    make_element_paths(
+                        args.backend,
+                        make_island_cache(args),
+                        args.lod,
+                        args.simplify,
+                        iterations,
+                    )
+                )
+            )
+        write_wallpapers(
+            args,
+            profiler,
             author=__author__,
             title="Randomly colored Gosper islands",
             palette=PALETTE,
             background_color=PALETTE[0],
-            resolution=RESOLUTION,
-            paths=generate_grid(
-                element_paths=ELEMENT_PATHS,
+            layout_fn=functools.partial(
+                iter_grid,
+                element_paths=element_paths,
                 spacings=SPACINGS,
                 offsets_fn=offsets_fn,
-                resolution=RESOLUTION,
-                element_style_fn=element_style_fn,
+                element_style_fn=replace(
+                    element_style_fn, seed=args.color_seed
+                ),
+                instance_id="island" if args.instanced else None,
+                cull=args.cull,
+                clip=args.clip,
             ),
+            seed=1,
         )
-    )
 
 
 if __name__ == "__main__":
@@ -4,21 +4,31 @@ __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
 
-from sympy import sqrt
-import random
+from dataclasses import replace
+import functools
 
-from lib.grid import generate_grid, make_random_color_element_style_fn
+from lib.backend import numbers
+from lib.cli import parse_arguments, write_wallpapers
+from lib.grid import iter_grid, make_random_color_element_style_fn
 from lib.path import scale
 from lib.poly import regular_polygon_path
-from lib.svg import generate_svg
+from lib.profiling import profiling
+from lib.typing import TPoints
 
 
 PALETTE = ["#202020", "#303030", "#404040", "#505050"]
 RESOLUTION = (1920, 1080)
 CELL_SIZE = (32, 36)
 SPACINGS = (CELL_SIZE[0], 3 * CELL_SIZE[1] // 4)
-ISLE = regular_polygon_path(6)
-ELEMENT_PATHS = [scale(ISLE, (CELL_SIZE[0] / sqrt(3), CELL_SIZE[1] // 2))]
+# Number of rows after which the row offsets of the grid repeat
+ROW_PERIOD = 2
+
+
+def make_element_paths(backend: str) -> list[TPoints]:
+    """Return the path(s) of a grid element using `backend` points."""
+    isle = regular_polygon_path(6, backend)
+    sqrt = numbers(backend).sqrt
+    return [scale(isle, (CELL_SIZE[0] / sqrt(3), CELL_SIZE[1] // 2))]
 
 
 def offsets_fn(ix: int, iy: int) -> tuple[int, int]:
@@ -34,23 +44,36 @@ element_style_fn = make_random_color_element_style_fn(
 
 
 def main() -> None:  # noqa: D103
-    random.seed(1)
-    print(
-        generate_svg(
+    args = parse_arguments(
+        __doc__,
+        resolution=RESOLUTION,
+        spacings=SPACINGS,
+        row_period=ROW_PERIOD,
+    )
+    with profiling(args.profile, args.profile_dump) as profiler:
+        with profiler.stage("islands"):
+            element_paths = make_element_paths(args.backend)
+        write_wallpapers(
+            args,
+            profiler,
             author=__author__,
             title="Randomly colored hexagons",
             palette=PALETTE,
             background_color=PALETTE[0],
-            resolution=RESOLUTION,
-            paths=generate_grid(
-                element_paths=ELEMENT_PATHS,
+            layout_fn=functools.partial(
+                iter_grid,
+                element_paths=element_paths,
                 spacings=SPACINGS,
                 offsets_fn=offsets_fn,
-                resolution=RESOLUTION,
-                element_style_fn=element_style_fn,
+                element_style_fn=replace(
+                    element_style_fn, seed=args.color_seed
+                ),
+                instance_id="hexagon" if args.instanced else None,
+                cull=args.cull,
+                clip=args.clip,
             ),
+            seed=1,
         )
-    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,104 @@
+"""Script to measure the import time of the generator modules."""
+
+from collections.abc import Sequence
+import argparse
+import os
+import pathlib
+import re
+import subprocess
+import sys
+
+from build import discover_generators
+
+SCRIPTS_DIR = pathlib.Path(__file__).resolve().parent
+
+# Line of `python -X importtime` output with self and cumulative times in
+# microseconds, and the module name indented by its nesting level
+IMPORTTIME_PATTERN = re.compile(
+    r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$"
+)
+
+
+def main() -> None:  # noqa: D103
+    args = parse_arguments()
+    modules = args.modules or default_modules(SCRIPTS_DIR)
+    over_budget = []
+    print(f"{'module':<24} {'import time':>12}  sympy")
+    for module in modules:
+        times = min(
+            (measure_imports(module) for _ in range(args.repeat)),
+            key=lambda times: times[module],
+        )
+        milliseconds = times[module] / 1000
+        sympy = "yes" if "sympy" in times else "no"
+        print(f"{module:<24} {milliseconds:>9.1f} ms  {sympy}")
+        if args.budget is not None and milliseconds > args.budget:
+            over_budget.append(module)
+    if over_budget:
+        sys.exit(f"over budget: {' '.join(over_budget)}")
+
+
+def parse_arguments() -> argparse.Namespace:
+    """Parse command-line arguments."""
+    parser = argparse.ArgumentParser(
+        description=(
+            "Measure the cumulative import time of each module in a fresh "
+            "interpreter, and whether it imports sympy."
+        )
+    )
+    parser.add_argument(
+        "modules",
+        metavar="MODULE",
+        nargs="*",
+        help="module to import (default: all lib modules and generators)",
+    )
+    parser.add_argument(
+        "-n",
+        "--repeat",
+        type=int,
+        default=3,
+        help="number of measurements, the fastest of which is reported",
+    )
+    parser.add_argument(
+        "--budget",
+        metavar="MS",
+        type=float,
+        help="fail if any module takes longer than this to import",
+    )
+    return parser.parse_args()
+
+
+def default_modules(directory: pathlib.Path) -> list[str]:
+    """Return the `lib` modules and generator scripts of a directory."""
+    lib_modules = [
+        f"lib.{path.stem}" for path in sorted((directory / "lib").glob("*.py"))
+    ]
+    return lib_modules + list(discover_generators(directory))
+
+
+def measure_imports(
+    module: str, path: Sequence[pathlib.Path] = (SCRIPTS_DIR,)
+) -> dict[str, int]:
+    """Import a module in a fresh interpreter and return import times.
+
+    The returned dictionary maps the names of all newly imported modules,
+    including the module itself, to their cumulative import times in
+    microseconds. Modules are looked up in the directories of `path`.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        check=True,
+        capture_output=True,
+        text=True,
+        env=os.environ | {"PYTHONPATH": os.pathsep.join(map(str, path))},
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if match is not None:
+            times[match.group(4)] = int(match.group(2))
+    return times
+
+
+if __name__ == "__main__":
+    main()
@@ -4,30 +4,98 @@ __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
 
-from sympy import Rational, pi, sqrt
-import random
+from collections.abc import Iterator, Sequence
+from dataclasses import replace
+from itertools import chain
+import functools
 
-from lib.koch import koch_island
-from lib.grid import generate_grid, make_random_color_element_style_fn
+from lib.backend import numbers
+from lib.cache import IslandCache, cached_island
+from lib.cli import make_island_cache, parse_arguments, write_wallpapers
+from lib.koch import iter_koch_island, koch_lattice_island
+from lib.grid import (
+    iter_grid,
+    make_random_color_element_style_fn,
+    simplified_grid_paths,
+)
 from lib.path import scale, shift, rotate
-from lib.svg import generate_svg
+from lib.profiling import Profiler, profiling
+from lib.svg import SVGPath, SVGUse
+from lib.typing import TChunksFn, TPoints
 
 
 PALETTE = ["#202020", "#303030", "#404040", "#505050"]
 RESOLUTION = (1920, 1080)
+ITERATIONS = 3
 CELL_SIZE = (64, 72)
 SPACINGS = (2 * CELL_SIZE[0], CELL_SIZE[1] // 2)
-ISLE = koch_island(iterations=3)
-BIG_ISLE = scale(ISLE, (CELL_SIZE[0] / sqrt(3), CELL_SIZE[1] // 2))
-SMALL_ISLE = scale(
-    rotate(ISLE, pi / 6),
-    (Rational(1, 3) * CELL_SIZE[0], Rational(1, 2) / sqrt(3) * CELL_SIZE[1]),
-)
-BIG_ELEMENT_PATHS = [BIG_ISLE]
-SMALL_ELEMENT_PATHS = [
-    shift(SMALL_ISLE, (-CELL_SIZE[0] * Rational(2, 3), 0)),
-    shift(SMALL_ISLE, (CELL_SIZE[0] * Rational(2, 3), 0)),
-]
+# Number of rows after which the row offsets of the grid repeat
+ROW_PERIOD = 2
+
+
+def make_element_paths(
+    backend: str,
+    cache: IslandCache | None,
+    lod: float = 0.0,
+    tolerance: float = 0.0,
+    iterations: int = ITERATIONS,
+) -> tuple[list[TPoints], list[TPoints]]:
+    """Return the big and small element paths using `backend` points.
+
+    The islands are constructed with a given number of `iterations`. If
+    positive, island segments are only refined down to `lod` pixels, and the
+    islands are simplified within `tolerance` pixels consistently with their
+    neighbors in the grid.
+    """
+    # A single threshold refines both islands to the same depth where they
+    # touch, which is derived from the big island, whose segments are the
+    # longer ones in pixels
+    big_factors = (CELL_SIZE[0] / numbers(backend).sqrt(3), CELL_SIZE[1] // 2)
+    min_length = lod / min(float(f) for f in big_factors)
+    isle = cached_island(
+        koch_lattice_island, iterations, backend, cache, min_length
+    )
+    paths = [place_island(isle, i, backend) for i in range(3)]
+    if tolerance > 0:
+        # The big and small islands are laid out in the same grid
+        paths = simplified_grid_paths(
+            paths,
+            spacings=SPACINGS,
+            offsets_fn=offsets_fn,
+            tolerance=tolerance,
+        )
+    return paths[:1], paths[1:]
+
+
+def iter_element_path(
+    index: int, iterations: int, backend: str
+) -> Iterator[TPoints]:
+    """Yield the points of an island of a grid element in chunks.
+
+    This is the lazy counterpart of `make_element_paths` for the island of
+    a given `index` (see `place_island`), which is neither cached nor held
+    in memory as a whole.
+    """
+    for chunk in iter_koch_island(iterations, backend):
+        yield place_island(chunk, index, backend)
+
+
+def place_island(points: TPoints, index: int, backend: str) -> TPoints:
+    """Place the points of an island into a grid cell.
+
+    The island of `index` 0 is the big one, and those of indices 1 and 2 are
+    the small ones to its left and right.
+    """
+    num = numbers(backend)
+    if index == 0:
+        return scale(points, (CELL_SIZE[0] / num.sqrt(3), CELL_SIZE[1] // 2))
+    small_factors = (
+        num.rational(1, 3) * CELL_SIZE[0],
+        num.rational(1, 2) / num.sqrt(3) * CELL_SIZE[1],
+    )
+    small_isle = scale(rotate(points, num.pi / 6), small_factors)
+    sign = -1 if index == 1 else 1
+    return shift(small_isle, (sign * CELL_SIZE[0] * num.rational(2, 3), 0))
 
 
 def offsets_fn(ix: int, iy: int) -> tuple[int, int]:
@@ -50,33 +118,107 @@ small_element_style_fn = make_random_color_element_style_fn(
 )
 
 
+def iter_paths(
+    big_element_paths: "Sequence[TPoints | TChunksFn]",
+    small_element_paths: "Sequence[TPoints | TChunksFn]",
+    *,
+    resolution: tuple[int, int],
+    instanced: bool = False,
+    cull: bool = False,
+    clip: bool = False,
+    max_workers: int = 1,
+    precision: int | None = None,
+    profiler: Profiler | None = None,
+    color_seed: int | None = None,
+) -> Iterator[SVGPath | SVGUse]:
+    """Lay out the grids of big and small islands at a `resolution`.
+
+    If `color_seed` is given, the colors of the big and small islands are
+    hashed with that seed and the next one, respectively (see
+    `RandomColorStyles`). See `iter_grid` for the description of the other
+    arguments.
+    """
+    return chain(
+        iter_grid(
+            element_paths=big_element_paths,
+            spacings=SPACINGS,
+            offsets_fn=offsets_fn,
+            resolution=resolution,
+            element_style_fn=replace(big_element_style_fn, seed=color_seed),
+            instance_id="big-island" if instanced else None,
+            cull=cull,
+            clip=clip,
+            max_workers=max_workers,
+            precision=precision,
+            profiler=profiler,
+        ),
+        iter_grid(
+            element_paths=small_element_paths,
+            spacings=SPACINGS,
+            offsets_fn=offsets_fn,
+            resolution=resolution,
+            element_style_fn=replace(
+                small_element_style_fn,
+                seed=None if color_seed is None else color_seed + 1,
+            ),
+            instance_id="small-island" if instanced else None,
+            cull=cull,
+            clip=clip,
+            max_workers=max_workers,
+            precision=precision,
+            profiler=profiler,
+        ),
+    )
+
+
 def main() -> None:  # noqa: D103
-    random.seed(1)
-    print(
-        generate_svg(
+    args = parse_arguments(
+        __doc__,
+        resolution=RESOLUTION,
+        spacings=SPACINGS,
+        row_period=ROW_PERIOD,
+        islands=True,
+    )
+    iterations = ITERATIONS if args.iterations is None else args.iterations
+    with profiling(args.profile, args.profile_dump) as profiler:
+        with profiler.stage("islands"):
+            big_element_paths: Sequence[TPoints | TChunksFn]
+            small_element_paths: Sequence[TPoints | TChunksFn]
+            if args.streamed:
+                islands = [
+                    functools.partial(
+                        iter_element_path, i, iterations, args.backend
+                    )
+                    for i in range(3)
+                ]
+                big_element_paths = islands[:1]
+                small_element_paths = islands[1:]
+            else:
+                big_element_paths, small_element_paths = make_element_paths(
+                    args.backend,
+                    make_island_cache(args),
+                    args.lod,
+                    args.simplify,
+                    iterations,
+                )
+        write_wallpapers(
+            args,
+            profiler,
             author=__author__,
             title="Randomly colored Koch islands",
             palette=PALETTE,
             background_color=PALETTE[0],
-            resolution=RESOLUTION,
-            paths=(
-                generate_grid(
-                    element_paths=BIG_ELEMENT_PATHS,
-                    spacings=SPACINGS,
-                    offsets_fn=offsets_fn,
-                    resolution=RESOLUTION,
-                    element_style_fn=big_element_style_fn,
-                )
-                + generate_grid(
-                    element_paths=SMALL_ELEMENT_PATHS,
-                    spacings=SPACINGS,
-                    offsets_fn=offsets_fn,
-                    resolution=RESOLUTION,
-                    element_style_fn=small_element_style_fn,
-                )
+            layout_fn=functools.partial(
+                iter_paths,
+                big_element_paths,
+                small_element_paths,
+                instanced=args.instanced,
+                cull=args.cull,
+                clip=args.clip,
+                color_seed=args.color_seed,
             ),
+            seed=1,
         )
-    )
 
 
 if __name__ == "__main__":
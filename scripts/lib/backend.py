@@ -0,0 +1,75 @@
+"""Numbers and matrices of the exact sympy and the float NumPy backends."""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (C) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["BACKENDS", "Numbers", "matrix", "numbers"]
+
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+import functools
+import math
+import numpy as np
+import operator
+
+from .typing import TMatrix, TNum
+
+# Names of the available point representations
+BACKENDS = ("sympy", "numpy")
+
+
+@dataclass(frozen=True, kw_only=True)
+class Numbers:
+    """Constants and functions producing the numbers of a backend."""
+
+    pi: TNum
+    sqrt: Callable[[TNum], TNum]
+    cos: Callable[[TNum], TNum]
+    sin: Callable[[TNum], TNum]
+    rational: Callable[[int, int], TNum]
+
+
+@functools.cache
+def numbers(backend: str) -> Numbers:
+    """Return the numbers of the named `backend`.
+
+    The sympy backend yields exact expressions, and sympy is only imported
+    upon the first such request. The NumPy backend yields floats, and its
+    trigonometric functions also accept arrays.
+    """
+    assert backend in BACKENDS
+    if backend == "numpy":
+        return Numbers(
+            pi=math.pi,
+            sqrt=math.sqrt,
+            cos=lambda x: _snap_rational(np.cos(x)),
+            sin=lambda x: _snap_rational(np.sin(x)),
+            rational=operator.truediv,
+        )
+    import sympy
+
+    return Numbers(
+        pi=sympy.pi,
+        sqrt=sympy.sqrt,
+        cos=sympy.cos,
+        sin=sympy.sin,
+        rational=sympy.Rational,
+    )
+
+
+def _snap_rational(values):
+    # By Niven's theorem, the only rational sines and cosines of rational
+    # multiples of pi are 0, 1/2 and 1 up to sign, so snap rounding errors to
+    # these exact values
+    halves = np.rint(2 * values) / 2
+    return np.where(np.abs(values - halves) < 1e-12, halves, values)
+
+
+def matrix(rows: Sequence[Sequence[TNum]], backend: str) -> TMatrix:
+    """Return a matrix of the named `backend` from its `rows`."""
+    assert backend in BACKENDS
+    if backend == "numpy":
+        return np.array(rows, dtype=np.float64)
+    from sympy import Matrix
+
+    return Matrix(rows)
@@ -0,0 +1,136 @@
+"""Generation of a wallpaper at several resolutions from shared geometry."""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (C) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["generate_svgs", "map_resolutions"]
+
+from collections.abc import Callable, Iterable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, TypeVar
+import functools
+import random
+
+from .svg import (
+    SVGCompoundPath,
+    SVGPath,
+    SVGStreamedPath,
+    SVGUse,
+    generate_svg,
+)
+
+T = TypeVar("T")
+
+TLayoutFn = Callable[
+    ..., Iterable[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse]
+]
+
+# Rendering function and seed of a worker process, received once per worker
+_worker_state: tuple[Callable[[tuple[int, int]], Any], int | None] | None = (
+    None
+)
+
+
+def map_resolutions(
+    render_fn: Callable[[tuple[int, int]], T],
+    resolutions: Sequence[tuple[int, int]],
+    *,
+    seed: int | None = None,
+    max_workers: int = 1,
+) -> list[T]:
+    """Return the results of `render_fn` at each of `resolutions` in order.
+
+    Function `render_fn` lays out and renders the wallpaper at a given
+    resolution from geometry computed once beforehand, which it may hold as a
+    partial. If `seed` is given, the `random` module is seeded with it before
+    each call, so that random styles do not depend on the other resolutions.
+
+    If `max_workers` is greater than one, the resolutions are distributed over
+    as many worker processes, each of which receives `render_fn` along with
+    its geometry only once. Both `render_fn` and its results must then be
+    picklable.
+    """
+    assert max_workers >= 1
+    if max_workers == 1 or len(resolutions) < 2:
+        return [_render(render_fn, seed, r) for r in resolutions]
+    with ProcessPoolExecutor(
+        max_workers=min(max_workers, len(resolutions)),
+        initializer=_initialize_worker,
+        initargs=(render_fn, seed),
+    ) as executor:
+        return list(executor.map(_render_in_worker, resolutions))
+
+
+def generate_svgs(
+    *,
+    layout_fn: TLayoutFn,
+    resolutions: Sequence[tuple[int, int]],
+    author: str,
+    title: str,
+    palette: Sequence[str],
+    background_color: str,
+    precision: int | None = None,
+    css_classes: bool = False,
+    seed: int | None = None,
+    max_workers: int = 1,
+) -> list[str]:
+    """Generate the SVG code of the wallpaper at each of `resolutions`.
+
+    The paths at each resolution are laid out by `layout_fn`, which is called
+    with the keyword argument `resolution`, e.g. a partial of `generate_grid`
+    with element paths computed once. See `generate_svg` for the description
+    of the arguments shared by all resolutions, and `map_resolutions` for
+    that of `seed` and `max_workers`.
+    """
+    return map_resolutions(
+        functools.partial(
+            _generate_svg,
+            layout_fn,
+            dict(
+                author=author,
+                title=title,
+                palette=palette,
+                background_color=background_color,
+                precision=precision,
+                css_classes=css_classes,
+            ),
+        ),
+        resolutions,
+        seed=seed,
+        max_workers=max_workers,
+    )
+
+
+def _generate_svg(
+    layout_fn: TLayoutFn,
+    arguments: dict[str, Any],
+    resolution: tuple[int, int],
+) -> str:
+    return generate_svg(
+        paths=layout_fn(resolution=resolution),
+        resolution=resolution,
+        **arguments,
+    )
+
+
+def _render(
+    render_fn: Callable[[tuple[int, int]], T],
+    seed: int | None,
+    resolution: tuple[int, int],
+) -> T:
+    if seed is not None:
+        random.seed(seed)
+    return render_fn(resolution)
+
+
+def _initialize_worker(
+    render_fn: Callable[[tuple[int, int]], Any], seed: int | None
+) -> None:
+    global _worker_state
+    _worker_state = (render_fn, seed)
+
+
+def _render_in_worker(resolution: tuple[int, int]) -> Any:
+    assert _worker_state is not None
+    render_fn, seed = _worker_state
+    return _render(render_fn, seed, resolution)
@@ -0,0 +1,167 @@
+"""Persistent on-disk cache of computed island geometry."""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (C) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["IslandCache", "cached_island"]
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+import numpy as np
+import os
+import tempfile
+import zipfile
+
+from .lattice import Lattice, LatticePath
+from .typing import TPoints
+
+# Version of the cache entry format, to be bumped whenever the stored data
+# become incompatible or are computed differently
+CACHE_VERSION = 4
+
+
+def default_cache_directory() -> Path:
+    """Return the directory of the island cache.
+
+    It can be set through the `WALLPAPERS_CACHE_DIR` environment variable, and
+    defaults to a subdirectory of the XDG cache directory.
+    """
+    try:
+        return Path(os.environ["WALLPAPERS_CACHE_DIR"])
+    except KeyError:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        return Path(base) / "ccornix-wallpapers"
+
+
+@dataclass(kw_only=True)
+class IslandCache:
+    """Cache of lattice islands stored as `.npz` files.
+
+    Entries are keyed by island type and iteration count, and hold the integer
+    coordinates of the island together with their denominator and the order of
+    the lattice, from which points of any backend can be rebuilt exactly. When
+    the total size of the entries exceeds `max_bytes`, the least recently used
+    ones are evicted.
+    """
+
+    directory: Path = field(default_factory=default_cache_directory)
+    max_bytes: int = 64 * 2**20
+
+    def path(self, island: str, iterations: int) -> Path:
+        """Return the path of the file of a cache entry."""
+        return self.directory / f"v{CACHE_VERSION}-{island}-{iterations}.npz"
+
+    def load(self, island: str, iterations: int) -> LatticePath | None:
+        """Return the lattice path of a cache entry, or `None` upon a miss."""
+        path = self.path(island, iterations)
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                lattice_path = LatticePath(
+                    lattice=Lattice(order=int(data["order"])),
+                    coords=data["coords"],
+                    denominator=int(data["denominator"]),
+                )
+        except (FileNotFoundError, KeyError, ValueError, zipfile.BadZipFile):
+            return None
+        # Mark the entry as recently used
+        os.utime(path)
+        return lattice_path
+
+    def store(
+        self, island: str, iterations: int, lattice_path: LatticePath
+    ) -> None:
+        """Store the lattice path of an entry, evicting old ones if needed."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.path(island, iterations)
+        # Write atomically so that concurrent builds never see partial files
+        fd, tmp_name = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    order=np.int64(lattice_path.lattice.order),
+                    coords=lattice_path.coords,
+                    denominator=np.int64(lattice_path.denominator),
+                )
+            os.replace(tmp_name, path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        self.evict()
+
+    def entries(self) -> list[Path]:
+        """Return the files of all cache entries, least recently used first."""
+        try:
+            # Entries up to version 3 were stored as `.npy` files
+            paths = list(self.directory.glob("v*-*.np[yz]"))
+        except FileNotFoundError:
+            return []
+        return sorted(paths, key=lambda path: path.stat().st_mtime)
+
+    def evict(self) -> None:
+        """Remove least recently used entries until within size limits."""
+        entries = self.entries()
+        total = sum(path.stat().st_size for path in entries)
+        for path in entries:
+            if total <= self.max_bytes:
+                break
+            total -= path.stat().st_size
+            path.unlink(missing_ok=True)
+
+    def invalidate(
+        self,
+        island: str | None = None,
+        iterations: int | None = None,
+    ) -> int:
+        """Remove matching cache entries and return their number.
+
+        Entries are matched by `island` type and `iterations` count, each of
+        which matches anything if `None`. Without arguments, the whole cache
+        is cleared, including entries of earlier versions. Files whose names
+        do not parse as those of entries are left alone.
+        """
+        removed = 0
+        for path in self.entries():
+            version, _, key = path.stem.partition("-")
+            if path.suffix == ".npy":
+                # Entries up to version 3 were keyed by backend as well
+                key = key.rpartition("-")[0]
+            # Island names may contain dashes themselves
+            try:
+                name, n = key.rsplit("-", 1)
+                count = int(n)
+            except ValueError:
+                continue
+            if not version[1:].isdigit():
+                continue
+            if island in (None, name) and iterations in (None, count):
+                path.unlink(missing_ok=True)
+                removed += 1
+        return removed
+
+
+def cached_island(
+    lattice_island_fn: Callable[..., LatticePath],
+    iterations: int,
+    backend: str,
+    cache: IslandCache | None = None,
+    min_length: float = 0.0,
+) -> TPoints:
+    """Return island points of `backend` computed using a `cache`.
+
+    The island is computed by `lattice_island_fn` (see `koch_lattice_island`)
+    directly if no cache is given, or if its level of detail is limited by a
+    positive `min_length`. Either way, its points are only then represented
+    according to the named `backend`.
+    """
+    if min_length > 0:
+        return lattice_island_fn(iterations, min_length).to_backend(backend)
+    if cache is None:
+        return lattice_island_fn(iterations).to_backend(backend)
+    island = lattice_island_fn.__name__
+    lattice_path = cache.load(island, iterations)
+    if lattice_path is None:
+        lattice_path = lattice_island_fn(iterations)
+        cache.store(island, iterations, lattice_path)
+    return lattice_path.to_backend(backend)
@@ -0,0 +1,469 @@
+"""Command-line interface shared by the wallpaper generator scripts."""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (C) 2024 ccornix"
+__license__ = "MIT"
+__all__ = [
+    "make_island_cache",
+    "output_path",
+    "parse_arguments",
+    "parse_resolution",
+    "write_wallpaper",
+    "write_wallpapers",
+]
+
+from collections.abc import Iterable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+import argparse
+import functools
+import os
+import sys
+
+from .batch import TLayoutFn, map_resolutions
+from .cache import IslandCache
+from .path import BACKENDS
+from .profiling import Profiler
+from .grid import share_strokes
+from .raster import rasterize, write_png
+from .svg import (
+    SVGCompoundPath,
+    SVGPath,
+    SVGStreamedPath,
+    SVGUse,
+    merge_paths,
+    write_svg,
+)
+
+
+def parse_arguments(
+    description: str,
+    *,
+    resolution: tuple[int, int],
+    spacings: tuple[int, int],
+    row_period: int = 1,
+    islands: bool = False,
+) -> argparse.Namespace:
+    """Parse the command-line arguments of a generator script.
+
+    The nominal `resolution` of the script is the default of the resolutions
+    to generate. The outputs at all resolutions are checked to be writable
+    before any work is done.
+
+    A pattern tile must repeat the grid seamlessly, so its size must be a
+    multiple of the grid `spacings`, and its number of rows a multiple of
+    the `row_period` of the row offsets of the grid.
+
+    The options controlling the construction of islands, i.e. their caching,
+    level of detail, iterations and streaming, are only offered if `islands`
+    is true. Streamed islands are always instanced.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "-o",
+        "--output",
+        default="-",
+        help=(
+            "output SVG file (default: standard output), in whose name "
+            "{width} and {height} are replaced by those of the resolution"
+        ),
+    )
+    parser.add_argument(
+        "-r",
+        "--resolution",
+        metavar="WxH",
+        action="append",
+        type=parse_resolution,
+        help=(
+            "nominal resolution of the wallpaper, which may be given several "
+            "times to lay out each from the same geometry (default: that of "
+            "the script)"
+        ),
+    )
+    parser.add_argument(
+        "--pattern",
+        metavar="WxH",
+        type=parse_resolution,
+        help=(
+            "lay out a single tile of this size, whose random colors thus "
+            "repeat, and fill the wallpaper with it as an SVG pattern"
+        ),
+    )
+    parser.add_argument(
+        "--color-seed",
+        metavar="N",
+        type=int,
+        help=(
+            "hash the random colors of each grid cell from this seed and its "
+            "indices instead of drawing them one after another"
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        metavar="N",
+        type=int,
+        default=1,
+        help=(
+            "number of worker processes generating several resolutions, or "
+            "laying out the grid of a single one (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="sympy",
+        help=(
+            "representation of path points: exact sympy expressions or "
+            "vectorized NumPy floats (default: %(default)s)"
+        ),
+    )
+    parser.add_argument(
+        "--instanced",
+        action="store_true",
+        help=(
+            "define element paths once and instance them in each grid cell "
+            "instead of repeating their points"
+        ),
+    )
+    parser.add_argument(
+        "--cull",
+        action="store_true",
+        help="drop grid cells lying outside the image",
+    )
+    parser.add_argument(
+        "--clip",
+        action="store_true",
+        help="clip the paths of grid cells to the edges of the image",
+    )
+    parser.add_argument(
+        "--precision",
+        metavar="DIGITS",
+        type=int,
+        help=(
+            "encode path coordinates compactly with relative commands, "
+            "rounded to this many decimal places"
+        ),
+    )
+    if islands:
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="always recompute island geometry instead of using the cache",
+        )
+        parser.add_argument(
+            "--clear-cache",
+            action="store_true",
+            help="remove all cached island geometry before generation",
+        )
+        parser.add_argument(
+            "--lod",
+            metavar="PIXELS",
+            type=float,
+            default=0.0,
+            help=(
+                "stop refining island segments once they are no longer than "
+                "this many pixels"
+            ),
+        )
+        parser.add_argument(
+            "--simplify",
+            metavar="PIXELS",
+            type=float,
+            default=0.0,
+            help=(
+                "drop island points by Douglas-Peucker simplification within "
+                "this many pixels"
+            ),
+        )
+        parser.add_argument(
+            "--iterations",
+            metavar="N",
+            type=int,
+            help=(
+                "number of iterations of the island construction (default: "
+                "that of the script)"
+            ),
+        )
+        parser.add_argument(
+            "--streamed",
+            action="store_true",
+            help=(
+                "define each island once and stream its points into the "
+                "outputs as they are constructed instead of computing them "
+                "up front, which implies --instanced and keeps memory use "
+                "bounded for any number of iterations"
+            ),
+        )
+    parser.add_argument(
+        "--shared-strokes",
+        action="store_true",
+        help=(
+            "fill paths without strokes and stroke the edges shared by "
+            "neighboring paths only once"
+        ),
+    )
+    parser.add_argument(
+        "--merge",
+        action="store_true",
+        help="merge the paths of each style into a single compound path",
+    )
+    parser.add_argument(
+        "--css-classes",
+        action="store_true",
+        help=(
+            "style paths by CSS classes defined once instead of inline styles"
+        ),
+    )
+    parser.add_argument(
+        "--png",
+        metavar="PNG_FILE",
+        help=(
+            "also rasterize the wallpaper into a PNG file, whose name is "
+            "formatted like that of the output"
+        ),
+    )
+    parser.add_argument(
+        "--scale",
+        metavar="FACTOR",
+        default=1.0,
+        help=(
+            "ratio of the PNG resolution to the nominal SVG resolution "
+            "(default: %(default)s)"
+        ),
+        type=float,
+    )
+    parser.add_argument(
+        "--supersampling",
+        metavar="N",
+        default=4,
+        help=(
+            "number of anti-aliasing samples per PNG pixel along each axis "
+            "(default: %(default)s)"
+        ),
+        type=int,
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help=(
+            "report wall time, call counts and peak memory of each pipeline "
+            "stage to standard error"
+        ),
+    )
+    parser.add_argument(
+        "--profile-dump",
+        metavar="PROFILE_FILE",
+        help="write cProfile statistics of the whole run to a file",
+    )
+    args = parser.parse_args()
+    args.resolution = args.resolution or [resolution]
+    if islands and args.iterations is not None and args.iterations < 0:
+        parser.error("the number of iterations must not be negative")
+    if islands and args.streamed:
+        if args.lod or args.simplify or args.clip:
+            parser.error(
+                "streamed islands cannot be refined by level of detail, "
+                "simplified or clipped"
+            )
+        args.instanced = True
+    if args.pattern is not None:
+        (width, height), (dx, dy) = args.pattern, spacings
+        if width % dx or height % (dy * row_period):
+            parser.error(
+                f"pattern tile must be a multiple of {dx}x{dy * row_period}"
+            )
+    for template in (args.output, args.png):
+        if template is None:
+            continue
+        if len(set(args.resolution)) > 1 and output_path(
+            template, (1, 1)
+        ) == output_path(template, (2, 2)):
+            parser.error(
+                "output file names must contain {width} or {height} "
+                "for several resolutions"
+            )
+        for path in {output_path(template, r) for r in args.resolution}:
+            if not _is_writable(path):
+                parser.error(f"cannot write output file: {path!r}")
+    return args
+
+
+def output_path(template: str, resolution: tuple[int, int]) -> str:
+    """Return an output file name at a `resolution`.
+
+    Only the placeholders `{width}` and `{height}` in the `template` are
+    replaced, so that any other braces are left as they are.
+    """
+    width, height = resolution
+    return template.replace("{width}", str(width)).replace(
+        "{height}", str(height)
+    )
+
+
+def parse_resolution(text: str) -> tuple[int, int]:
+    """Parse a resolution given as `WIDTHxHEIGHT` in pixels."""
+    try:
+        width, height = (int(size) for size in text.split("x"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid resolution: {text!r}")
+    if width <= 0 or height <= 0:
+        raise argparse.ArgumentTypeError(f"invalid resolution: {text!r}")
+    return width, height
+
+
+def make_island_cache(args: argparse.Namespace) -> IslandCache | None:
+    """Return the island cache requested by the command-line arguments."""
+    cache = IslandCache()
+    if args.clear_cache:
+        cache.invalidate()
+    return None if args.no_cache else cache
+
+
+def write_wallpaper(
+    args: argparse.Namespace,
+    profiler: Profiler,
+    *,
+    author: str,
+    title: str,
+    palette: Sequence[str],
+    background_color: str,
+    paths: Iterable[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse],
+    resolution: tuple[int, int],
+    tile: tuple[int, int] | None = None,
+) -> None:
+    """Write the wallpaper to the outputs requested by the arguments.
+
+    The SVG is always written, and a PNG is rasterized too if requested, to
+    files named after the `resolution` (see `output_path`). See `write_svg`
+    for the description of the other arguments, such as `tile`. The
+    production of `paths`, their optional stroke sharing (see
+    `share_strokes`) and merging (see `merge_paths`), rasterization and
+    serialization are profiled as separate stages by the `profiler`.
+    """
+    paths = profiler.iterate("layout", paths)
+    if args.shared_strokes:
+        paths = profiler.iterate("stroke sharing", share_strokes(paths))
+    if args.merge:
+        with profiler.stage("merging"):
+            paths = merge_paths(paths)
+    if args.png is not None:
+        # Materialize the paths to both rasterize and write them
+        paths = list(paths)
+        with profiler.stage("rasterization"):
+            image = rasterize(
+                paths,
+                resolution=resolution,
+                background_color=background_color,
+                scale=args.scale,
+                supersampling=args.supersampling,
+                tile=tile,
+            )
+            with _open_output(output_path(args.png, resolution), "wb") as file:
+                write_png(file, image)
+    with profiler.stage("serialization"):
+        with _open_output(output_path(args.output, resolution), "w") as file:
+            write_svg(
+                file,
+                author=author,
+                title=title,
+                palette=palette,
+                background_color=background_color,
+                paths=paths,
+                resolution=resolution,
+                precision=args.precision,
+                css_classes=args.css_classes,
+                tile=tile,
+            )
+
+
+def write_wallpapers(
+    args: argparse.Namespace,
+    profiler: Profiler,
+    *,
+    author: str,
+    title: str,
+    palette: Sequence[str],
+    background_color: str,
+    layout_fn: TLayoutFn,
+    seed: int | None = None,
+) -> None:
+    """Write the wallpaper at each resolution requested by the arguments.
+
+    The paths are laid out by `layout_fn`, called with the keyword arguments
+    `resolution`, `max_workers`, `precision` and `profiler` (see
+    `iter_grid`), from geometry computed once at each resolution given on the
+    command line (see `parse_arguments`), or only once on the tile requested
+    by the `--pattern` option. They are written by `write_wallpaper`,
+    possibly by several worker processes (see `map_resolutions` for the
+    description of `seed`). A single resolution is laid out and rendered by
+    as many worker processes instead. Only work done in the main process is
+    profiled by the `profiler`.
+    """
+    resolutions = args.resolution
+    if len(resolutions) > 1:
+        if args.workers > 1:
+            profiler = Profiler(enabled=False)
+        max_workers = 1
+    else:
+        max_workers = args.workers
+    layout_fn = functools.partial(
+        layout_fn,
+        max_workers=max_workers,
+        precision=args.precision,
+        profiler=profiler,
+    )
+    map_resolutions(
+        functools.partial(
+            _write_wallpaper_at,
+            args,
+            profiler,
+            dict(
+                author=author,
+                title=title,
+                palette=palette,
+                background_color=background_color,
+            ),
+            layout_fn,
+        ),
+        resolutions,
+        seed=seed,
+        max_workers=args.workers,
+    )
+
+
+def _write_wallpaper_at(
+    args: argparse.Namespace,
+    profiler: Profiler,
+    arguments: dict[str, Any],
+    layout_fn: TLayoutFn,
+    resolution: tuple[int, int],
+) -> None:
+    write_wallpaper(
+        args,
+        profiler,
+        paths=layout_fn(resolution=args.pattern or resolution),
+        resolution=resolution,
+        tile=args.pattern,
+        **arguments,
+    )
+
+
+def _is_writable(path: str) -> bool:
+    # Return whether an output file can be written, where "-" stands for
+    # standard output, without creating or truncating it
+    if path == "-":
+        return True
+    if os.path.exists(path):
+        return os.path.isfile(path) and os.access(path, os.W_OK)
+    directory = os.path.dirname(path) or "."
+    return os.path.isdir(directory) and os.access(directory, os.W_OK)
+
+
+@contextmanager
+def _open_output(path: str, mode: str) -> Iterator[Any]:
+    # Open an output file for writing, where "-" stands for standard output
+    if path == "-":
+        yield sys.stdout.buffer if "b" in mode else sys.stdout
+        return
+    with open(path, mode) as file:
+        yield file
@@ -3,42 +3,88 @@
 __author__ = "ccornix"
 __copyright__ = "Copyright (C) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["gosper_island"]
+__all__ = [
+    "iter_gosper_island",
+    "gosper_island",
+    "gosper_lattice_island",
+    "gosper_rule",
+]
 
-from sympy import Matrix, Rational, pi, sqrt
+from collections.abc import Iterator
+import functools
 
-from .functools import repeated
-from .path import (
-    points_to_segments,
-    segments_to_points,
-    refined_segments,
-    rotation_matrix,
+from .backend import matrix, numbers
+from .lattice import (
+    Lattice,
+    LatticePath,
+    lattice_polygon_path,
+    lattice_rule,
+    refined_lattice_path,
 )
+from .path import iter_refined_path, rotation_matrix
 from .poly import regular_polygon_path
+from .typing import TMatrix, TPoints
 
-R_m60 = rotation_matrix(-pi / 3)
 
-# Transformation: scale edge by 1/sqrt(7) and rotate counter-clockwise by
-# arcsin(sqrt(3)/(2*sqrt(7)))
-T_gosper = Rational(1, 14) * Matrix([[5, -sqrt(3)], [sqrt(3), 5]])
+@functools.cache
+def gosper_rule(backend: str = "sympy") -> tuple[TMatrix, ...]:
+    """Return the Gosper island rule of the named `backend`.
 
-
-def gosper_rule(segment: Matrix) -> list[Matrix]:
-    """Refine a `segment` vector following the Gosper island rule.
+    The rule consists of the transformations of a segment vector into its
+    refined segment vectors.
 
     Reference:
     https://larryriddle.agnesscott.org/ifs/ksnow/flowsnake.htm
     """
-    v1 = T_gosper * segment
-    v2 = R_m60 * v1
-    return [v1, v2, v1]
-
-
-def gosper_island(iterations: int) -> list[Matrix]:
-    """Return Gosper island after a given number of `iterations`."""
-    points = regular_polygon_path(6)
-    segments = points_to_segments(points)
-    return segments_to_points(
-        list(repeated(refined_segments, iterations, gosper_rule)(segments)),
-        points[0],
+    num = numbers(backend)
+    R_m60 = rotation_matrix(-num.pi / 3, backend)
+    # Transformation: scale edge by 1/sqrt(7) and rotate counter-clockwise by
+    # arcsin(sqrt(3)/(2*sqrt(7)))
+    sqrt3 = num.sqrt(3)
+    T_gosper = num.rational(1, 14) * matrix([[5, -sqrt3], [sqrt3, 5]], backend)
+    return (T_gosper, R_m60 @ T_gosper, T_gosper)
+
+
+def gosper_island(
+    iterations: int, backend: str = "sympy", min_length: float = 0.0
+) -> TPoints:
+    """Return Gosper island after a given number of `iterations`.
+
+    The island is computed exactly on its lattice (see
+    `gosper_lattice_island`), and its points are then represented according
+    to the named `backend`. Segments no longer than `min_length` are not
+    refined any further.
+    """
+    return gosper_lattice_island(iterations, min_length).to_backend(backend)
+
+
+def gosper_lattice_island(
+    iterations: int, min_length: float = 0.0
+) -> LatticePath:
+    """Return Gosper island after `iterations` with integer coordinates.
+
+    The island lies on the hexagonal lattice of Eisenstein integers, where
+    each iteration multiplies the denominator of the coordinates by 7.
+    """
+    lattice = Lattice(order=6)
+    return refined_lattice_path(
+        lattice_polygon_path(6, lattice),
+        lattice_rule(gosper_rule("numpy"), lattice, 7),
+        7,
+        iterations,
+        min_length,
+    )
+
+
+def iter_gosper_island(
+    iterations: int, backend: str = "sympy", chunk_size: int = 2**16
+) -> Iterator[TPoints]:
+    """Yield the points of Gosper island after `iterations` in chunks.
+
+    This is the lazy counterpart of `gosper_island`, whose memory use does not
+    grow with the number of points (see `iter_refined_path`).
+    """
+    points = regular_polygon_path(6, backend)
+    return iter_refined_path(
+        points, gosper_rule(backend), iterations, chunk_size
     )
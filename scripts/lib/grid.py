@@ -3,82 +3,537 @@
 __author__ = "ccornix"
 __copyright__ = "Copyright (C) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["generate_grid", "make_random_color_element_style_fn"]
+__all__ = [
+    "RandomColorStyles",
+    "generate_grid",
+    "iter_grid",
+    "make_random_color_element_style_fn",
+    "share_strokes",
+    "simplified_grid_paths",
+]
 
-from collections.abc import Callable, Sequence
-from sympy import Matrix
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from numpy.typing import ArrayLike, NDArray
 from typing import cast
+import math
+import numpy as np
 import operator
 import random
 
-from .path import shift
-from .svg import SVGPath, SVGPathStyle
-from .typing import TNum
+from .path import (
+    bounding_box,
+    clip_to_box,
+    shift,
+    simplification_mask,
+    simplified_path,
+    to_array,
+)
+from .profiling import Profiler
+from .rng import randbelow_indices
+from .svg import (
+    SVGCompoundPath,
+    SVGPath,
+    SVGPathDef,
+    SVGPathStyle,
+    SVGStreamedPath,
+    SVGUse,
+    intern_style,
+    path_data,
+)
+from .typing import TArray, TChunksFn, TNum, TPoints
+
+TElementStyleFn = Callable[[int, int], list[SVGPathStyle]]
+
+# Number of decimal places to which edge endpoints are quantized to find the
+# edges shared by neighboring cells
+EDGE_PRECISION = 6
 
 
 def generate_grid(
     *,
-    element_paths: Sequence[Sequence[Matrix]],
+    element_paths: Sequence["TPoints | TChunksFn"],
     spacings: tuple[int, int],
     offsets_fn: Callable[[int, int], tuple[TNum, TNum]] | None,
     resolution: tuple[int, int],
-    element_style_fn: Callable[[int, int], list[SVGPathStyle]],
-) -> list[SVGPath]:
+    element_style_fn: "TElementStyleFn | RandomColorStyles",
+    instance_id: str | None = None,
+    cull: bool = False,
+    clip: bool = False,
+    max_workers: int = 1,
+) -> list[SVGPath | SVGUse]:
     """Generate a whole grid of SVG paths.
 
+    See `iter_grid` for the description of the arguments. A list of SVG path
+    data is returned.
+    """
+    return list(
+        iter_grid(
+            element_paths=element_paths,
+            spacings=spacings,
+            offsets_fn=offsets_fn,
+            resolution=resolution,
+            element_style_fn=element_style_fn,
+            instance_id=instance_id,
+            cull=cull,
+            clip=clip,
+            max_workers=max_workers,
+        )
+    )
+
+
+def iter_grid(
+    *,
+    element_paths: Sequence["TPoints | TChunksFn"],
+    spacings: tuple[int, int],
+    offsets_fn: Callable[[int, int], tuple[TNum, TNum]] | None,
+    resolution: tuple[int, int],
+    element_style_fn: "TElementStyleFn | RandomColorStyles",
+    instance_id: str | None = None,
+    cull: bool = False,
+    clip: bool = False,
+    max_workers: int = 1,
+    precision: int | None = None,
+    profiler: Profiler | None = None,
+) -> Iterator[SVGPath | SVGUse]:
+    """Generate a whole grid of SVG paths one by one.
+
     The path(s) for a single element in the grid is (are) passed through
     `element_paths`, which is then cloned and layed out with given `spacings`.
     Function `offests_fn` may define an index-dependent offset, which can be
     used, for instance, to define a hexagonal grid with alternating horizontal
     row offsets. The `resolution` of the target image is used to estimate how
     many times elements needs to be repeated in the horizontal and vertical
-    directions. Finally, `element_style_fn` enables one to define an
-    index-dependent style for each path of a cell.
+    directions. If it is a multiple of the `spacings`, the cells along the
+    top and right edges repeat the styles of those along the bottom and left
+    edges, so that the image tiles seamlessly. Finally, `element_style_fn`
+    enables one to define an index-dependent style for each path of a cell.
+    If it is a `RandomColorStyles` instance, the styles of the whole grid are
+    drawn at once as an array of indices into its shared styles.
+
+    Element paths may be given either as sympy matrices or as NumPy arrays
+    (see `lib.path`), and the cloned paths keep the same representation.
 
-    A list of SVG path data is returned.
+    If `instance_id` is given, element paths are not cloned but defined once
+    with IDs prefixed by `instance_id`, and each cell instances them with a
+    shift and a style, which keeps the size of the SVG output independent of
+    the number of points per element. Instanced element paths may also be
+    given as functions producing their points in chunks (see `SVGPathDef`),
+    which are then never materialized.
+
+    If `cull` is true, paths whose bounding box (including strokes) lies
+    outside the `resolution` box are dropped. If `clip` is true, closed
+    element paths of cells straddling the edges of the `resolution` box are
+    also clipped to it (with a margin hiding the strokes along the clipping
+    edges), which yields NumPy arrays regardless of the representation of
+    `element_paths`. Open element paths are never clipped, and clipping is not
+    available for instanced paths. Neither culling nor clipping affects the
+    styles of the remaining paths.
+
+    SVG path data are yielded lazily in row-major order of the cells, so that
+    they can be written out without materializing the whole grid.
+
+    If `max_workers` is greater than one, blocks of rows are laid out by as
+    many worker processes, which receive the element paths only once, and
+    their paths are yielded in order. The workers also render the path data
+    of their paths at `precision` (see `SVGPath`), which is the bulk of the
+    work of writing them out. All styles are drawn beforehand in the same
+    order as otherwise, so the paths are the same for any number of workers.
+    Instanced paths and sympy element paths are always laid out in the
+    calling process.
+
+    If a `profiler` is given, the drawing of styles is attributed to its
+    "styling" stage.
     """
     dx, dy = spacings
     w, h = resolution
-    assert w % dx == 0 and h % dy == 0
-    Nx, Ny = w // dx, h // dy
+    # The grid only tiles seamlessly if it fits the image exactly, in which
+    # case the styles of the cells past the last row and column wrap around,
+    # and otherwise all cells covering the image are styled independently
+    Nx, Ny = -(-w // dx), -(-h // dy)
+    Px = Nx if w % dx == 0 else Nx + 1
+    Py = Ny if h % dy == 0 else Ny + 1
 
     offsets_fn = offsets_fn or (lambda ix, iy: (0, 0))
+    profiler = profiler or Profiler(enabled=False)
 
-    edge_style_cache: dict[tuple[int, int], list[SVGPathStyle]] = {}
+    if isinstance(element_style_fn, RandomColorStyles):
+        styles = element_style_fn.styles
+        with profiler.stage("styling"):
+            style_indices = _draw_grid_styles(
+                element_style_fn, (Px, Py), len(element_paths)
+            ).tolist()
 
-    def wrapped_style(ix: int, iy: int) -> list[SVGPathStyle]:
-        jx = ix % Nx
-        jy = iy % Ny
-        try:
-            style = edge_style_cache[jx, jy]
-        except KeyError:
-            style = element_style_fn(jx, jy)
-            if jx == 0 or jy == 0:
-                edge_style_cache[jx, jy] = style
-        return style
+        def wrapped_style(ix: int, iy: int) -> list[SVGPathStyle]:
+            return [styles[i] for i in style_indices[iy % Py][ix % Px]]
 
-    return [
-        SVGPath(
-            points=shift(
-                element_path,
-                # HACK: https://github.com/python/mypy/issues/7509
-                cast(
-                    tuple[TNum, TNum],
-                    tuple(
-                        map(
-                            operator.add,
-                            offsets_fn(ix, iy),
-                            (ix * dx, iy * dy),
-                        )
-                    ),
+    else:
+        style_fn = profiler.wrap("styling", element_style_fn)
+        edge_style_cache: dict[tuple[int, int], list[SVGPathStyle]] = {}
+
+        def wrapped_style(ix: int, iy: int) -> list[SVGPathStyle]:
+            jx = ix % Px
+            jy = iy % Py
+            try:
+                style = edge_style_cache[jx, jy]
+            except KeyError:
+                style = style_fn(jx, jy)
+                if jx == 0 or jy == 0:
+                    edge_style_cache[jx, jy] = style
+            return style
+
+    cells = (
+        (
+            ip,
+            # HACK: https://github.com/python/mypy/issues/7509
+            cast(
+                tuple[TNum, TNum],
+                tuple(
+                    map(
+                        operator.add,
+                        offsets_fn(ix, iy),
+                        (ix * dx, iy * dy),
+                    )
                 ),
             ),
-            style=wrapped_style(ix, iy)[ip],
+            wrapped_style(ix, iy)[ip],
         )
         for iy in range(Ny + 1)
         for ix in range(Nx + 1)
-        for ip, element_path in enumerate(element_paths)
+        for ip in range(len(element_paths))
+    )
+
+    assert not (clip and instance_id is not None)
+    assert max_workers >= 1
+    point_paths = (
+        [_materialized(path) for path in element_paths]
+        if instance_id is None
+        else []
+    )
+    layout = _CellLayout(
+        element_paths=point_paths,
+        boxes=(
+            [_bounding_box(path) for path in element_paths]
+            if cull or clip
+            else []
+        ),
+        closed=(
+            [_is_closed(to_array(path)) for path in point_paths]
+            if clip
+            else []
+        ),
+        resolution=resolution,
+        cull=cull,
+        clip=clip,
+        precision=precision,
+    )
+    if instance_id is not None:
+        defs = [
+            (
+                SVGPathDef(id=f"{instance_id}-{ip}", points_fn=element_path)
+                if callable(element_path)
+                else SVGPathDef(id=f"{instance_id}-{ip}", points=element_path)
+            )
+            for ip, element_path in enumerate(element_paths)
+        ]
+        for ip, offsets, style in cells:
+            if cull and not layout.placement(ip, offsets, style)[0]:
+                continue
+            yield SVGUse(path=defs[ip], offsets=offsets, style=style)
+        return
+    # Exact sympy points are laid out here too, as sending them back from
+    # workers costs more than shifting them, and they are slower to serialize
+    # once unpickled
+    if max_workers == 1 or not all(
+        isinstance(path, np.ndarray) for path in point_paths
+    ):
+        for ip, offsets, style in cells:
+            points = layout.points(ip, offsets, style)
+            if points is not None:
+                yield SVGPath(points=points, style=style)
+        return
+    # Draw all styles in row-major order up front, so that workers only
+    # place and render cells and the paths do not depend on their number
+    block_size = (Nx + 1) * len(element_paths)
+    block_size *= max(1, (Ny + 1) // (4 * max_workers))
+    all_cells = list(cells)
+    bounds = range(0, len(all_cells) + block_size, block_size)
+    blocks = [all_cells[start:stop] for start, stop in zip(bounds, bounds[1:])]
+    with ProcessPoolExecutor(
+        max_workers=min(max_workers, len(blocks)),
+        initializer=_initialize_worker,
+        initargs=(layout,),
+    ) as executor:
+        for block, block_rendered in zip(
+            blocks, executor.map(_render_cells_in_worker, blocks)
+        ):
+            for (ip, offsets, style), rendered in zip(block, block_rendered):
+                if rendered is not None:
+                    points, d = rendered
+                    yield SVGPath(
+                        points=points, style=style, rendered=(precision, d)
+                    )
+
+
+@dataclass(frozen=True, kw_only=True)
+class _CellLayout:
+    # Element paths of a grid and what is needed to place them in its cells,
+    # which is sent once to each worker process laying out rows of cells
+
+    element_paths: Sequence[TPoints]
+    boxes: list[tuple[float, float, float, float]]
+    closed: list[bool]
+    resolution: tuple[int, int]
+    cull: bool
+    clip: bool
+    precision: int | None
+
+    def placement(
+        self, ip: int, offsets: tuple[TNum, TNum], style: SVGPathStyle
+    ) -> tuple[bool, bool]:
+        # Return whether a cell path is visible and whether it is wholly
+        # inside the resolution box
+        w, h = self.resolution
+        ox, oy = offsets
+        margin = style.stroke_width / 2
+        xmin, ymin, xmax, ymax = self.boxes[ip]
+        x0, x1 = xmin + float(ox) - margin, xmax + float(ox) + margin
+        y0, y1 = ymin + float(oy) - margin, ymax + float(oy) + margin
+        is_visible = x1 > 0 and y1 > 0 and x0 < w and y0 < h
+        is_inside = x0 >= 0 and y0 >= 0 and x1 <= w and y1 <= h
+        return is_visible, is_inside
+
+    def points(
+        self, ip: int, offsets: tuple[TNum, TNum], style: SVGPathStyle
+    ) -> "TPoints | None":
+        # Return the points of a cell path, or None if it is culled or
+        # clipped away entirely
+        if self.cull or self.clip:
+            is_visible, is_inside = self.placement(ip, offsets, style)
+            if self.cull and not is_visible:
+                return None
+        points = shift(self.element_paths[ip], offsets)
+        # Open paths have no inside to clip and are left as they are
+        if self.clip and self.closed[ip] and not is_inside:
+            w, h = self.resolution
+            margin = style.stroke_width
+            points = clip_to_box(
+                to_array(points), (-margin, -margin, w + margin, h + margin)
+            )
+            if len(points) == 0:
+                return None
+        return points
+
+
+def _materialized(path: "TPoints | TChunksFn") -> TPoints:
+    # Return the points of an element path that is not streamed, as only
+    # instanced element paths may be
+    assert not callable(path), "streamed element paths must be instanced"
+    return path
+
+
+def _bounding_box(
+    path: "TPoints | TChunksFn",
+) -> tuple[float, float, float, float]:
+    # Return the bounding box of an element path, going through the chunks
+    # of a streamed one
+    if not callable(path):
+        return bounding_box(path)
+    boxes = np.array([bounding_box(chunk) for chunk in path() if len(chunk)])
+    xmin, ymin = boxes[:, :2].min(axis=0).tolist()
+    xmax, ymax = boxes[:, 2:].max(axis=0).tolist()
+    return xmin, ymin, xmax, ymax
+
+
+def _is_closed(points: TArray) -> bool:
+    # Return whether a path ends where it starts
+    return bool(np.array_equal(points[-1], points[0]))
+
+
+# Cell layout of a worker process, received once per worker
+_worker_layout: _CellLayout | None = None
+
+
+def _initialize_worker(layout: _CellLayout) -> None:
+    global _worker_layout
+    _worker_layout = layout
+
+
+def _render_cells_in_worker(
+    cells: list[tuple[int, tuple[TNum, TNum], SVGPathStyle]],
+) -> list[tuple[TPoints, str] | None]:
+    # Return the points and path data of cell paths, or None for those culled
+    # or clipped away entirely
+    assert _worker_layout is not None
+    precision = _worker_layout.precision
+    rendered: list[tuple[TPoints, str] | None] = []
+    for cell in cells:
+        points = _worker_layout.points(*cell)
+        rendered.append(
+            None if points is None else (points, path_data(points, precision))
+        )
+    return rendered
+
+
+def simplified_grid_paths(
+    element_paths: Sequence[TPoints],
+    *,
+    spacings: tuple[int, int],
+    offsets_fn: Callable[[int, int], tuple[TNum, TNum]] | None,
+    tolerance: float,
+) -> list[TPoints]:
+    """Return element paths simplified consistently across their grid.
+
+    Each path is simplified within `tolerance` by `simplified_path`, with
+    the junctions of the tiling pinned, i.e. the points it shares with two
+    or more other paths of the cells around it (laid out like by
+    `iter_grid`). A point shared with a neighboring path is then kept by
+    both paths if either keeps it, so that neighbors keep the same points
+    along their shared edges, which opens no slivers or overlaps between
+    them. Points are matched with their coordinates quantized to
+    `EDGE_PRECISION` decimal places.
+    """
+    offsets_fn = offsets_fn or (lambda ix, iy: (0, 0))
+    arrays = [to_array(path) for path in element_paths]
+    dx, dy = spacings
+    origin = np.array([float(d) for d in offsets_fn(0, 0)])
+
+    def quantized(array: TArray) -> list[tuple[int, int]]:
+        quantized = np.rint(array * 10**EDGE_PRECISION).astype(np.int64)
+        return list(map(tuple, quantized.tolist()))
+
+    # Quantized points of the paths of all cells around the one at the
+    # origin, shifted relative to it
+    neighborhood = [
+        (
+            ix == iy == 0,
+            ip,
+            np.array([float(d) for d in offsets_fn(ix, iy)])
+            + (ix * dx, iy * dy)
+            - origin,
+        )
+        for iy in (-1, 0, 1)
+        for ix in (-1, 0, 1)
+        for ip in range(len(arrays))
     ]
+    placed = [
+        (is_origin, ip, set(quantized(arrays[ip] + offset)))
+        for is_origin, ip, offset in neighborhood
+    ]
+    masks = []
+    for ip, array in enumerate(arrays):
+        counts: Counter[tuple[int, int]] = Counter()
+        for is_origin, jp, points in placed:
+            if not (is_origin and jp == ip):
+                counts.update(points)
+        pins = [i for i, p in enumerate(quantized(array)) if counts[p] >= 2]
+        masks.append(simplification_mask(array, tolerance, pins))
+    kept: set[tuple[int, int]] = set()
+    for _, ip, offset in neighborhood:
+        kept.update(quantized(arrays[ip][masks[ip]] + offset))
+    # Keep exactly the points kept by any path sharing them
+    return [
+        simplified_path(
+            path,
+            math.inf,
+            [i for i, p in enumerate(quantized(array)) if p in kept],
+        )
+        for path, array in zip(element_paths, arrays)
+    ]
+
+
+@dataclass(kw_only=True)
+class RandomColorStyles:
+    """Element style function choosing random colors for `count` paths.
+
+    If `fill_colors` has more than one color, a random one is chosen for each
+    path. The same applies for `stroke_colors`. A single fill (or stroke)
+    color is still drawn if `draw_single_fill` (or `draw_single_stroke`) is
+    true, which consumes random numbers like `random.choice` on a sequence of
+    one color. All combinations of colors are interned once into `styles`, so
+    that paths share a few style instances. Calling an instance with the
+    indices of a cell returns the styles of its paths.
+
+    Colors are drawn from the global random generator in the order of the
+    calls, unless a `seed` is given. The colors of each path are then a hash
+    of the seed, the cell indices and the path index (see `choose_at`), which
+    does not depend on any other cell.
+    """
+
+    fill_colors: tuple[str, ...]
+    stroke_colors: tuple[str, ...]
+    stroke_width: int
+    stroke_linecap: str = "square"
+    count: int = 1
+    seed: int | None = None
+    draw_single_fill: bool = False
+    draw_single_stroke: bool = False
+    styles: tuple[SVGPathStyle, ...] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Intern the styles of all combinations of colors."""
+        assert self.fill_colors and self.stroke_colors
+        self.styles = tuple(
+            intern_style(
+                fill_color=fill_color,
+                stroke_color=stroke_color,
+                stroke_width=self.stroke_width,
+                stroke_linecap=self.stroke_linecap,
+            )
+            for fill_color in self.fill_colors
+            for stroke_color in self.stroke_colors
+        )
+
+    def __call__(self, ix: int, iy: int) -> list[SVGPathStyle]:
+        """Return the styles of the paths of a cell."""
+        if self.seed is None:
+            indices = self.choose(self.count)
+        else:
+            indices = self.choose_at(ix, iy, np.arange(self.count))
+        return [self.styles[i] for i in indices.tolist()]
+
+    def choose(self, size: int) -> NDArray[np.intp]:
+        """Return indices into `styles` for `size` paths drawn at once.
+
+        The draws from the global random generator are the same as those of
+        choosing a fill color and then a stroke color with `random.choice` for
+        each path (skipping single colors unless drawn nonetheless), so seeded
+        results are unchanged.
+        """
+        nf, ns = len(self.fill_colors), len(self.stroke_colors)
+        draw_fill = nf > 1 or self.draw_single_fill
+        draw_stroke = ns > 1 or self.draw_single_stroke
+        if draw_fill and draw_stroke:
+            # Interleaved draws from two sequences are not vectorized
+            return np.array(
+                [
+                    random.randrange(nf) * ns + random.randrange(ns)
+                    for _ in range(size)
+                ],
+                dtype=np.intp,
+            )
+        if draw_fill:
+            return _randbelow_array(nf, size) * ns
+        if draw_stroke:
+            return _randbelow_array(ns, size)
+        return np.zeros(size, dtype=np.intp)
+
+    def choose_at(
+        self, ix: ArrayLike, iy: ArrayLike, ip: ArrayLike
+    ) -> NDArray[np.intp]:
+        """Return indices into `styles` for paths `ip` of cells `(ix, iy)`.
+
+        The indices are pure functions of the `seed`, which must be given,
+        and the index arrays, which are broadcast against each other. Cells
+        can thus be styled in any order, in parts or all at once.
+        """
+        assert self.seed is not None
+        nf, ns = len(self.fill_colors), len(self.stroke_colors)
+        fill_indices = randbelow_indices(nf, self.seed, ix, iy, ip, 0)
+        stroke_indices = randbelow_indices(ns, self.seed, ix, iy, ip, 1)
+        return fill_indices * ns + stroke_indices
 
 
 def make_random_color_element_style_fn(
@@ -87,31 +542,192 @@ def make_random_color_element_style_fn(
     stroke_width: int,
     stroke_linecap: str = "square",
     count: int = 1,
-) -> Callable[[int, int], list[SVGPathStyle]]:
+    seed: int | None = None,
+) -> RandomColorStyles:
     """Make an element style factory function for `count` number of paths.
 
     If `fill_color` is a sequence of colors, a random color is chosen from the
-    sequence. The same applies for `stroke_color`.
+    sequence, even if it has a single color. The same applies for
+    `stroke_color`. See `RandomColorStyles`, also for the description of
+    `seed`.
     """
+    return RandomColorStyles(
+        fill_colors=(
+            (fill_color,) if isinstance(fill_color, str) else tuple(fill_color)
+        ),
+        stroke_colors=(
+            (stroke_color,)
+            if isinstance(stroke_color, str)
+            else tuple(stroke_color)
+        ),
+        stroke_width=stroke_width,
+        stroke_linecap=stroke_linecap,
+        count=count,
+        seed=seed,
+        draw_single_fill=not isinstance(fill_color, str),
+        draw_single_stroke=not isinstance(stroke_color, str),
+    )
 
-    def make_element_styles(ix: int, iy: int) -> list[SVGPathStyle]:
-        """Return SVG path styles with a randomly selected fill color."""
-        return [
-            SVGPathStyle(
-                fill_color=(
-                    fill_color
-                    if isinstance(fill_color, str)
-                    else random.choice(fill_color)
-                ),
-                stroke_color=(
-                    stroke_color
-                    if isinstance(stroke_color, str)
-                    else random.choice(stroke_color)
-                ),
-                stroke_width=stroke_width,
-                stroke_linecap=stroke_linecap,
+
+def _draw_grid_styles(
+    element_style_fn: RandomColorStyles,
+    shape: tuple[int, int],
+    path_count: int,
+) -> NDArray[np.intp]:
+    # Return style indices of shape (Ny, Nx, path_count) for the cells of a
+    # grid drawn as one array. The draws match those of calling the style
+    # function in row-major order once for each path of an interior cell and
+    # once for an edge cell (whose styles are cached), so that wallpapers are
+    # reproduced exactly. Keyed styles are hashed for all cells at once.
+    Nx, Ny = shape
+    count = element_style_fn.count
+    assert path_count <= count
+    if element_style_fn.seed is not None:
+        iy, ix, ip = np.ogrid[:Ny, :Nx, :path_count]
+        return element_style_fn.choose_at(ix, iy, ip)
+    ix, iy = np.meshgrid(np.arange(Nx), np.arange(Ny))
+    is_edge = ((ix == 0) | (iy == 0)).reshape(-1, 1)
+    draws = np.where(is_edge, count, path_count * count)
+    starts = np.cumsum(draws).reshape(draws.shape) - draws
+    ip = np.arange(path_count)
+    picks = starts + np.where(is_edge, 0, ip * count) + ip
+    indices = element_style_fn.choose(int(draws.sum()))
+    return indices[picks].reshape(Ny, Nx, path_count)
+
+
+def share_strokes(
+    paths: Iterable[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse],
+) -> Iterator[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse]:
+    """Stroke the edges shared by neighboring paths only once.
+
+    Paths are yielded as they come but only filled, and the edges of their
+    outlines are stroked by open paths yielded after all others, so that the
+    edges shared by the cells of tilings are not stroked twice. Each edge is
+    stroked with the style of the last path containing it, which would be
+    painted on top otherwise. Edges are matched with their endpoints
+    quantized to `EDGE_PRECISION` decimal places. The stroke network consists
+    of runs of consecutive edges along the outlines, which are merged into one
+    compound path per stroke style. Instanced and streamed paths are left as
+    they are.
+
+    Since all strokes are painted after all fills, this is meant for paths
+    that overlap at most by their strokes like `merge_paths`. The outlines are
+    kept in memory until the end.
+    """
+    outlines: list[tuple[TArray, SVGPathStyle]] = []
+    for path in paths:
+        if isinstance(path, (SVGStreamedPath, SVGUse)):
+            yield path
+            continue
+        fill_style = intern_style(
+            stroke_width=0,
+            stroke_linecap=path.style.stroke_linecap,
+            stroke_color=path.style.stroke_color,
+            fill_color=path.style.fill_color,
+        )
+        if isinstance(path, SVGCompoundPath):
+            outlines.extend(
+                (to_array(points), path.style) for points in path.subpaths
             )
-            for _ in range(count)
-        ]
+            yield SVGCompoundPath(subpaths=path.subpaths, style=fill_style)
+        else:
+            outlines.append((to_array(path.points), path.style))
+            yield SVGPath(points=path.points, style=fill_style)
+    yield from _stroke_network(outlines)
 
-    return make_element_styles
+
+def _stroke_network(
+    outlines: list[tuple[TArray, SVGPathStyle]],
+) -> list[SVGCompoundPath]:
+    # Return compound paths stroking each distinct edge of the outlines once,
+    # with the style of its last occurrence
+    outlines = [(points, style) for points, style in outlines if len(points)]
+    if not outlines:
+        return []
+    points = np.concatenate([points for points, _ in outlines])
+    counts = np.array([len(points) - 1 for points, _ in outlines])
+    # Outline of each edge, whose index offsets the start point of the edge
+    # as each outline has one more point than edges
+    outline_indices = np.repeat(np.arange(len(outlines)), counts)
+    starts = np.arange(len(outline_indices)) + outline_indices
+    keys = np.rint(
+        np.concatenate([points[starts], points[starts + 1]], axis=1)
+        * 10**EDGE_PRECISION
+    ).astype(np.int64)
+    # Orient the keys of edges so that both directions of an edge match
+    is_reversed = (keys[:, 0] > keys[:, 2]) | (
+        (keys[:, 0] == keys[:, 2]) & (keys[:, 1] > keys[:, 3])
+    )
+    keys[is_reversed] = keys[is_reversed][:, [2, 3, 0, 1]]
+    # Find the last occurrence of each distinct edge as the first one in
+    # reversed order
+    _, first, inverse = np.unique(
+        keys[::-1], axis=0, return_index=True, return_inverse=True
+    )
+    last = len(keys) - 1 - first
+    is_stroked = last[inverse.reshape(-1)[::-1]] == np.arange(len(keys))
+    # Edges vanishing after quantization are not stroked
+    is_stroked &= np.any(keys[:, :2] != keys[:, 2:], axis=1)
+    # Find the first and last edges of runs of stroked edges along outlines
+    ends = np.cumsum(counts)
+    is_first = np.zeros(len(keys), dtype=bool)
+    is_first[ends[counts > 0] - counts[counts > 0]] = True
+    is_last = np.zeros(len(keys), dtype=bool)
+    is_last[ends[counts > 0] - 1] = True
+    run_firsts = np.flatnonzero(
+        is_stroked & (is_first | ~np.roll(is_stroked, 1))
+    )
+    run_lasts = np.flatnonzero(
+        is_stroked & (is_last | ~np.roll(is_stroked, -1))
+    )
+    network: dict[SVGPathStyle, SVGCompoundPath] = {}
+    for i, j, k in zip(
+        run_firsts.tolist(),
+        run_lasts.tolist(),
+        outline_indices[run_firsts].tolist(),
+    ):
+        style = outlines[k][1]
+        stroke_style = intern_style(
+            stroke_width=style.stroke_width,
+            stroke_linecap=style.stroke_linecap,
+            stroke_color=style.stroke_color,
+            fill_color="none",
+        )
+        try:
+            compound_path = network[stroke_style]
+        except KeyError:
+            compound_path = network[stroke_style] = SVGCompoundPath(
+                subpaths=[], style=stroke_style
+            )
+        start, stop = i + k, j + k + 2
+        compound_path.subpaths.append(points[start:stop])
+    return list(network.values())
+
+
+def _randbelow_array(n: int, size: int) -> NDArray[np.intp]:
+    # Return `size` random integers below `n` from the global random
+    # generator, equal to those of as many `random.choice` calls on a sequence
+    # of length `n`. Each call takes the top `n.bit_length()` bits of the next
+    # 32-bit Mersenne Twister output and rejects values not below `n`, which
+    # is replayed here on outputs drawn in bulk by `random.getrandbits`. This
+    # mirrors `Random._randbelow_with_getrandbits` as verified against CPython
+    # 3.11, which also draws for `n == 1` (one bit, rejected if set).
+    if size == 0:
+        return np.zeros(0, dtype=np.intp)
+    k = n.bit_length()
+    state = random.getstate()
+    values = np.zeros(0, dtype=np.uint32)
+    accepted = np.zeros(0, dtype=np.intp)
+    while len(accepted) < size:
+        # Expected number of outputs for the missing values with some slack
+        m = int((size - len(accepted)) * 2**k / n * 1.1) + 64
+        words = np.frombuffer(
+            random.getrandbits(32 * m).to_bytes(4 * m, "little"),
+            dtype="<u4",
+        )
+        values = np.concatenate((values, words >> (32 - k)))
+        accepted = np.flatnonzero(values < n)
+    # Advance the generator by exactly the outputs used
+    random.setstate(state)
+    random.getrandbits(32 * (int(accepted[size - 1]) + 1))
+    return values[accepted[:size]].astype(np.intp)
@@ -3,35 +3,86 @@
 __author__ = "ccornix"
 __copyright__ = "Copyright (C) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["koch_island"]
+__all__ = [
+    "iter_koch_island",
+    "koch_island",
+    "koch_lattice_island",
+    "koch_rule",
+]
 
-from sympy import Matrix, pi
+from collections.abc import Iterator
+import functools
 
-from .functools import repeated
-from .path import points_to_segments, segments_to_points, refined_segments
-from .poly import regular_polygon_path, rotation_matrix
+from .backend import matrix, numbers
+from .lattice import (
+    Lattice,
+    LatticePath,
+    lattice_polygon_path,
+    lattice_rule,
+    refined_lattice_path,
+)
+from .path import iter_refined_path, rotation_matrix
+from .poly import regular_polygon_path
+from .typing import TMatrix, TPoints
 
-R_m60 = rotation_matrix(-pi / 3)
-R_p60 = rotation_matrix(pi / 3)
 
+@functools.cache
+def koch_rule(backend: str = "sympy") -> tuple[TMatrix, ...]:
+    """Return the Koch island rule of the named `backend`.
 
-def koch_rule(segment: Matrix) -> list[Matrix]:
-    """Refine a `segment` vector following the Koch island rule.
+    The rule consists of the transformations of a segment vector into its
+    refined segment vectors.
 
     Reference:
     https://mathworld.wolfram.com/KochSnowflake.html
     """
-    v1 = segment / 3
-    v2 = R_p60 * v1
-    v3 = R_m60 * v1
-    return [v1, v2, v3, v1]
-
-
-def koch_island(iterations: int) -> list[Matrix]:
-    """Return Koch island after a given number of `iterations`."""
-    points = regular_polygon_path(3)
-    segments = points_to_segments(points)
-    return segments_to_points(
-        list(repeated(refined_segments, iterations, koch_rule)(segments)),
-        points[0],
+    pi = numbers(backend).pi
+    R_m60 = rotation_matrix(-pi / 3, backend)
+    R_p60 = rotation_matrix(pi / 3, backend)
+    identity = matrix([[1, 0], [0, 1]], backend)
+    return (identity / 3, R_p60 / 3, R_m60 / 3, identity / 3)
+
+
+def koch_island(
+    iterations: int, backend: str = "sympy", min_length: float = 0.0
+) -> TPoints:
+    """Return Koch island after a given number of `iterations`.
+
+    The island is computed exactly on its lattice (see
+    `koch_lattice_island`), and its points are then represented according
+    to the named `backend`. Segments no longer than `min_length` are not
+    refined any further.
+    """
+    return koch_lattice_island(iterations, min_length).to_backend(backend)
+
+
+def koch_lattice_island(
+    iterations: int, min_length: float = 0.0
+) -> LatticePath:
+    """Return Koch island after `iterations` with integer coordinates.
+
+    The island lies on the hexagonal lattice of Eisenstein integers, where
+    each iteration multiplies the denominator of the coordinates by 3.
+    """
+    lattice = Lattice(order=6)
+    return refined_lattice_path(
+        lattice_polygon_path(3, lattice),
+        lattice_rule(koch_rule("numpy"), lattice, 3),
+        3,
+        iterations,
+        min_length,
+    )
+
+
+def iter_koch_island(
+    iterations: int, backend: str = "sympy", chunk_size: int = 2**16
+) -> Iterator[TPoints]:
+    """Yield the points of Koch island after `iterations` in chunks.
+
+    This is the lazy counterpart of `koch_island`, whose memory use does not
+    grow with the number of points (see `iter_refined_path`).
+    """
+    points = regular_polygon_path(3, backend)
+    return iter_refined_path(
+        points, koch_rule(backend), iterations, chunk_size
     )
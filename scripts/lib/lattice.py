@@ -0,0 +1,212 @@
+"""Exact path points with integer coordinates on planar lattices.
+
+The Koch and Gosper islands lie on the hexagonal lattice of Eisenstein
+integers, and the Minkowski island on the square lattice of Gaussian integers.
+The rules of these islands map their lattices onto themselves up to a
+rational factor, so their points can be refined exactly by integer arithmetic
+on compact int64 arrays, and converted to sympy or float points only at the
+end.
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (C) 2024 ccornix"
+__license__ = "MIT"
+__all__ = [
+    "Lattice",
+    "LatticePath",
+    "lattice_polygon_path",
+    "lattice_rule",
+    "refined_lattice_path",
+]
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from numpy.typing import NDArray
+import math
+import numpy as np
+
+from .backend import BACKENDS, matrix, numbers
+from .typing import TMatrix, TPoints
+
+# Bound on the magnitude of lattice coordinates within int64
+MAX_COORDINATE = 2**63
+
+
+@dataclass(frozen=True, kw_only=True)
+class Lattice:
+    """Planar lattice invariant under rotations by `2 * pi / order`.
+
+    The lattice is spanned by the unit vector `u = (0, 1)` and its rotation
+    `v` counter-clockwise by `2 * pi / order`, which yields a lattice for
+    orders 3, 4 and 6 only by the crystallographic restriction.
+    """
+
+    order: int
+
+    def __post_init__(self) -> None:
+        """Perform additional checks at run-time."""
+        assert self.order in (3, 4, 6)
+
+    def basis(self, backend: str = "sympy") -> TMatrix:
+        """Return the matrix of basis vectors `u` and `v` as its columns.
+
+        The matrix is represented according to the named `backend`.
+        """
+        num = numbers(backend)
+        theta = 2 * num.pi / self.order
+        return matrix([[0, -num.sin(theta)], [1, num.cos(theta)]], backend)
+
+    def rotation(self) -> NDArray[np.int64]:
+        """Return the integer matrix of the rotation by `2 * pi / order`.
+
+        The rotation takes `u` to `v`, and `v` to `2 * cos(2 * pi / order) *
+        v - u`, where the factor is an integer.
+        """
+        trace = round(2 * math.cos(2 * math.pi / self.order))
+        return np.array([[0, -1], [1, trace]], dtype=np.int64)
+
+
+@dataclass(frozen=True, kw_only=True)
+class LatticePath:
+    """Path points with integer coordinates on a lattice.
+
+    Point `i` is `(coords[i, 0] * u + coords[i, 1] * v) / denominator`, where
+    `u` and `v` are the basis vectors of the `lattice`.
+    """
+
+    lattice: Lattice
+    coords: NDArray[np.int64]
+    denominator: int = 1
+
+    def __post_init__(self) -> None:
+        """Perform additional checks at run-time."""
+        assert self.coords.ndim == 2 and self.coords.shape[1] == 2
+        assert self.coords.dtype == np.int64
+        assert isinstance(self.denominator, int) and self.denominator >= 1
+
+    def to_backend(self, backend: str) -> TPoints:
+        """Return the points in the representation of the named `backend`.
+
+        Exact points are sympy matrices with rational coordinates in the
+        basis of the lattice. Array points are rounded to floats only here.
+        """
+        assert backend in BACKENDS
+        if backend == "numpy":
+            B = self.lattice.basis("numpy")
+            return self.coords @ B.T / self.denominator
+        from sympy import Matrix, Rational
+
+        (ux, vx), (uy, vy) = self.lattice.basis("sympy").tolist()
+        points = []
+        for a, b in self.coords.tolist():
+            ra, rb = Rational(a, self.denominator), Rational(
+                b, self.denominator
+            )
+            points.append(Matrix([ux * ra + vx * rb, uy * ra + vy * rb]))
+        return points
+
+
+def lattice_polygon_path(n: int, lattice: Lattice) -> LatticePath:
+    """Return points of a regular polygonal path with `n` sides on a lattice.
+
+    Like `regular_polygon_path`, the path starts at `u = (0, 1)` and goes
+    clockwise, which requires `n` to divide the order of the lattice.
+    """
+    assert n >= 3 and lattice.order % n == 0
+    # The inverse of the rotation by 2 * pi / order, whose determinant is 1
+    (a, b), (c, d) = lattice.rotation().tolist()
+    step = np.linalg.matrix_power(
+        np.array([[d, -b], [-c, a]], dtype=np.int64), lattice.order // n
+    )
+    coords = np.empty((n + 1, 2), dtype=np.int64)
+    coords[0] = (1, 0)
+    for i in range(n):
+        coords[i + 1] = step @ coords[i]
+    assert np.array_equal(coords[-1], coords[0])
+    return LatticePath(lattice=lattice, coords=coords)
+
+
+def lattice_rule(
+    transforms: Sequence[TMatrix], lattice: Lattice, denominator: int
+) -> NDArray[np.int64]:
+    """Return a rule of 2x2 `transforms` as integer matrices on a lattice.
+
+    Each transform is expressed in the basis of the `lattice` and multiplied
+    by the `denominator`, which must make all its entries integers.
+    """
+    B = np.asarray(lattice.basis("numpy"))
+    batch = np.array(transforms, dtype=np.float64)
+    scaled = denominator * (np.linalg.inv(B) @ batch @ B)
+    rule: NDArray[np.int64] = np.rint(scaled).astype(np.int64)
+    assert np.allclose(rule, scaled, rtol=0, atol=1e-9)
+    return rule
+
+
+def refined_lattice_path(
+    path: LatticePath,
+    transforms: NDArray[np.int64],
+    denominator: int,
+    iterations: int,
+    min_length: float = 0.0,
+) -> LatticePath:
+    """Return a lattice path refined a given number of `iterations`.
+
+    This is the exact counterpart of `iter_refined_path` with the (k, 2, 2)
+    integer `transforms` of `lattice_rule`, which are to be divided by
+    `denominator`. Rather than dividing, all coordinates are multiplied by the
+    `denominator` in each iteration, as is the denominator of the path.
+
+    For a level of detail, segments no longer than `min_length` are not
+    refined any further, and refinement stops early once all segments are
+    that short.
+    """
+    assert transforms.ndim == 3 and transforms.shape[1:] == (2, 2)
+    segments = np.diff(path.coords, axis=0)
+    initial_point = path.coords[0]
+    # Rule out int64 overflow in advance: the coordinates of all points are
+    # bounded by those of the initial point plus the sum of the magnitudes of
+    # all segments, which grows at most by the sum of the column norms of
+    # the transforms per iteration
+    growth = int(np.abs(transforms).sum(axis=1).max(axis=1).sum())
+    growth = max(growth, denominator)
+    bound = int(np.abs(initial_point).max()) * denominator**iterations
+    bound += int(np.abs(segments).sum()) * growth**iterations
+    assert bound < MAX_COORDINATE, "too many iterations for int64"
+    B = np.asarray(path.lattice.basis("numpy"))
+    scale = path.denominator
+    for _ in range(iterations):
+        if min_length > 0:
+            vectors = segments @ B.T / scale
+            refine = np.hypot(vectors[:, 0], vectors[:, 1]) > min_length
+            if not refine.any():
+                break
+            segments = _refined_lattice_segments(
+                segments, transforms, denominator, refine
+            )
+        else:
+            segments = np.einsum("kij,mj->mki", transforms, segments).reshape(
+                -1, 2
+            )
+        initial_point = initial_point * denominator
+        scale *= denominator
+    coords = np.empty((len(segments) + 1, 2), dtype=np.int64)
+    coords[0] = initial_point
+    np.cumsum(segments, axis=0, out=coords[1:])
+    coords[1:] += initial_point
+    return LatticePath(lattice=path.lattice, coords=coords, denominator=scale)
+
+
+def _refined_lattice_segments(
+    segments: NDArray[np.int64],
+    transforms: NDArray[np.int64],
+    denominator: int,
+    refine: NDArray[np.bool_],
+) -> NDArray[np.int64]:
+    # Refine the masked segments and scale up the others in place of them
+    counts = np.where(refine, len(transforms), 1)
+    starts = np.cumsum(counts) - counts
+    refined = np.empty((int(counts.sum()), 2), dtype=np.int64)
+    positions = starts[refine, np.newaxis] + np.arange(len(transforms))
+    refined[positions] = np.einsum("kij,mj->mki", transforms, segments[refine])
+    refined[starts[~refine]] = segments[~refine] * denominator
+    return refined
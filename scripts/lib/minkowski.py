@@ -3,42 +3,87 @@
 __author__ = "ccornix"
 __copyright__ = "Copyright (C) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["minkowski_island"]
+__all__ = [
+    "iter_minkowski_island",
+    "minkowski_island",
+    "minkowski_lattice_island",
+    "minkowski_rule",
+]
 
-from sympy import Matrix, Rational, pi
+from collections.abc import Iterator
+import functools
 
-from .functools import repeated
-from .path import (
-    points_to_segments,
-    segments_to_points,
-    refined_segments,
-    rotation_matrix,
+from .backend import matrix, numbers
+from .lattice import (
+    Lattice,
+    LatticePath,
+    lattice_polygon_path,
+    lattice_rule,
+    refined_lattice_path,
 )
+from .path import iter_refined_path, rotation_matrix
 from .poly import regular_polygon_path
+from .typing import TMatrix, TPoints
 
-R_m90 = rotation_matrix(-pi / 2)
 
-# Transformation: scale edge by 1/sqrt(5) and rotate counter-clockwise by
-# arcsin(1/sqrt(5))
-T_minkowski = Rational(1, 5) * Matrix([[2, -1], [1, 2]])
+@functools.cache
+def minkowski_rule(backend: str = "sympy") -> tuple[TMatrix, ...]:
+    """Return the Minkowski island rule of the named `backend`.
 
-
-def minkowski_rule(segment: Matrix) -> list[Matrix]:
-    """Refine a `segment` vector following the Minkowski rule.
+    The rule consists of the transformations of a segment vector into its
+    refined segment vectors.
 
     Reference:
     https://en.wikipedia.org/wiki/Minkowski_sausage
     """
-    v1 = T_minkowski * segment
-    v2 = R_m90 * v1
-    return [v1, v2, v1]
-
-
-def minkowski_island(iterations: int) -> list[Matrix]:
-    """Return Minkowski island after a given number of `iterations`."""
-    points = regular_polygon_path(4)
-    segments = points_to_segments(points)
-    return segments_to_points(
-        list(repeated(refined_segments, iterations, minkowski_rule)(segments)),
-        points[0],
+    num = numbers(backend)
+    R_m90 = rotation_matrix(-num.pi / 2, backend)
+    # Transformation: scale edge by 1/sqrt(5) and rotate counter-clockwise by
+    # arcsin(1/sqrt(5))
+    T_minkowski = num.rational(1, 5) * matrix([[2, -1], [1, 2]], backend)
+    return (T_minkowski, R_m90 @ T_minkowski, T_minkowski)
+
+
+def minkowski_island(
+    iterations: int, backend: str = "sympy", min_length: float = 0.0
+) -> TPoints:
+    """Return Minkowski island after a given number of `iterations`.
+
+    The island is computed exactly on its lattice (see
+    `minkowski_lattice_island`), and its points are then represented according
+    to the named `backend`. Segments no longer than `min_length` are not
+    refined any further.
+    """
+    return minkowski_lattice_island(iterations, min_length).to_backend(backend)
+
+
+def minkowski_lattice_island(
+    iterations: int, min_length: float = 0.0
+) -> LatticePath:
+    """Return Minkowski island after `iterations` with integer coordinates.
+
+    The island lies on the square lattice of Gaussian integers, where
+    each iteration multiplies the denominator of the coordinates by 5.
+    """
+    lattice = Lattice(order=4)
+    return refined_lattice_path(
+        lattice_polygon_path(4, lattice),
+        lattice_rule(minkowski_rule("numpy"), lattice, 5),
+        5,
+        iterations,
+        min_length,
+    )
+
+
+def iter_minkowski_island(
+    iterations: int, backend: str = "sympy", chunk_size: int = 2**16
+) -> Iterator[TPoints]:
+    """Yield the points of Minkowski island after `iterations` in chunks.
+
+    This is the lazy counterpart of `minkowski_island`, whose memory use does
+    not grow with the number of points (see `iter_refined_path`).
+    """
+    points = regular_polygon_path(4, backend)
+    return iter_refined_path(
+        points, minkowski_rule(backend), iterations, chunk_size
     )
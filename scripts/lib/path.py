@@ -1,9 +1,25 @@
-"""Functions for transforming points of paths with straight line segments."""
+"""Functions for transforming points of paths with straight line segments.
+
+Path points are represented either as a sequence of exact 2x1 sympy matrices
+or as a single (N, 2) NumPy array of floats. The former serves as an exact
+reference, while the latter allows each transformation to be carried out as
+one vectorized operation. All transformations accept and return either
+representation.
+
+Sympy is only imported once exact points are actually processed, so that the
+NumPy representation can be used without paying its import cost.
+"""
+
+from __future__ import annotations
 
 __author__ = "ccornix"
 __copyright__ = "Copyright (C) 2024 ccornix"
 __license__ = "MIT"
 __all__ = [
+    "BACKENDS",
+    "bounding_box",
+    "clip_to_box",
+    "iter_refined_path",
     "points_to_segments",
     "refined_segments",
     "rotate",
@@ -11,66 +27,149 @@ __all__ = [
     "scale",
     "segments_to_points",
     "shift",
+    "simplification_mask",
+    "simplified_path",
+    "to_array",
+    "to_backend",
+    "to_matrices",
 ]
 
-from collections.abc import Callable, Iterable, Sequence
-from itertools import accumulate, chain, pairwise
-from sympy import Matrix, cos, shape, sin
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from itertools import accumulate, chain, islice, pairwise
+from numpy.typing import NDArray
+from typing import TYPE_CHECKING, overload
+import numpy as np
 import operator
 
-from .typing import TNum
+from .backend import BACKENDS, matrix, numbers
+from .functools import repeated
+from .typing import TArray, TMatrix, TNum, TPoints
+
+if TYPE_CHECKING:
+    from sympy import Matrix
+
 
+@overload
+def points_to_segments(points: Sequence[Matrix]) -> list[Matrix]: ...
 
-def points_to_segments(points: Sequence[Matrix]) -> list[Matrix]:
+
+@overload
+def points_to_segments(points: TArray) -> TArray: ...
+
+
+def points_to_segments(points: TPoints) -> list[Matrix] | TArray:
     """Return segment vectors from path point coordinates."""
+    if isinstance(points, np.ndarray):
+        assert _is_2d_array(points)
+        return np.diff(points, axis=0)
     assert all(_is_2d_vector(v) for v in points)
     return [x1 - x0 for x0, x1 in pairwise(points)]
 
 
+@overload
 def segments_to_points(
     segments: Sequence[Matrix], initial_point: Matrix
-) -> list[Matrix]:
+) -> list[Matrix]: ...
+
+
+@overload
+def segments_to_points(segments: TArray, initial_point: TArray) -> TArray: ...
+
+
+def segments_to_points(
+    segments: TPoints, initial_point: Matrix | TArray
+) -> list[Matrix] | TArray:
     """Construct path points from segment vectors and an initial point."""
+    if isinstance(segments, np.ndarray):
+        assert _is_2d_array(segments)
+        initial_point = np.asarray(initial_point, dtype=np.float64)
+        points = np.empty((len(segments) + 1, 2))
+        points[0] = initial_point
+        np.cumsum(segments, axis=0, out=points[1:])
+        points[1:] += initial_point
+        return points
     assert all(_is_2d_vector(v) for v in segments)
     return list(accumulate(segments, operator.add, initial=initial_point))
 
 
+@overload
 def scale(
     points: Sequence[Matrix], factors: tuple[TNum, TNum]
-) -> list[Matrix]:
+) -> list[Matrix]: ...
+
+
+@overload
+def scale(points: TArray, factors: tuple[TNum, TNum]) -> TArray: ...
+
+
+def scale(
+    points: TPoints, factors: tuple[TNum, TNum]
+) -> list[Matrix] | TArray:
     """Scale path points anisotropically with given factors."""
+    if isinstance(points, np.ndarray):
+        assert _is_2d_array(points)
+        scaled: TArray = points * np.array([float(f) for f in factors])
+        return scaled
     assert all(_is_2d_vector(v) for v in points)
     sx, sy = factors
-    S = Matrix([[sx, 0], [0, sy]])
+    S = matrix([[sx, 0], [0, sy]], "sympy")
     return [S * v for v in points]
 
 
+@overload
 def shift(
     points: Sequence[Matrix], offsets: tuple[TNum, TNum]
-) -> list[Matrix]:
+) -> list[Matrix]: ...
+
+
+@overload
+def shift(points: TArray, offsets: tuple[TNum, TNum]) -> TArray: ...
+
+
+def shift(
+    points: TPoints, offsets: tuple[TNum, TNum]
+) -> list[Matrix] | TArray:
     """Shift path points by given offsets."""
+    if isinstance(points, np.ndarray):
+        assert _is_2d_array(points)
+        shifted: TArray = points + np.array([float(d) for d in offsets])
+        return shifted
     assert all(_is_2d_vector(v) for v in points)
-    d = Matrix(offsets)
+    d = matrix([[offset] for offset in offsets], "sympy")
     return [v + d for v in points]
 
 
-def rotate(points: Sequence[Matrix], theta: TNum) -> list[Matrix]:
+@overload
+def rotate(points: Sequence[Matrix], theta: TNum) -> list[Matrix]: ...
+
+
+@overload
+def rotate(points: TArray, theta: TNum) -> TArray: ...
+
+
+def rotate(points: TPoints, theta: TNum) -> list[Matrix] | TArray:
     """Rotate path points by given angle.
 
     The angle `theta` of rotation is expected in radians.
     """
+    if isinstance(points, np.ndarray):
+        assert _is_2d_array(points)
+        R = rotation_matrix(float(theta), "numpy")
+        rotated: TArray = points @ R.T
+        return rotated
     assert all(_is_2d_vector(v) for v in points)
     R = rotation_matrix(theta)
     return [R * v for v in points]
 
 
-def rotation_matrix(theta: TNum) -> Matrix:
-    """Return a rotation matrix.
+def rotation_matrix(theta: TNum, backend: str = "sympy") -> TMatrix:
+    """Return a rotation matrix of the named `backend`.
 
     The angle `theta` of rotation is expected in radians.
     """
-    c, s = cos(theta), sin(theta)
-    return Matrix([[c, -s], [s, c]])
+    num = numbers(backend)
+    c, s = num.cos(theta), num.sin(theta)
+    return matrix([[c, -s], [s, c]], backend)
 
 
 def refined_segments(
@@ -84,5 +183,252 @@ def refined_segments(
     return chain.from_iterable(rule(segment) for segment in segments)
 
 
+@overload
+def iter_refined_path(
+    points: Sequence[Matrix],
+    transforms: Sequence[TMatrix],
+    iterations: int,
+    chunk_size: int = 2**16,
+) -> Iterator[list[Matrix]]: ...
+
+
+@overload
+def iter_refined_path(
+    points: TArray,
+    transforms: Sequence[TMatrix],
+    iterations: int,
+    chunk_size: int = 2**16,
+) -> Iterator[TArray]: ...
+
+
+def iter_refined_path(
+    points: TPoints,
+    transforms: Sequence[TMatrix],
+    iterations: int,
+    chunk_size: int = 2**16,
+) -> Iterator[list[Matrix] | TArray]:
+    """Yield path `points` refined a given number of `iterations` in chunks.
+
+    In each iteration, every segment vector of the path is replaced by the
+    sequence of vectors obtained by applying each of the 2x2 `transforms` to
+    it. The `transforms` are given as sympy matrices for exact points, and
+    in either representation for array points. The refined points are
+    produced by a depth-first traversal of the refinement tree of each
+    segment, so that memory use is bounded by `iterations` and `chunk_size`
+    instead of growing with the number of points. The chunks of consecutive
+    points (lists of sympy matrices or arrays) concatenate to the refined
+    path.
+
+    For array points, the transforms along all paths from a node of the tree
+    to its leaves are composed in advance for as many levels as fit into
+    `chunk_size`, so that each node at that height is refined into a chunk of
+    points in one batch.
+    """
+    if not isinstance(points, np.ndarray):
+
+        def rule(segment: Matrix) -> list[Matrix]:
+            return [T * segment for T in transforms]
+
+        segments = repeated(refined_segments, iterations, rule)(
+            points_to_segments(points)
+        )
+        refined = accumulate(segments, operator.add, initial=points[0])
+        while chunk := list(islice(refined, chunk_size)):
+            yield chunk
+        return
+
+    batch = np.array(transforms, dtype=np.float64)
+    height = 0
+    while height < iterations and len(batch) ** (height + 1) <= chunk_size:
+        height += 1
+    leaf_transforms = np.eye(2)[np.newaxis]
+    for _ in range(height):
+        leaf_transforms = np.einsum(
+            "kij,ljm->lkim", batch, leaf_transforms
+        ).reshape(-1, 2, 2)
+
+    def visit(segment: TArray, depth: int) -> Iterator[TArray]:
+        # Yield the refined segments at a given depth below a segment
+        if depth == 0:
+            yield segment
+            return
+        for T in batch:
+            yield from visit(T @ segment, depth - 1)
+
+    current = np.asarray(points[0], dtype=np.float64)
+    pending = current[np.newaxis]
+    for segment in points_to_segments(points):
+        for node in visit(segment, iterations - height):
+            leaves = current + np.cumsum(leaf_transforms @ node, axis=0)
+            current = leaves[-1]
+            if len(pending) > 1:
+                yield pending
+                pending = leaves
+            else:
+                pending = np.concatenate([pending, leaves])
+    if np.array_equal(points[-1], points[0]):
+        # Keep closed paths closed despite accumulated rounding errors
+        pending[-1] = points[0]
+    yield pending
+
+
+@overload
+def simplified_path(
+    points: Sequence[Matrix], tolerance: float, pins: Iterable[int] = ()
+) -> list[Matrix]: ...
+
+
+@overload
+def simplified_path(
+    points: TArray, tolerance: float, pins: Iterable[int] = ()
+) -> TArray: ...
+
+
+def simplified_path(
+    points: TPoints, tolerance: float, pins: Iterable[int] = ()
+) -> list[Matrix] | TArray:
+    """Return a subset of path points by Douglas-Peucker simplification.
+
+    The points kept are those of `simplification_mask`, see there for the
+    description of the arguments. Exact points are kept as they are.
+    """
+    keep = simplification_mask(points, tolerance, pins)
+    if isinstance(points, np.ndarray):
+        simplified: TArray = points[keep]
+        return simplified
+    return [v for v, kept in zip(points, keep) if kept]
+
+
+def simplification_mask(
+    points: TPoints, tolerance: float, pins: Iterable[int] = ()
+) -> NDArray[np.bool_]:
+    """Return which path points Douglas-Peucker simplification keeps.
+
+    Starting from the endpoints and the points at the indices `pins`, the
+    point farthest from the segment between two consecutive kept points is
+    kept as well as long as its distance exceeds `tolerance`, so that the
+    simplified path deviates from the original by at most `tolerance`. The
+    endpoints are always kept, which keeps closed paths closed, and pinned
+    points split the path into parts simplified independently. Distances
+    are measured in floats.
+    """
+    array = to_array(points)
+    keep = np.zeros(len(array), dtype=bool)
+    keep[[0, -1]] = True
+    keep[list(pins)] = True
+    kept = np.flatnonzero(keep).tolist()
+    ranges = list(zip(kept, kept[1:]))
+    while ranges:
+        first, last = ranges.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(
+            array[first:last][1:], array[first], array[last]
+        )
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            middle = first + 1 + farthest
+            keep[middle] = True
+            ranges += [(first, middle), (middle, last)]
+    return keep
+
+
+def bounding_box(points: TPoints) -> tuple[float, float, float, float]:
+    """Return the bounding box `(xmin, ymin, xmax, ymax)` of path points."""
+    array = to_array(points)
+    (xmin, ymin), (xmax, ymax) = array.min(axis=0), array.max(axis=0)
+    return float(xmin), float(ymin), float(xmax), float(ymax)
+
+
+def clip_to_box(
+    points: TArray, box: tuple[float, float, float, float]
+) -> TArray:
+    """Clip a closed polygonal path to a `box` given as its bounding box.
+
+    The Sutherland-Hodgman algorithm is applied with each side of the box
+    clipping all polygon edges at once. The returned path is closed, and it is
+    empty if the polygon lies outside the box.
+    """
+    assert _is_2d_array(points)
+    assert np.array_equal(points[-1], points[0])
+    xmin, ymin, xmax, ymax = box
+    ring = points[:-1]
+    for axis, bound, sign in (
+        (0, xmin, -1),
+        (1, ymin, -1),
+        (0, xmax, 1),
+        (1, ymax, 1),
+    ):
+        if len(ring) == 0:
+            break
+        ring = _clip_ring(ring, axis, bound, sign)
+    clipped: TArray = np.concatenate([ring, ring[:1]])
+    return clipped
+
+
+def _clip_ring(ring: TArray, axis: int, bound: float, sign: int) -> TArray:
+    # Clip an open polygon ring to the half-plane where
+    # sign * (coordinate along axis - bound) <= 0
+    following = np.roll(ring, -1, axis=0)
+    c0, c1 = ring[:, axis], following[:, axis]
+    inside0, inside1 = sign * (c0 - bound) <= 0, sign * (c1 - bound) <= 0
+    crossing = inside0 != inside1
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(crossing, (bound - c0) / (c1 - c0), 0)
+    intersections = ring + t[:, np.newaxis] * (following - ring)
+    intersections[:, axis] = np.where(crossing, bound, intersections[:, axis])
+    # For each edge, emit the intersection (if any) followed by the endpoint
+    # (if inside)
+    candidates = np.stack([intersections, following], axis=1)
+    mask = np.stack([crossing, inside1], axis=1)
+    clipped: TArray = candidates[mask]
+    return clipped
+
+
+def to_array(points: TPoints) -> TArray:
+    """Return path points as an (N, 2) array of floats."""
+    if isinstance(points, np.ndarray):
+        assert _is_2d_array(points)
+        return points
+    assert all(_is_2d_vector(v) for v in points)
+    return np.array([[float(v[0]), float(v[1])] for v in points])
+
+
+def to_matrices(points: TPoints) -> list[Matrix]:
+    """Return path points as a list of 2x1 sympy matrices."""
+    if isinstance(points, np.ndarray):
+        assert _is_2d_array(points)
+        return [matrix([[x], [y]], "sympy") for x, y in points.tolist()]
+    assert all(_is_2d_vector(v) for v in points)
+    return list(points)
+
+
+def to_backend(points: TPoints, backend: str) -> TPoints:
+    """Return path points in the representation of the named `backend`."""
+    assert backend in BACKENDS
+    return to_array(points) if backend == "numpy" else to_matrices(points)
+
+
+def _segment_distances(points: TArray, start: TArray, end: TArray) -> TArray:
+    # Return the distances of points from the segment from `start` to `end`,
+    # which may be degenerate like that of a closed path
+    vector = end - start
+    length2 = float(vector @ vector)
+    offsets = points - start
+    if length2 > 0:
+        t = np.clip(offsets @ vector / length2, 0, 1)
+        offsets = offsets - t[:, np.newaxis] * vector
+    distances: TArray = np.hypot(offsets[:, 0], offsets[:, 1])
+    return distances
+
+
 def _is_2d_vector(obj) -> bool:
+    from sympy import Matrix, shape
+
     return isinstance(obj, Matrix) and shape(obj) == (2, 1)
+
+
+def _is_2d_array(obj) -> bool:
+    return bool(
+        obj.ndim == 2 and obj.shape[1] == 2 and obj.dtype == np.float64
+    )
@@ -6,18 +6,35 @@ __license__ = "MIT"
 __all__ = ["regular_polygon_path", "rotation_matrix"]
 
 from itertools import accumulate, repeat
-from sympy import Matrix, pi
+import numpy as np
 
+from .backend import matrix, numbers
 from .path import rotation_matrix
+from .typing import TArray, TPoints
 
 
-def regular_polygon_path(n: int) -> list[Matrix]:
-    """Return points of a regular polygonal path with `n` sides."""
+def regular_polygon_path(n: int, backend: str = "sympy") -> TPoints:
+    """Return points of a regular polygonal path with `n` sides.
+
+    The points are represented according to the named `backend`.
+    """
     assert n >= 3
-    R = rotation_matrix(-2 * pi / n)
+    if backend == "numpy":
+        return _regular_polygon_array(n)
+    R = rotation_matrix(-2 * numbers(backend).pi / n)
+    initial_point = matrix([[0], [1]], backend)
     points = list(
-        accumulate(repeat(R, n), lambda v, A: A * v, initial=Matrix([0, 1]))
+        accumulate(repeat(R, n), lambda v, A: A * v, initial=initial_point)
     )
-    assert points[0] == Matrix([0, 1])
+    assert points[0] == initial_point
     assert points[-1] == points[0]
     return points
+
+
+def _regular_polygon_array(n: int) -> TArray:
+    # Rotating (0, 1) clockwise by an angle yields its (sin, cos)
+    num = numbers("numpy")
+    angles = 2 * num.pi / n * np.arange(n + 1)
+    points = np.column_stack([num.sin(angles), num.cos(angles)])
+    points[-1] = points[0]
+    return points
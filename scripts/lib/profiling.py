@@ -0,0 +1,166 @@
+"""Per-stage profiling of the wallpaper generation pipeline."""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (C) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["Profiler", "StageStats", "profiling"]
+
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import TextIO, TypeVar
+import cProfile
+import functools
+import sys
+import time
+import tracemalloc
+
+T = TypeVar("T")
+
+
+@dataclass(kw_only=True)
+class StageStats:
+    """Statistics of a pipeline stage.
+
+    The wall time in `seconds` excludes the time spent in nested stages, while
+    `peak_bytes` is the peak traced memory while the stage was running.
+    """
+
+    calls: int = 0
+    seconds: float = 0.0
+    peak_bytes: int = 0
+
+
+@dataclass(kw_only=True)
+class _Frame:
+    # Running stage on the profiler stack
+    name: str
+    start: float
+    nested_seconds: float = 0.0
+    peak_bytes: int = 0
+
+
+@dataclass(kw_only=True)
+class Profiler:
+    """Collector of wall time, call counts and peak memory of stages.
+
+    Stages may be nested, e.g. a lazily consumed layout stage runs within a
+    serialization stage. If the profiler is not `enabled`, its hooks add no
+    overhead.
+    """
+
+    enabled: bool = True
+    stages: dict[str, StageStats] = field(default_factory=dict)
+    _stack: list[_Frame] = field(default_factory=list)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Return a context manager attributing its body to a stage."""
+        if not self.enabled:
+            yield
+            return
+        self._enter(name)
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def wrap(self, name: str, fn: Callable[..., T]) -> Callable[..., T]:
+        """Return a function attributing each call of `fn` to a stage."""
+        if not self.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs) -> T:
+            with self.stage(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    def iterate(self, name: str, iterable: Iterable[T]) -> Iterable[T]:
+        """Return an iterable attributing the production of items to a stage.
+
+        This is meant for lazy generators, whose work happens upon each item
+        being requested.
+        """
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iter(iterable))
+
+    def report(self, file: TextIO) -> None:
+        """Write a table of the statistics of all stages to a text `file`."""
+        file.write(
+            f"{'stage':<16} {'calls':>10} {'time':>12} {'peak memory':>14}\n"
+        )
+        for name, stats in self.stages.items():
+            file.write(
+                f"{name:<16} {stats.calls:>10} "
+                f"{stats.seconds:>10.3f} s "
+                f"{stats.peak_bytes / 2**20:>10.1f} MiB\n"
+            )
+
+    def _iterate(self, name: str, iterator: Iterator[T]) -> Iterator[T]:
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def _enter(self, name: str) -> None:
+        if tracemalloc.is_tracing():
+            # Attribute the peak so far to the enclosing stage (if any), and
+            # measure the peak of the new stage from scratch
+            if self._stack:
+                _, peak = tracemalloc.get_traced_memory()
+                parent = self._stack[-1]
+                parent.peak_bytes = max(parent.peak_bytes, peak)
+            tracemalloc.reset_peak()
+        self._stack.append(_Frame(name=name, start=time.perf_counter()))
+
+    def _exit(self) -> None:
+        frame = self._stack.pop()
+        elapsed = time.perf_counter() - frame.start
+        if tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            frame.peak_bytes = max(frame.peak_bytes, peak)
+        stats = self.stages.setdefault(frame.name, StageStats())
+        stats.calls += 1
+        stats.seconds += elapsed - frame.nested_seconds
+        stats.peak_bytes = max(stats.peak_bytes, frame.peak_bytes)
+        if self._stack:
+            parent = self._stack[-1]
+            parent.nested_seconds += elapsed
+            parent.peak_bytes = max(parent.peak_bytes, frame.peak_bytes)
+
+
+@contextmanager
+def profiling(
+    enabled: bool = False,
+    dump_path: str | None = None,
+    file: TextIO | None = None,
+) -> Iterator[Profiler]:
+    """Return a context manager profiling the pipeline stages of a script.
+
+    If `enabled`, memory allocations are traced and the statistics of the
+    stages are reported at exit to a text `file`, which defaults to standard
+    error. If `dump_path` is given, the whole run is also profiled by
+    `cProfile`, and its statistics are dumped to that path for inspection with
+    `pstats` or other tools.
+    """
+    profiler = Profiler(enabled=enabled)
+    if enabled:
+        tracemalloc.start()
+    cprofile = cProfile.Profile()
+    try:
+        if dump_path is not None:
+            cprofile.enable()
+        yield profiler
+    finally:
+        if dump_path is not None:
+            cprofile.disable()
+            cprofile.dump_stats(dump_path)
+        if enabled:
+            tracemalloc.stop()
+            profiler.report(file or sys.stderr)
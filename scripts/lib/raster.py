@@ -0,0 +1,334 @@
+"""Rasterization of SVG paths into PNG images without an SVG renderer."""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (C) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["rasterize", "write_png"]
+
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from numpy.typing import NDArray
+from typing import BinaryIO
+import numpy as np
+import struct
+import zlib
+
+from .path import to_array
+from .svg import (
+    COLOR_PATTERN,
+    SVGCompoundPath,
+    SVGPath,
+    SVGPathStyle,
+    SVGStreamedPath,
+    SVGUse,
+)
+from .typing import TArray
+
+TImage = NDArray[np.uint8]
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# Number of sample rows whose winding numbers are accumulated at once
+FILL_BAND_ROWS = 256
+
+
+def rasterize(
+    paths: Iterable[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse],
+    *,
+    resolution: tuple[int, int],
+    background_color: str,
+    scale: float = 1,
+    supersampling: int = 1,
+    tile: tuple[int, int] | None = None,
+) -> TImage:
+    """Return an RGB image of flat-colored SVG paths.
+
+    The paths are painted in order onto a `background_color` canvas with the
+    nominal `resolution` of the SVG multiplied by `scale`, with the origin in
+    the bottom left corner as in `write_svg`. Each path is filled by the
+    nonzero rule and then stroked, taking all subpaths of a compound path
+    together. Polygons are filled scanline by scanline, with all edge
+    crossings of a polygon computed at once and accumulated in bands of rows.
+    The points of `SVGStreamedPath` elements are instead gone through chunk
+    by chunk, once for filling and once for stroking. Instanced `SVGPathDef`
+    elements given a `points_fn` are streamed only once into floats shared by
+    all of their instances. For anti-aliasing, the image is rendered with
+    `supersampling` times as many samples along each axis and then
+    downsampled by averaging.
+
+    Stroke segments are drawn as rectangles extended by half the stroke width
+    at both ends, which matches square line caps and approximates miter joins.
+
+    If `tile` is given, the paths are laid out on a tile of that size as in
+    `write_svg`, which is rendered once and repeated over the image from its
+    bottom left corner. The tile must then span a whole number of pixels.
+    """
+    assert COLOR_PATTERN.match(background_color)
+    assert scale > 0 and isinstance(supersampling, int) and supersampling >= 1
+    width, height = (round(size * scale) for size in resolution)
+    if tile is not None:
+        assert all(
+            float(size * scale).is_integer() for size in tile
+        ), "tile not a whole number of pixels"
+        tile_image = rasterize(
+            paths,
+            resolution=tile,
+            background_color=background_color,
+            scale=scale,
+            supersampling=supersampling,
+        )
+        tile_height, tile_width, _ = tile_image.shape
+        repeats = (-(-height // tile_height), -(-width // tile_width), 1)
+        tiled: TImage = np.tile(tile_image, repeats)[-height:, :width]
+        return tiled
+    factor = width * supersampling / resolution[0]
+    image = np.empty(
+        (height * supersampling, width * supersampling, 3), np.uint8
+    )
+    image[...] = _parse_color(background_color)
+
+    def to_samples(points: TArray) -> TArray:
+        # Flip the y axis into row order and scale to samples
+        return np.column_stack(
+            [points[:, 0] * factor, (resolution[1] - points[:, 1]) * factor]
+        )
+
+    # Float points of streamed path definitions, which are produced once for
+    # all of their instances
+    def_points: dict[str, TArray] = {}
+    for path in paths:
+        if isinstance(path, SVGStreamedPath):
+            _paint_streamed(
+                image,
+                lambda: (
+                    to_samples(to_array(points)) for points in path.points_fn()
+                ),
+                path.style,
+                factor,
+            )
+            continue
+        if isinstance(path, SVGUse):
+            offsets = np.array([float(d) for d in path.offsets])
+            if path.path.points is None:
+                try:
+                    points = def_points[path.path.id]
+                except KeyError:
+                    points = def_points[path.path.id] = np.concatenate(
+                        [to_array(chunk) for chunk in path.path.iter_points()]
+                    )
+            else:
+                points = to_array(path.path.points)
+            subpaths = [points + offsets]
+        elif isinstance(path, SVGCompoundPath):
+            subpaths = [to_array(points) for points in path.subpaths]
+        else:
+            subpaths = [to_array(path.points)]
+        samples = [to_samples(points) for points in subpaths if len(points)]
+        if samples:
+            _paint(image, samples, path.style, factor)
+    if supersampling == 1:
+        return image
+    blocks = image.reshape(
+        height, supersampling, width, supersampling, 3
+    ).mean(axis=(1, 3))
+    downsampled: TImage = np.rint(blocks).astype(np.uint8)
+    return downsampled
+
+
+def write_png(file: BinaryIO, image: TImage) -> None:
+    """Write an RGB `image` to a binary `file` in PNG format."""
+    assert image.ndim == 3 and image.shape[2] == 3 and image.dtype == np.uint8
+    height, width, _ = image.shape
+    # Prepend filter type 0 (none) to each scanline
+    scanlines = np.concatenate(
+        [np.zeros((height, 1), np.uint8), image.reshape(height, -1)], axis=1
+    )
+    file.write(PNG_SIGNATURE)
+    _write_chunk(
+        file, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    )
+    _write_chunk(file, b"IDAT", zlib.compress(scanlines.tobytes()))
+    _write_chunk(file, b"IEND", b"")
+
+
+def _write_chunk(file: BinaryIO, tag: bytes, data: bytes) -> None:
+    file.write(struct.pack(">I", len(data)))
+    file.write(tag + data)
+    file.write(struct.pack(">I", zlib.crc32(tag + data)))
+
+
+def _parse_color(color: str) -> tuple[int, int, int]:
+    # Return the RGB components of an HTML color code
+    return (int(color[1:3], 16), int(color[3:5], 16), int(color[5:7], 16))
+
+
+def _paint(
+    image: TImage, subpaths: list[TArray], style: SVGPathStyle, factor: float
+) -> None:
+    # Fill the polygons and stroke their segments with the colors of the style
+    starts = np.concatenate(subpaths)
+    ends = np.concatenate([np.roll(points, -1, axis=0) for points in subpaths])
+    if style.fill_color != "none":
+        _fill(image, starts, ends, _parse_color(style.fill_color))
+    if style.stroke_width > 0:
+        quads = np.concatenate(
+            [
+                _stroke_quads(points, style.stroke_width * factor / 2)
+                for points in subpaths
+            ]
+        )
+        if len(quads):
+            _fill(
+                image,
+                quads.reshape(-1, 2),
+                np.roll(quads, -1, axis=1).reshape(-1, 2),
+                _parse_color(style.stroke_color),
+            )
+
+
+def _paint_streamed(
+    image: TImage,
+    chunks_fn: Callable[[], Iterable[TArray]],
+    style: SVGPathStyle,
+    factor: float,
+) -> None:
+    # Fill the polygon whose points are produced in chunks by `chunks_fn`, and
+    # stroke its segments, without holding more than a chunk of points. The
+    # winding number changes of the whole image are accumulated modulo 256,
+    # which is exact as long as no winding number exceeds 127 in magnitude.
+    height, width, _ = image.shape
+    if style.fill_color != "none":
+        changes = np.zeros((height, width + 1), np.int8)
+        first = last = None
+        for points in _overlapping_chunks(chunks_fn()):
+            if first is None:
+                first = points[:1]
+            _accumulate_crossings(changes, points[:-1], points[1:])
+            last = points[-1:]
+        if first is None or last is None:
+            return
+        _accumulate_crossings(changes, last, first)
+        color = _parse_color(style.fill_color)
+        for band_min in range(0, height, FILL_BAND_ROWS):
+            band = slice(band_min, band_min + FILL_BAND_ROWS)
+            winding = np.cumsum(changes[band, :-1], axis=1, dtype=np.int8)
+            image[band][winding != 0] = color
+    if style.stroke_width > 0:
+        color = _parse_color(style.stroke_color)
+        for points in _overlapping_chunks(chunks_fn()):
+            quads = _stroke_quads(points, style.stroke_width * factor / 2)
+            if len(quads):
+                _fill(
+                    image,
+                    quads.reshape(-1, 2),
+                    np.roll(quads, -1, axis=1).reshape(-1, 2),
+                    color,
+                )
+
+
+def _overlapping_chunks(chunks: Iterable[TArray]) -> Iterator[TArray]:
+    # Prepend the last point of the previous chunk to each nonempty chunk, so
+    # that the segments joining consecutive chunks are not missed
+    previous = None
+    for points in chunks:
+        if not len(points):
+            continue
+        yield (
+            points if previous is None else np.concatenate([previous, points])
+        )
+        previous = points[-1:]
+
+
+def _stroke_quads(points: TArray, half_width: float) -> TArray:
+    # Return a (k, 4, 2) array of rectangles covering the segments of a path,
+    # all with the same orientation so that their union is filled
+    starts, ends = points[:-1], points[1:]
+    vectors = ends - starts
+    lengths = np.hypot(vectors[:, 0], vectors[:, 1])
+    nonzero = lengths > 0
+    starts, ends = starts[nonzero], ends[nonzero]
+    along = vectors[nonzero] / lengths[nonzero, np.newaxis] * half_width
+    across = np.column_stack([-along[:, 1], along[:, 0]])
+    starts, ends = starts - along, ends + along
+    quads: TArray = np.stack(
+        [starts - across, ends - across, ends + across, starts + across],
+        axis=1,
+    )
+    return quads
+
+
+def _fill(
+    image: TImage,
+    starts: TArray,
+    ends: TArray,
+    color: Sequence[int],
+) -> None:
+    # Fill the region enclosed by edges from `starts` to `ends` by the nonzero
+    # rule, sampling each pixel at its center
+    height, width, _ = image.shape
+    rows, xs, directions = _crossings(starts, ends, height)
+    if not len(rows):
+        return
+    # Accumulate winding number changes where each row crosses an edge, and
+    # integrate them along the row
+    row_min, row_max = int(rows.min()), int(rows.max()) + 1
+    col_min = max(int(np.floor(min(starts[:, 0].min(), ends[:, 0].min()))), 0)
+    col_max = min(
+        int(np.ceil(max(starts[:, 0].max(), ends[:, 0].max()))), width
+    )
+    if col_min >= col_max:
+        return
+    cols = np.clip(np.ceil(xs - 0.5).astype(int), col_min, col_max)
+    # Sort the crossings by row to process them in bands of bounded memory
+    order = np.argsort(rows, kind="stable")
+    rows, cols, directions = rows[order], cols[order], directions[order]
+    bounds = np.searchsorted(
+        rows, np.arange(row_min, row_max + FILL_BAND_ROWS, FILL_BAND_ROWS)
+    )
+    for band_min, i, j in zip(
+        range(row_min, row_max, FILL_BAND_ROWS), bounds[:-1], bounds[1:]
+    ):
+        band_max = min(band_min + FILL_BAND_ROWS, row_max)
+        changes = np.zeros(
+            (band_max - band_min, col_max - col_min + 1), np.int32
+        )
+        np.add.at(
+            changes,
+            (rows[i:j] - band_min, cols[i:j] - col_min),
+            directions[i:j],
+        )
+        winding = np.cumsum(changes[:, :-1], axis=1)
+        region = image[band_min:band_max, col_min:col_max]
+        region[winding != 0] = color
+
+
+def _accumulate_crossings(
+    changes: NDArray[np.int8], starts: TArray, ends: TArray
+) -> None:
+    # Add the winding number changes where rows cross the edges from `starts`
+    # to `ends` to an array with one more column than the image
+    height, columns = changes.shape
+    rows, xs, directions = _crossings(starts, ends, height)
+    cols = np.clip(np.ceil(xs - 0.5).astype(int), 0, columns - 1)
+    np.add.at(changes, (rows, cols), directions.astype(np.int8))
+
+
+def _crossings(
+    starts: TArray, ends: TArray, height: int
+) -> tuple[NDArray[np.int_], TArray, NDArray[np.int_]]:
+    # Return the rows, abscissae and directions (+1 downward, -1 upward) of
+    # all crossings of the edges from `starts` to `ends` with the centers of
+    # the rows of an image of the given `height`
+    x0, y0 = starts[:, 0], starts[:, 1]
+    x1, y1 = ends[:, 0], ends[:, 1]
+    # Rows whose centers lie in [min(y0, y1), max(y0, y1)) cross the edge
+    first = np.clip(np.ceil(np.minimum(y0, y1) - 0.5), 0, height).astype(int)
+    last = np.clip(np.ceil(np.maximum(y0, y1) - 0.5), 0, height).astype(int)
+    counts = last - first
+    total = int(counts.sum())
+    edges = np.repeat(np.arange(len(starts)), counts)
+    rows = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+    rows += first[edges]
+    t = (rows + 0.5 - y0[edges]) / (y1 - y0)[edges]
+    xs = x0[edges] + t * (x1 - x0)[edges]
+    directions = np.where(y1 > y0, 1, -1)[edges]
+    return rows, xs, directions
@@ -0,0 +1,63 @@
+"""Counter-based random numbers as pure hashes of integer indices.
+
+Unlike the sequential global random generator, the numbers drawn for given
+indices do not depend on any other draws, so they can be computed in any
+order, for arbitrary subsets of indices and in bulk on NumPy arrays.
+"""
+
+__author__ = "ccornix"
+__copyright__ = "Copyright (C) 2024 ccornix"
+__license__ = "MIT"
+__all__ = ["hash_indices", "randbelow_indices", "splitmix64"]
+
+from numpy.typing import ArrayLike, NDArray
+import numpy as np
+
+# Increment and multipliers of SplitMix64 by Steele, Lea and Flood
+GOLDEN_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+MIX_MULTIPLIERS = (
+    np.uint64(0xBF58476D1CE4E5B9),
+    np.uint64(0x94D049BB133111EB),
+)
+
+
+def splitmix64(x: ArrayLike) -> NDArray[np.uint64]:
+    """Return the SplitMix64 outputs for states `x` before their increment.
+
+    The states are taken modulo 2**64 and may be an array of any shape, on
+    which the bijective mixing function is applied element-wise.
+    """
+    # Arithmetic wraps around modulo 2**64 by design, which NumPy only warns
+    # about for scalars
+    with np.errstate(over="ignore"):
+        z = np.asarray(x).astype(np.uint64) + GOLDEN_GAMMA
+        z = (z ^ (z >> np.uint64(30))) * MIX_MULTIPLIERS[0]
+        z = (z ^ (z >> np.uint64(27))) * MIX_MULTIPLIERS[1]
+    mixed: NDArray[np.uint64] = z ^ (z >> np.uint64(31))
+    return mixed
+
+
+def hash_indices(seed: int, *indices: ArrayLike) -> NDArray[np.uint64]:
+    """Return 64-bit hashes of `indices` keyed by `seed`.
+
+    Each index is mixed into the hash of the previous ones by `splitmix64`,
+    starting from that of the `seed`. The index arrays are broadcast against
+    each other.
+    """
+    h = splitmix64(np.uint64(seed % 2**64))
+    for index in indices:
+        h = splitmix64(h ^ np.asarray(index).astype(np.uint64))
+    return h
+
+
+def randbelow_indices(
+    n: int, seed: int, *indices: ArrayLike
+) -> NDArray[np.intp]:
+    """Return random integers below `n` for `indices` keyed by `seed`.
+
+    The integers are the top 32 bits of `hash_indices` scaled to `n` by a
+    multiplication, which is uniform up to a bias of at most `n / 2**32`.
+    """
+    assert 1 <= n <= 2**32
+    high = hash_indices(seed, *indices) >> np.uint64(32)
+    return ((high * np.uint64(n)) >> np.uint64(32)).astype(np.intp)
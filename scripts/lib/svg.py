@@ -3,60 +3,490 @@
 __author__ = "ccornix"
 __copyright__ = "Copyright (c) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["SVGPathStyle", "SVGPath", "generate_svg"]
+__all__ = [
+    "path_data",
+    "SVGPathStyle",
+    "intern_style",
+    "SVGPath",
+    "SVGCompoundPath",
+    "SVGStreamedPath",
+    "SVGPathDef",
+    "SVGUse",
+    "generate_svg",
+    "iter_path_data",
+    "merge_paths",
+    "write_svg",
+]
 
-from dataclasses import dataclass
-from collections.abc import Sequence
-from sympy import Matrix
+from dataclasses import dataclass, field
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from numpy.typing import NDArray
+from typing import TextIO
+import io
+import numpy as np
 import re
 
+from .path import to_array
+from .typing import TArray, TChunksFn, TMatrix, TNum, TPoints
+
 COLOR_PATTERN = re.compile(r"^#[0-9a-fA-F]{6}$")
 
 
-@dataclass(kw_only=True)
+@dataclass(kw_only=True, frozen=True, slots=True)
 class SVGPathStyle:
-    """Style parameters of an SVG path."""
+    """Style parameters of an SVG path.
+
+    Styles are immutable, so that a single instance can be shared by any
+    number of paths (see `intern_style`). The `fill_color` of paths that are
+    only stroked may be `"none"`.
+    """
 
     stroke_width: int
     stroke_linecap: str = "square"
     stroke_color: str
     fill_color: str
+    _str: str = field(init=False, repr=False, compare=False)
 
     def __post_init__(self) -> None:
         """Perform additional checks at run-time."""
         assert isinstance(self.stroke_width, int)
         assert self.stroke_linecap in ("butt", "round", "square")
         assert COLOR_PATTERN.match(self.stroke_color)
-        assert COLOR_PATTERN.match(self.fill_color)
-
-    def __str__(self) -> str:
-        """Return an SVG XML string representation of the style."""
-        return (
+        assert self.fill_color == "none" or COLOR_PATTERN.match(
+            self.fill_color
+        )
+        object.__setattr__(
+            self,
+            "_str",
             f"fill:{self.fill_color};"
             f"stroke:{self.stroke_color};"
             f"stroke-width:{self.stroke_width};"
-            f"stroke-linecap:{self.stroke_linecap}"
+            f"stroke-linecap:{self.stroke_linecap}",
+        )
+
+    def __str__(self) -> str:
+        """Return an SVG XML string representation of the style."""
+        return self._str
+
+
+_STYLE_REGISTRY: dict[tuple[int, str, str, str], SVGPathStyle] = {}
+
+
+def intern_style(
+    *,
+    stroke_width: int,
+    stroke_linecap: str = "square",
+    stroke_color: str,
+    fill_color: str,
+) -> SVGPathStyle:
+    """Return the shared instance of an SVG path style.
+
+    Styles are created and validated once per distinct set of parameters and
+    kept in a registry, so that grids of many paths hold only a few styles.
+    """
+    key = (stroke_width, stroke_linecap, stroke_color, fill_color)
+    try:
+        style = _STYLE_REGISTRY[key]
+    except KeyError:
+        style = _STYLE_REGISTRY[key] = SVGPathStyle(
+            stroke_width=stroke_width,
+            stroke_linecap=stroke_linecap,
+            stroke_color=stroke_color,
+            fill_color=fill_color,
         )
+    return style
 
 
 @dataclass(kw_only=True)
 class SVGPath:
-    """Representation of an SVG path."""
+    """Representation of an SVG path.
+
+    The path data may have been `rendered` beforehand as a pair of the
+    precision and the result of `path_data`, which is then reused when
+    formatting at that precision.
+    """
+
+    points: TPoints
+    style: SVGPathStyle
+    rendered: tuple[int | None, str] | None = field(
+        default=None, repr=False, compare=False
+    )
+
+    def __str__(self) -> str:
+        """Return an SVG XML string representation."""
+        return self.format()
+
+    def format(
+        self, precision: int | None = None, style_class: str | None = None
+    ) -> str:
+        """Return an SVG XML string representation.
+
+        See `path_data` for the meaning of `precision`. If `style_class` is
+        given, the path refers to that CSS class instead of carrying an
+        inline style.
+        """
+        if self.rendered is not None and self.rendered[0] == precision:
+            d = self.rendered[1]
+        else:
+            d = path_data(self.points, precision)
+        return f'<path {_style_attribute(self.style, style_class)} d="{d}"/>'
+
+
+@dataclass(kw_only=True)
+class SVGCompoundPath:
+    """Representation of an SVG path consisting of several subpaths."""
+
+    subpaths: list[TPoints]
+    style: SVGPathStyle
 
-    points: list[Matrix]
+    def __str__(self) -> str:
+        """Return an SVG XML string representation."""
+        return self.format()
+
+    def format(
+        self, precision: int | None = None, style_class: str | None = None
+    ) -> str:
+        """Return an SVG XML string representation.
+
+        See `SVGPath.format` for the meaning of the arguments.
+        """
+        d = " ".join(path_data(points, precision) for points in self.subpaths)
+        return f'<path {_style_attribute(self.style, style_class)} d="{d}"/>'
+
+
+@dataclass(kw_only=True)
+class SVGStreamedPath:
+    """Representation of an SVG path whose points are produced in chunks.
+
+    Function `points_fn` returns a new iterable of chunks of consecutive path
+    points each time it is called (e.g. a partial of `iter_koch_island`), so
+    that the path can be written out or rasterized without materializing its
+    points.
+    """
+
+    points_fn: Callable[[], Iterable[TPoints]]
     style: SVGPathStyle
 
     def __str__(self) -> str:
         """Return an SVG XML string representation."""
-        is_closed = self.points[-1] == self.points[0]
+        return self.format()
+
+    def format(
+        self, precision: int | None = None, style_class: str | None = None
+    ) -> str:
+        """Return an SVG XML string representation.
+
+        See `SVGPath.format` for the meaning of the arguments.
+        """
+        return "".join(self.iter_format(precision, style_class))
+
+    def iter_format(
+        self, precision: int | None = None, style_class: str | None = None
+    ) -> Iterator[str]:
+        """Yield an SVG XML string representation piece by piece.
+
+        See `SVGPath.format` for the meaning of the arguments.
+        """
+        yield f'<path {_style_attribute(self.style, style_class)} d="'
+        yield from iter_path_data(self.points_fn(), precision)
+        yield '"/>'
+
+
+@dataclass(kw_only=True)
+class SVGPathDef:
+    """Representation of an unstyled SVG path to be instanced by `SVGUse`.
+
+    Either the `points` of the path are given, or a `points_fn` producing
+    them in chunks like that of `SVGStreamedPath`, so that a detailed path
+    can be defined once without materializing its points.
+    """
+
+    id: str
+    points: "TPoints | None" = None
+    points_fn: "TChunksFn | None" = None
+
+    def __post_init__(self) -> None:
+        """Perform additional checks at run-time."""
+        assert (self.points is None) != (self.points_fn is None)
+
+    def __str__(self) -> str:
+        """Return an SVG XML string representation."""
+        return self.format()
+
+    def iter_points(self) -> Iterable[TPoints]:
+        """Return the chunks of consecutive points of the path."""
+        if self.points_fn is not None:
+            return self.points_fn()
+        assert self.points is not None
+        return [self.points]
+
+    def format(self, precision: int | None = None) -> str:
+        """Return an SVG XML string representation.
+
+        See `path_data` for the meaning of `precision`.
+        """
+        return "".join(self.iter_format(precision))
+
+    def iter_format(self, precision: int | None = None) -> Iterator[str]:
+        """Yield an SVG XML string representation piece by piece.
+
+        See `path_data` for the meaning of `precision`.
+        """
+        if self.points_fn is None:
+            assert self.points is not None
+            d = path_data(self.points, precision)
+            yield f'<path id="{self.id}" d="{d}"/>'
+            return
+        yield f'<path id="{self.id}" d="'
+        yield from iter_path_data(self.points_fn(), precision)
+        yield '"/>'
+
+
+@dataclass(kw_only=True)
+class SVGUse:
+    """Representation of a shifted and styled instance of an SVG path."""
+
+    path: SVGPathDef
+    offsets: tuple[TNum, TNum]
+    style: SVGPathStyle
+
+    def __str__(self) -> str:
+        """Return an SVG XML string representation."""
+        return self.format()
+
+    def format(
+        self, precision: int | None = None, style_class: str | None = None
+    ) -> str:
+        """Return an SVG XML string representation.
+
+        If `precision` is given, offsets are rounded to that many decimal
+        places. See `SVGPath.format` for the meaning of `style_class`.
+        """
+        if precision is None:
+            x, y = (str(float(offset)) for offset in self.offsets)
+        else:
+            x, y = _format_fixed(
+                _quantize(np.array(self.offsets, dtype=np.float64), precision),
+                precision,
+            )
+        return (
+            f'<use href="#{self.path.id}" x="{x}" y="{y}" '
+            f"{_style_attribute(self.style, style_class)}/>"
+        )
+
+
+def _style_attribute(style: SVGPathStyle, style_class: str | None) -> str:
+    # Return the attribute of an element referring to its style
+    if style_class is None:
+        return f'style="{str(style)}"'
+    return f'class="{style_class}"'
+
+
+def merge_paths(
+    paths: Iterable[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse],
+) -> list[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse]:
+    """Merge SVG paths of the same style into compound paths.
+
+    Each compound path takes the place of the first path of its style, and
+    other elements are kept in place. Since this changes the painting order of
+    paths of different styles, it is meant for paths that overlap at most by
+    their strokes, which must then have the same width and color, like the
+    cells of a grid. The number of elements to parse and render drops from
+    the number of paths to the number of styles. Streamed paths are kept in
+    place, too, as merging would materialize their points.
+    """
+    merged: list[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse] = []
+    compound_paths: dict[SVGPathStyle, SVGCompoundPath] = {}
+    for path in paths:
+        if isinstance(path, (SVGStreamedPath, SVGUse)):
+            merged.append(path)
+            continue
+        subpaths = (
+            path.subpaths
+            if isinstance(path, SVGCompoundPath)
+            else [path.points]
+        )
+        try:
+            compound_paths[path.style].subpaths.extend(subpaths)
+        except KeyError:
+            compound_path = SVGCompoundPath(
+                subpaths=list(subpaths), style=path.style
+            )
+            compound_paths[path.style] = compound_path
+            merged.append(compound_path)
+    return merged
+
+
+def path_data(points: TPoints, precision: int | None = None) -> str:
+    """Return the SVG path data of path points.
+
+    By default, each point is written with absolute coordinates in full
+    precision. If `precision` is given, coordinates are rounded to that many
+    decimal places, and all points but the first are written as relative
+    `l` line commands, or `h` and `v` commands along the axes. Rounding,
+    closure detection and differencing are carried out in bulk on integer
+    arrays.
+    """
+    if precision is None:
+        is_closed = bool(np.all(points[-1] == points[0]))
         if is_closed:
-            points = self.points[:-1]
+            points = points[:-1]
             suffix = " z"
         else:
-            points = self.points
             suffix = ""
-        points_str = " ".join(f"{float(p[0])},{float(p[1])}" for p in points)
-        return f'<path style="{str(self.style)}" d="M {points_str}{suffix}"/>'
+        points_str = " ".join(_format_point(p) for p in points)
+        return f"M {points_str}{suffix}"
+
+    q = _quantize(_float_array(points), precision)
+    is_closed = bool(np.all(q[-1] == q[0]))
+    if is_closed:
+        q = q[:-1]
+    commands, _ = _relative_commands(q, precision, "")
+    suffix = " z" if is_closed else ""
+    return f"{_format_move(q[0], precision)}{commands}{suffix}"
+
+
+def iter_path_data(
+    chunks: Iterable[TPoints], precision: int | None = None
+) -> Iterator[str]:
+    """Yield the SVG path data of path points given in chunks piece by piece.
+
+    The chunks of consecutive points concatenate to a path, whose data is
+    the same as that of `path_data`. Only the first and the last point seen
+    are kept between chunks, so that paths of any length can be written out
+    while they are being produced. A `ValueError` is raised before anything
+    is yielded if the chunks hold no points at all.
+    """
+    if precision is None:
+        yield from _iter_full_path_data(chunks)
+    else:
+        yield from _iter_compact_path_data(chunks, precision)
+
+
+def _iter_full_path_data(chunks: Iterable[TPoints]) -> Iterator[str]:
+    # Yield absolute coordinates, holding back the last point seen until it
+    # is known whether it closes the path
+    first = last = None
+    separator = ""
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        if first is None:
+            first = chunk[0]
+            yield "M "
+        if last is not None:
+            yield f"{separator}{_format_point(last)}"
+            separator = " "
+        if len(chunk) > 1:
+            points_str = " ".join(_format_point(p) for p in chunk[:-1])
+            yield f"{separator}{points_str}"
+            separator = " "
+        last = chunk[-1]
+    if first is None:
+        raise ValueError("path has no points")
+    if bool(np.all(last == first)):
+        yield " z"
+    else:
+        yield f"{separator}{_format_point(last)}"
+
+
+def _format_point(point: TMatrix) -> str:
+    return f"{float(point[0])},{float(point[1])}"
+
+
+def _iter_compact_path_data(
+    chunks: Iterable[TPoints], precision: int
+) -> Iterator[str]:
+    # Yield relative commands between rounded points, holding back the last
+    # point seen until it is known whether it closes the path
+    first: NDArray[np.int64] | None = None
+    anchor: NDArray[np.int64] | None = None
+    held: NDArray[np.int64] | None = None
+    command = ""
+    for chunk in chunks:
+        if len(chunk) == 0:
+            continue
+        q = _quantize(_float_array(chunk), precision)
+        if first is None:
+            first = anchor = q[0]
+            yield _format_move(first, precision)
+            q = q[1:]
+            if len(q) == 0:
+                continue
+        assert anchor is not None
+        emitted = q[:-1] if held is None else np.concatenate([[held], q[:-1]])
+        if len(emitted):
+            pieces, command = _relative_commands(
+                np.concatenate([[anchor], emitted]), precision, command
+            )
+            yield pieces
+            anchor = emitted[-1]
+        held = q[-1]
+    if first is None:
+        raise ValueError("path has no points")
+    assert anchor is not None
+    if held is None or np.array_equal(held, first):
+        yield " z"
+    else:
+        pieces, _ = _relative_commands(
+            np.stack([anchor, held]), precision, command
+        )
+        yield pieces
+
+
+def _float_array(points: TPoints) -> TArray:
+    # Return path points as an array of floats
+    if isinstance(points, np.ndarray):
+        return np.asarray(points, dtype=np.float64)
+    return to_array(points)
+
+
+def _format_move(point: NDArray[np.int64], precision: int) -> str:
+    # Return the move command to a rounded point
+    x, y = _format_fixed(point, precision)
+    return f"M{x},{y}".replace(",-", "-")
+
+
+def _relative_commands(
+    q: NDArray[np.int64], precision: int, previous: str
+) -> tuple[str, str]:
+    # Return the relative commands between consecutive rounded points, each
+    # preceded by a space and continuing after a `previous` command, and the
+    # last command
+    deltas = np.diff(q, axis=0)
+    # Drop segments that vanish after rounding
+    deltas = deltas[np.any(deltas != 0, axis=1)]
+    xs = _format_fixed(deltas[:, 0], precision)
+    ys = _format_fixed(deltas[:, 1], precision)
+    commands = np.where(
+        deltas[:, 1] == 0, "h", np.where(deltas[:, 0] == 0, "v", "l")
+    ).tolist()
+    tokens = []
+    for command, x, y in zip(commands, xs, ys):
+        argument = x if command == "h" else y if command == "v" else f"{x},{y}"
+        tokens.append(
+            f" {command}{argument}" if command != previous else f" {argument}"
+        )
+        previous = command
+    # Minus signs separate numbers on their own
+    return "".join(tokens).replace(" -", "-").replace(",-", "-"), previous
+
+
+def _quantize(
+    values: NDArray[np.float64], precision: int
+) -> NDArray[np.int64]:
+    # Return values as integer multiples of 10^(-precision)
+    scaled = np.rint(values * 10**precision)
+    quantized: NDArray[np.int64] = scaled.astype(np.int64)
+    return quantized
+
+
+def _format_fixed(values: NDArray[np.int64], precision: int) -> list[str]:
+    # Format integer multiples of 10^(-precision) as shortest decimals
+    return [
+        str(value).removesuffix(".0")
+        for value in (values / 10**precision).tolist()
+    ]
 
 
 def generate_svg(
@@ -65,36 +495,134 @@ def generate_svg(
     title: str,
     palette: Sequence[str],
     background_color: str,
-    paths: Sequence[SVGPath],
+    paths: Iterable[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse],
     resolution: tuple[int, int],
+    precision: int | None = None,
+    css_classes: bool = False,
+    tile: tuple[int, int] | None = None,
 ) -> str:
     """Generate the SVG code of the wallpaper.
 
+    See `write_svg` for the description of the arguments.
+    """
+    buffer = io.StringIO()
+    write_svg(
+        buffer,
+        author=author,
+        title=title,
+        palette=palette,
+        background_color=background_color,
+        paths=paths,
+        resolution=resolution,
+        precision=precision,
+        css_classes=css_classes,
+        tile=tile,
+    )
+    return buffer.getvalue().removesuffix("\n")
+
+
+def write_svg(
+    file: TextIO,
+    *,
+    author: str,
+    title: str,
+    palette: Sequence[str],
+    background_color: str,
+    paths: Iterable[SVGPath | SVGCompoundPath | SVGStreamedPath | SVGUse],
+    resolution: tuple[int, int],
+    precision: int | None = None,
+    css_classes: bool = False,
+    tile: tuple[int, int] | None = None,
+) -> None:
+    """Write the SVG code of the wallpaper to a text `file`.
+
     Include metadata such as `author`, `title` and `palette`. The latter is a
     sequence of HTML color codes that includes `background_color` and all
     other colors appearing in the SVG graphics. It is included in a custom XML
     tag to facilitate quick optional posterior re-coloring by switching the
     palette.
 
-    A sequence of SVG paths that compose the wallpaper are contained in
-    `paths`. The desired nominal resolution of the SVG in pixels is given by
+    An iterable of SVG paths that compose the wallpaper are contained in
+    `paths`. Each path is written as soon as it is produced, so `paths` may be
+    a generator that is never materialized as a whole. Paths instanced by
+    `SVGUse` elements are defined once, right before their first use. The
+    desired nominal resolution of the SVG in pixels is given by
     `resolution`. This is independent of the final PNG resolution that can be a
-    multiple of this nominal one.
+    multiple of this nominal one. If `precision` is given, coordinates are
+    compactly encoded with that many decimal places (see `path_data`). The
+    points of `SVGStreamedPath` elements, and of `SVGPathDef` elements given
+    a `points_fn`, are written out chunk by chunk as they are produced.
+
+    If `css_classes` is true, paths refer to a CSS class per distinct style
+    instead of carrying inline styles. The classes are defined in a single
+    `<style>` element at the end of the SVG, where all colors but those of the
+    palette tag and the background are thus found.
+
+    If `tile` is given, `paths` are laid out on a tile of that size in pixels
+    instead, which is defined as a `<pattern>` repeated over the whole image
+    from its bottom left corner. The size of the SVG is then independent of
+    `resolution`, and the tile must tile the plane seamlessly by itself.
     """
     assert all(COLOR_PATTERN.match(color) for color in palette)
     assert COLOR_PATTERN.match(background_color)
     assert background_color in palette
-    assert all(
-        path.style.fill_color in palette and path.style.stroke_color in palette
-        for path in paths
-    )
     width, height = resolution
     palette_str = " ".join(palette)
-    paths_str = "\n".join(str(path) for path in paths)
-    return SVG_TEMPLATE.format(**locals())
+    file.write(SVG_HEADER_TEMPLATE.format(**locals()))
+    if tile is not None:
+        tile_width, tile_height = tile
+        assert tile_width > 0 and tile_height > 0
+        file.write(PATTERN_HEADER_TEMPLATE.format(**locals()))
+    defs: dict[str, SVGPathDef] = {}
+    # Colors are checked against the palette once per distinct style, which
+    # is also assigned a CSS class name in order of appearance
+    style_classes: dict[SVGPathStyle, str] = {}
+    for path in paths:
+        try:
+            style_class = style_classes[path.style]
+        except KeyError:
+            assert (
+                path.style.fill_color in palette
+                or path.style.fill_color == "none"
+            ) and path.style.stroke_color in palette
+            style_class = style_classes[path.style] = f"s{len(style_classes)}"
+        if isinstance(path, SVGUse):
+            try:
+                assert defs[path.path.id] is path.path
+            except KeyError:
+                defs[path.path.id] = path.path
+                file.write(DEFS_HEADER)
+                file.writelines(path.path.iter_format(precision))
+                file.write(DEFS_FOOTER)
+        attribute_class = style_class if css_classes else None
+        if isinstance(path, SVGStreamedPath):
+            file.writelines(path.iter_format(precision, attribute_class))
+            file.write("\n")
+        else:
+            file.write(f"{path.format(precision, attribute_class)}\n")
+    if tile is not None:
+        file.write(PATTERN_FOOTER_TEMPLATE.format(**locals()))
+    if css_classes:
+        rules = "".join(
+            f".{style_class}{{{str(style)}}}\n"
+            for style, style_class in style_classes.items()
+        )
+        file.write(STYLE_FOOTER_TEMPLATE.format(rules=rules))
+    else:
+        file.write(SVG_FOOTER)
+
 
+DEFS_HEADER = """\
+<defs>
+"""
 
-SVG_TEMPLATE = """\
+
+DEFS_FOOTER = """
+</defs>
+"""
+
+
+SVG_HEADER_TEMPLATE = """\
 <?xml version="1.0" encoding="UTF-8" standalone="no"?>
 <svg
    width="{width}px"
@@ -111,6 +639,30 @@ SVG_TEMPLATE = """\
 <rect width="100%" height="100%" fill="{background_color}"/>
 <!-- Flip the y axis and move the origin to the bottom left corner -->
 <g transform="translate(0,{height}) scale(1,-1)">
-{paths_str}
+"""
+
+
+PATTERN_HEADER_TEMPLATE = """\
+<pattern id="tile" width="{tile_width}" height="{tile_height}" \
+patternUnits="userSpaceOnUse">
+"""
+
+
+PATTERN_FOOTER_TEMPLATE = """\
+</pattern>
+<rect width="{width}" height="{height}" fill="url(#tile)"/>
+"""
+
+
+SVG_FOOTER = """\
+</g>
+</svg>
+"""
+
+
+STYLE_FOOTER_TEMPLATE = """\
 </g>
-</svg>"""
+<style>
+{rules}</style>
+</svg>
+"""
@@ -3,9 +3,29 @@
 __author__ = "ccornix"
 __copyright__ = "Copyright (C) 2024 ccornix"
 __license__ = "MIT"
-__all__ = ["TNum"]
+__all__ = ["TArray", "TChunksFn", "TMatrix", "TNum", "TPoints"]
 
-from sympy import Expr
-from typing import TypeAlias
+from collections.abc import Callable, Iterable, Sequence
+from numpy.typing import NDArray
+from typing import TYPE_CHECKING, TypeAlias
+import numpy as np
 
-TNum: TypeAlias = int | Expr
+# Sympy is only needed for type checking here, so that importing the aliases
+# does not pay its import cost
+if TYPE_CHECKING:
+    from sympy import Expr, Matrix
+
+TNum: TypeAlias = "int | float | Expr"
+
+# Path points as an (N, 2) array of floats
+TArray: TypeAlias = NDArray[np.float64]
+
+# Path points in either the exact sympy or the float NumPy representation
+TPoints: TypeAlias = "Sequence[Matrix] | TArray"
+
+# Function returning a new iterable of chunks of consecutive path points each
+# time it is called, which concatenate to a path
+TChunksFn: TypeAlias = "Callable[[], Iterable[TPoints]]"
+
+# 2x2 transformation matrix in either representation
+TMatrix: TypeAlias = "Matrix | TArray"
@@ -1,25 +1,90 @@
 """Helper script to recolor an existing SVG file with custom palette tag."""
 
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO
 import argparse
+import array
+import contextlib
+import json
+import mmap
+import os
 import pathlib
 import re
+import sys
 
 PALETTE_PATTERN = re.compile(
     r"<ccornix:palette>([#0-9a-fA-F\s]+)<\/ccornix:palette>"
 )
+PALETTE_BYTES_PATTERN = re.compile(PALETTE_PATTERN.pattern.encode())
 COLOR_PATTERN = re.compile(r"^#[0-9a-fA-F]{6}$")
+COLOR_LENGTH = len("#000000")
+
+# Start of the graphics, and the trailing CSS style block of SVG files styled
+# by classes, outside of which the graphics contain no colors
+GRAPHICS_START = b"<g transform="
+STYLE_START = b"\n<style>\n"
+STYLE_END = b"</style>\n</svg>\n"
+
+# Color index sidecar files
+INDEX_SUFFIX = ".colorindex"
+INDEX_MAGIC = b"ccornix-color-index 1\n"
 
 
 def main() -> None:  # noqa: D103
     args = parse_arguments()
-    svg = args.input_file.read_text()
-    print(
-        replace_palette(
-            svg,
-            old=extract_palette(svg),
-            new=[c if c.startswith("#") else f"#{c}" for c in args.palette],
-        )
-    )
+    new = normalize_palette(args.palette)
+    if args.input_file.is_dir():
+        if args.output is None:
+            sys.exit("an output directory is required to recolor a directory")
+        try:
+            recolor_directory(
+                args.input_file, args.output, new, args.jobs, args.index
+            )
+        except ValueError as error:
+            sys.exit(str(error))
+    elif args.variants is not None:
+        variants = read_variants(args.variants)
+        # Opening an output truncates it, so the input must not be one
+        if any(_is_same_file(args.input_file, path) for path, _ in variants):
+            sys.exit("a variant would overwrite the input file")
+        with contextlib.ExitStack() as stack:
+            variant_files = [
+                (stack.enter_context(output_path.open("wb")), palette)
+                for output_path, palette in variants
+            ]
+            recolor_variants(args.input_file, variant_files, args.index)
+    elif args.output is None:
+        recolor_file(args.input_file, sys.stdout.buffer, new, args.index)
+    elif _is_same_file(args.input_file, args.output):
+        sys.exit("the output file would overwrite the input file")
+    else:
+        with args.output.open("wb") as output_file:
+            recolor_file(args.input_file, output_file, new, args.index)
+
+
+def normalize_palette(palette: Sequence[str]) -> list[str]:
+    """Return palette colors with a leading hash mark."""
+    return [c if c.startswith("#") else f"#{c}" for c in palette]
+
+
+def read_variants(
+    path: pathlib.Path,
+) -> list[tuple[pathlib.Path, list[str]]]:
+    """Read output paths and palettes of recolored variants from a file.
+
+    Each non-empty line of the file consists of an output path followed by the
+    colors of the palette, separated by whitespace.
+    """
+    variants = []
+    for line in path.read_text().splitlines():
+        if line.strip():
+            output_path, *palette = line.split()
+            variants.append(
+                (pathlib.Path(output_path), normalize_palette(palette))
+            )
+    return variants
 
 
 def parse_arguments() -> argparse.Namespace:
@@ -30,7 +95,7 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument(
         "input_file",
         metavar="INPUT_FILE",
-        help="input SVG file",
+        help="input SVG file, or a directory of SVG files",
         type=pathlib.Path,
     )
     parser.add_argument(
@@ -42,7 +107,41 @@ def parse_arguments() -> argparse.Namespace:
             "mark; e.g. 22aaff"
         ),
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "-o",
+        "--output",
+        metavar="OUTPUT",
+        help=(
+            "output SVG file (default: standard output), or output directory "
+            "if INPUT_FILE is a directory"
+        ),
+        type=pathlib.Path,
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        help="number of files recolored concurrently in a directory",
+    )
+    parser.add_argument(
+        "--index",
+        action="store_true",
+        help=(
+            f"reuse the byte offsets of colors saved in a {INDEX_SUFFIX} "
+            "sidecar file next to each input file, creating it if needed"
+        ),
+    )
+    parser.add_argument(
+        "--variants",
+        metavar="VARIANTS_FILE",
+        help=(
+            "write several recolored variants of INPUT_FILE, each given on "
+            "a separate line of this file as an output path followed by "
+            "palette colors"
+        ),
+        type=pathlib.Path,
+    )
+    return parser.parse_intermixed_args()
 
 
 # NOTE: no need to fully parse SVG XML to just get palette colors
@@ -75,5 +174,189 @@ def replace_palette(svg: str, old: list[str], new: list[str]) -> str:
     return pattern.sub(lambda match: dct[re.escape(match.group(0))], svg)
 
 
+@dataclass(kw_only=True)
+class ColorIndex:
+    """Byte offsets of all palette color occurrences in an SVG file.
+
+    Each occurrence is stored as an offset into the file in `offsets` and as an
+    index into `palette` in `colors`.
+    """
+
+    palette: list[str]
+    offsets: array.array
+    colors: array.array
+
+    @classmethod
+    def scan(cls, svg: bytes | mmap.mmap) -> "ColorIndex":
+        """Index the palette colors of SVG code in a single pass.
+
+        If the paths of the SVG are styled by CSS classes, only the header
+        and the style block are scanned, since the paths contain no colors.
+        """
+        match = PALETTE_BYTES_PATTERN.search(svg)
+        assert match is not None
+        palette = match.group(1).decode().split()
+        assert all(COLOR_PATTERN.match(color) for color in palette)
+        lookup = {color.encode(): i for i, color in enumerate(palette)}
+        pattern = re.compile(b"|".join(map(re.escape, lookup)))
+        offsets = array.array("Q")
+        colors = array.array("B")
+        for start, end in _color_spans(svg):
+            for match in pattern.finditer(svg, start, end):
+                offsets.append(match.start())
+                colors.append(lookup[match.group(0)])
+        return cls(palette=palette, offsets=offsets, colors=colors)
+
+    def write(self, file: BinaryIO, stamp: dict[str, int]) -> None:
+        """Write the index to a sidecar `file` with a `stamp` of the SVG."""
+        header = {"palette": self.palette, "count": len(self.offsets)}
+        file.write(INDEX_MAGIC)
+        file.write(json.dumps(header | stamp).encode() + b"\n")
+        file.write(self.offsets.tobytes())
+        file.write(self.colors.tobytes())
+
+    @classmethod
+    def read(
+        cls, file: BinaryIO, stamp: dict[str, int]
+    ) -> "ColorIndex | None":
+        """Read the index from a sidecar `file` unless it is stale.
+
+        The index is stale if its stamp differs from the `stamp` of the SVG.
+        """
+        if file.readline() != INDEX_MAGIC:
+            return None
+        header = json.loads(file.readline())
+        if any(header.get(key) != value for key, value in stamp.items()):
+            return None
+        offsets = array.array("Q")
+        offsets.fromfile(file, header["count"])
+        colors = array.array("B")
+        colors.fromfile(file, header["count"])
+        return cls(palette=header["palette"], offsets=offsets, colors=colors)
+
+    def splice(
+        self, svg: bytes | mmap.mmap, new: Sequence[str], file: BinaryIO
+    ) -> None:
+        """Write SVG code with palette colors replaced by `new` to a `file`."""
+        assert len(new) >= len(self.palette)
+        replacements = [color.encode() for color in new]
+        assert all(len(color) == COLOR_LENGTH for color in replacements)
+        start = 0
+        for offset, color in zip(self.offsets, self.colors):
+            file.write(svg[start:offset])
+            file.write(replacements[color])
+            start = offset + COLOR_LENGTH
+        file.write(svg[start:])
+
+
+def _color_spans(svg: bytes | mmap.mmap) -> list[tuple[int, int]]:
+    # Return the byte ranges of SVG code that may contain colors
+    size = len(svg)
+    tail_start = max(size - len(STYLE_END), 0)
+    if svg[tail_start:] != STYLE_END:
+        return [(0, size)]
+    graphics_start = svg.find(GRAPHICS_START)
+    style_start = svg.rfind(STYLE_START)
+    assert 0 <= graphics_start < style_start
+    return [(0, graphics_start), (style_start, size)]
+
+
+def load_color_index(
+    input_path: pathlib.Path, svg: bytes | mmap.mmap, sidecar: bool
+) -> ColorIndex:
+    """Return the color index of an SVG file.
+
+    If `sidecar` is true, the index is read from a sidecar file next to the
+    SVG file, which is (re-)created if it is missing or stale.
+    """
+    if not sidecar:
+        return ColorIndex.scan(svg)
+    stat = input_path.stat()
+    stamp = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    index_path = input_path.with_name(input_path.name + INDEX_SUFFIX)
+    try:
+        with index_path.open("rb") as index_file:
+            index = ColorIndex.read(index_file, stamp)
+    except (FileNotFoundError, EOFError, ValueError):
+        index = None
+    if index is None:
+        index = ColorIndex.scan(svg)
+        with index_path.open("wb") as index_file:
+            index.write(index_file, stamp)
+    return index
+
+
+def recolor_file(
+    input_path: pathlib.Path,
+    output_file: BinaryIO,
+    new: Sequence[str],
+    sidecar: bool = False,
+) -> None:
+    """Write a recolored copy of an SVG file to a binary `output_file`.
+
+    The input file is memory-mapped and processed as bytes: the byte offsets
+    of palette colors are indexed in a single pass (or read from a sidecar
+    file, see `load_color_index`), and the spans between them are written out
+    with the new colors spliced in, without decoding the file or holding a
+    recolored copy in memory.
+    """
+    recolor_variants(input_path, [(output_file, new)], sidecar)
+
+
+def recolor_variants(
+    input_path: pathlib.Path,
+    variants: Sequence[tuple[BinaryIO, Sequence[str]]],
+    sidecar: bool = False,
+) -> None:
+    """Write recolored copies of an SVG file with several palettes.
+
+    Each of the `variants` consists of a binary output file and a new palette.
+    The color occurrences of the memory-mapped input file are indexed only
+    once, after which each variant costs a single sequential write.
+    """
+    with input_path.open("rb") as input_file:
+        if input_path.stat().st_size == 0:
+            return
+        with mmap.mmap(input_file.fileno(), 0, access=mmap.ACCESS_READ) as svg:
+            index = None
+            for output_file, new in variants:
+                if not new:
+                    output_file.write(svg)
+                    continue
+                if index is None:
+                    index = load_color_index(input_path, svg, sidecar)
+                index.splice(svg, new, output_file)
+
+
+def recolor_directory(
+    input_dir: pathlib.Path,
+    output_dir: pathlib.Path,
+    new: Sequence[str],
+    max_workers: int | None = None,
+    sidecar: bool = False,
+) -> None:
+    """Recolor all SVG files of a directory into another one concurrently.
+
+    A `ValueError` is raised if the output directory is the input directory,
+    whose files would be truncated before being read.
+    """
+    if _is_same_file(input_dir, output_dir):
+        raise ValueError("the output directory is the input directory")
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    def recolor(input_path: pathlib.Path) -> None:
+        with (output_dir / input_path.name).open("wb") as output_file:
+            recolor_file(input_path, output_file, new, sidecar)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Consume the results to propagate exceptions
+        list(executor.map(recolor, sorted(input_dir.glob("*.svg"))))
+
+
+def _is_same_file(path: pathlib.Path, other: pathlib.Path) -> bool:
+    # Return whether two paths refer to the same existing file or directory
+    return other.exists() and os.path.samefile(path, other)
+
+
 if __name__ == "__main__":
     main()
@@ -6,6 +6,7 @@ let
     python-pkgs.flake8
     python-pkgs.ipython
     python-pkgs.mypy
+    python-pkgs.numpy
     python-pkgs.pytest
     python-pkgs.sympy
   ]);
@@ -0,0 +1,38 @@
+"""Unit tests for the benchmark script functions."""
+
+import itertools
+
+from benchmark import Benchmark, find_regressions, make_benchmarks
+
+
+def test_benchmark_run() -> None:
+    """Test timing a stage prepared by its setup function."""
+    setups = []
+    runs = itertools.count()
+
+    def setup():
+        setups.append(None)
+        return lambda: next(runs)
+
+    seconds = Benchmark(name="stage", setup=setup).run(repeat=2)
+    assert seconds > 0
+    assert len(setups) == 1 and next(runs) > 2
+
+
+def test_make_benchmarks() -> None:
+    """Test that all pipeline stages are benchmarked at several sizes."""
+    names = [benchmark.name for benchmark in make_benchmarks()]
+    assert len(names) == len(set(names))
+    assert "minkowski_island[numpy,6]" in names
+    assert "generate_grid[sympy,480x270]" in names
+    assert "SVGPath.__str__[numpy]" in names
+    assert "generate_svg[sympy]" in names
+    assert "replace_palette[hexagons]" in names
+
+
+def test_find_regressions() -> None:
+    """Test detecting results slower than baseline beyond a threshold."""
+    baseline = {"a": 1.0, "b": 1.0, "c": 1.0}
+    results = {"a": 1.2, "b": 1.3, "c": 0.5, "d": 9.0}
+    assert find_regressions(results, baseline, 0.25) == ["b"]
+    assert find_regressions(results, baseline, 0.1) == ["a", "b"]
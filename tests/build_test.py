@@ -0,0 +1,92 @@
+"""Unit tests for the build script functions."""
+
+from pathlib import Path
+
+from build import (
+    SCRIPTS_DIR,
+    build,
+    dependencies,
+    discover_generators,
+    make_target,
+)
+
+GENERATOR = """\
+import argparse
+from lib.cli import OPTION
+
+parser = argparse.ArgumentParser()
+parser.add_argument("-o", "--output")
+parser.add_argument("--fail", action="store_true")
+args = parser.parse_args()
+assert not args.fail
+with open(args.output, "w") as f:
+    f.write(OPTION)
+"""
+
+
+def make_scripts(directory: Path) -> Path:
+    """Create a directory of generator scripts with a `lib` package."""
+    scripts_dir = directory / "scripts"
+    (scripts_dir / "lib").mkdir(parents=True)
+    (scripts_dir / "lib" / "cli.py").write_text("from .text import OPTION\n")
+    (scripts_dir / "lib" / "text.py").write_text('OPTION = "a"\n')
+    (scripts_dir / "lib" / "unused.py").write_text("")
+    (scripts_dir / "wallpaper.py").write_text(GENERATOR)
+    (scripts_dir / "helper.py").write_text("import sys\n")
+    return scripts_dir
+
+
+def test_discover_generators() -> None:
+    """Test discovering the generator scripts of the repo."""
+    assert list(discover_generators(SCRIPTS_DIR)) == [
+        "gosperflakes2",
+        "hexagons",
+        "kochflakes3",
+        "minkowskiflakes4",
+    ]
+
+
+def test_dependencies(tmp_path: Path) -> None:
+    """Test collecting the transitive `lib` dependencies of a script."""
+    scripts_dir = make_scripts(tmp_path)
+    assert discover_generators(scripts_dir) == {
+        "wallpaper": scripts_dir / "wallpaper.py"
+    }
+    assert dependencies(scripts_dir / "wallpaper.py") == [
+        scripts_dir / "lib" / "cli.py",
+        scripts_dir / "lib" / "text.py",
+        scripts_dir / "wallpaper.py",
+    ]
+
+
+def test_build(tmp_path: Path) -> None:
+    """Test skipping up-to-date targets and rebuilding outdated ones."""
+    scripts_dir = make_scripts(tmp_path)
+    output_dir = tmp_path / "output"
+    script = scripts_dir / "wallpaper.py"
+    target = make_target("wallpaper", script, output_dir, [])
+    output_path = output_dir / "wallpaper.svg"
+    assert build([target], output_dir) == {"wallpaper": True}
+    assert output_path.read_text() == "a"
+    assert build([target], output_dir) == {}
+    # Changing a dependency or the arguments invalidates the output
+    (scripts_dir / "lib" / "text.py").write_text('OPTION = "b"\n')
+    target = make_target("wallpaper", script, output_dir, [])
+    assert build([target], output_dir) == {"wallpaper": True}
+    assert output_path.read_text() == "b"
+    target = make_target("wallpaper", script, output_dir, ["--fail"])
+    assert build([target], output_dir) == {"wallpaper": False}
+    assert output_path.read_text() == "b"
+    # A failed build leaves previous outputs valid
+    target = make_target("wallpaper", script, output_dir, [])
+    assert build([target], output_dir) == {}
+    # Modifying or removing the output invalidates it
+    output_path.write_text("modified")
+    assert build([target], output_dir) == {"wallpaper": True}
+    output_path.unlink()
+    assert build([target], output_dir) == {"wallpaper": True}
+    assert build([target], output_dir, force=True) == {"wallpaper": True}
+    assert sorted(path.name for path in output_dir.iterdir()) == [
+        ".build-manifest.json",
+        "wallpaper.svg",
+    ]
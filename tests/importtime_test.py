@@ -0,0 +1,18 @@
+"""Unit tests for the import time measurement script functions."""
+
+from importtime import SCRIPTS_DIR, default_modules, measure_imports
+
+
+def test_measure_imports() -> None:
+    """Test measuring the import times of a module and its imports."""
+    times = measure_imports("lib.path")
+    assert {"lib.path", "lib.backend", "numpy"} <= set(times)
+    assert times["lib.path"] >= times["lib.backend"] > 0
+
+
+def test_no_sympy_import() -> None:
+    """Test that no module imports sympy before exact numbers are needed."""
+    modules = default_modules(SCRIPTS_DIR)
+    assert "lib.svg" in modules and "hexagons" in modules
+    for module in modules:
+        assert "sympy" not in measure_imports(module), module
@@ -0,0 +1,65 @@
+"""Unit tests for module `lib.batch`."""
+
+import functools
+import numpy as np
+import random
+
+from lib.batch import generate_svgs, map_resolutions
+from lib.grid import generate_grid, make_random_color_element_style_fn
+from lib.svg import generate_svg
+
+square = np.array([[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]], dtype=np.float64)
+
+PALETTE = ["#000000", "#111111", "#222222"]
+
+layout_fn = functools.partial(
+    generate_grid,
+    element_paths=[square],
+    spacings=(4, 4),
+    offsets_fn=None,
+    element_style_fn=make_random_color_element_style_fn(
+        fill_color=PALETTE[1:], stroke_color=PALETTE[0], stroke_width=1
+    ),
+)
+
+RESOLUTIONS = [(16, 8), (8, 8), (24, 12)]
+
+
+def test_map_resolutions() -> None:
+    """Test seeding the random module before each resolution."""
+    results = map_resolutions(
+        lambda resolution: (resolution, random.random()), RESOLUTIONS, seed=3
+    )
+    random.seed(3)
+    draw = random.random()
+    assert results == [(resolution, draw) for resolution in RESOLUTIONS]
+
+
+def test_generate_svgs() -> None:
+    """Test generating several resolutions as if each were generated alone."""
+    expected = []
+    for resolution in RESOLUTIONS:
+        random.seed(1)
+        expected.append(
+            generate_svg(
+                author="author",
+                title="title",
+                palette=PALETTE,
+                background_color=PALETTE[0],
+                paths=layout_fn(resolution=resolution),
+                resolution=resolution,
+            )
+        )
+    assert len(set(expected)) == len(RESOLUTIONS)
+    for max_workers in (1, 2):
+        svgs = generate_svgs(
+            layout_fn=layout_fn,
+            resolutions=RESOLUTIONS,
+            author="author",
+            title="title",
+            palette=PALETTE,
+            background_color=PALETTE[0],
+            seed=1,
+            max_workers=max_workers,
+        )
+        assert svgs == expected
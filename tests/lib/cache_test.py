@@ -0,0 +1,101 @@
+"""Unit tests for module `lib.cache`."""
+
+from pathlib import Path
+import numpy as np
+import os
+
+from lib.cache import IslandCache, cached_island
+from lib.lattice import Lattice, LatticePath, lattice_polygon_path
+
+
+calls: list[float] = []
+
+
+def square_lattice_island(
+    iterations: int, min_length: float = 0.0
+) -> LatticePath:
+    """Return a square, recording the calls by level of detail."""
+    calls.append(min_length)
+    return lattice_polygon_path(4, Lattice(order=4))
+
+
+def make_path(n: int = 3) -> LatticePath:
+    """Return a lattice path of `n` points with a denominator."""
+    coords = np.arange(2 * n, dtype=np.int64).reshape(n, 2)
+    return LatticePath(lattice=Lattice(order=6), coords=coords, denominator=9)
+
+
+def test_store_and_load(tmp_path: Path) -> None:
+    """Test a cache miss followed by storing and loading an entry."""
+    cache = IslandCache(directory=tmp_path)
+    assert cache.load("square", 1) is None
+    path = make_path()
+    cache.store("square", 1, path)
+    loaded = cache.load("square", 1)
+    assert loaded is not None
+    assert loaded.lattice == path.lattice
+    assert loaded.denominator == path.denominator
+    np.testing.assert_array_equal(loaded.coords, path.coords)
+    assert cache.load("square", 2) is None
+    # Corrupt entries are misses
+    cache.path("square", 1).write_bytes(b"corrupt")
+    assert cache.load("square", 1) is None
+
+
+def test_cached_island(tmp_path: Path) -> None:
+    """Test that an island is computed only once for all backends."""
+    cache = IslandCache(directory=tmp_path)
+    calls.clear()
+    first = cached_island(square_lattice_island, 1, "numpy", cache)
+    second = cached_island(square_lattice_island, 1, "numpy", cache)
+    np.testing.assert_array_equal(first, second)
+    exact = cached_island(square_lattice_island, 1, "sympy", cache)
+    assert exact == square_lattice_island(1).to_backend("sympy")
+    assert calls == [0.0, 0.0]
+    # Islands of a limited level of detail are always recomputed
+    cached_island(square_lattice_island, 1, "numpy", cache, min_length=0.1)
+    assert calls == [0.0, 0.0, 0.1]
+
+
+def test_invalidate(tmp_path: Path) -> None:
+    """Test selective and complete removal of entries."""
+    cache = IslandCache(directory=tmp_path)
+    path = make_path()
+    for island in ("koch_island", "gosper_island"):
+        for iterations in (1, 2):
+            cache.store(island, iterations, path)
+    assert cache.invalidate(island="koch_island", iterations=2) == 1
+    assert cache.load("koch_island", 2) is None
+    assert cache.load("koch_island", 1) is not None
+    assert cache.invalidate() == 3
+    assert cache.entries() == []
+    # Island names may contain dashes, and other files are left alone
+    cache.store("my-island", 3, path)
+    foreign_paths = [tmp_path / "v1-notes.npy", tmp_path / "vx-a-1-numpy.npy"]
+    for foreign_path in foreign_paths:
+        np.save(foreign_path, path.coords)
+    assert cache.invalidate(island="my-island", iterations=3) == 1
+    assert cache.load("my-island", 3) is None
+    assert cache.invalidate() == 0
+    assert all(path.exists() for path in foreign_paths)
+    # Entries of earlier versions, keyed by backend as well, are cleared
+    np.save(tmp_path / "v3-my-island-3-numpy.npy", path.coords)
+    assert cache.invalidate(island="my-island") == 1
+
+
+def test_eviction(tmp_path: Path) -> None:
+    """Test that least recently used entries are evicted first."""
+    path = make_path(100)
+    cache = IslandCache(directory=tmp_path)
+    cache.store("a", 1, path)
+    size = cache.path("a", 1).stat().st_size
+    cache.max_bytes = 2 * size
+    cache.store("b", 1, path)
+    # Make entry "a" the most recently used one
+    past = cache.path("b", 1).stat().st_mtime - 10
+    os.utime(cache.path("b", 1), (past, past))
+    cache.load("a", 1)
+    cache.store("c", 1, path)
+    assert cache.load("a", 1) is not None
+    assert cache.load("b", 1) is None
+    assert cache.load("c", 1) is not None
@@ -0,0 +1,65 @@
+"""Unit tests for module `lib.cli`."""
+
+from pathlib import Path
+import pytest
+import sys
+
+from lib.cli import output_path, parse_arguments
+
+
+def test_output_path() -> None:
+    """Test replacing only the resolution placeholders in file names."""
+    assert output_path("a-{width}x{height}.svg", (3, 2)) == "a-3x2.svg"
+    assert output_path("{w}/{0}-{width}.svg", (3, 2)) == "{w}/{0}-3.svg"
+    assert output_path("-", (3, 2)) == "-"
+
+
+def test_parse_arguments(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test checking the outputs at all resolutions before any work."""
+
+    def parse(*argv: str):
+        monkeypatch.setattr(sys, "argv", ["script", *argv])
+        return parse_arguments(
+            "description", resolution=(4, 2), spacings=(4, 2), row_period=2
+        )
+
+    assert parse().resolution == [(4, 2)]
+    template = str(tmp_path / "{width}x{height}.svg")
+    args = parse("-r", "8x4", "-r", "6x3", "-o", template)
+    assert args.resolution == [(8, 4), (6, 3)]
+    assert list(tmp_path.iterdir()) == []
+    assert parse("--pattern", "8x4").pattern == (8, 4)
+    for argv in (
+        ["-r", "8x4", "-r", "6x3", "-o", str(tmp_path / "a.svg")],
+        ["-o", str(tmp_path / "missing" / "a.svg")],
+        ["--png", str(tmp_path)],
+        # Pattern tiles must span whole cells and an even number of rows
+        ["--pattern", "6x4"],
+        ["--pattern", "8x2"],
+    ):
+        with pytest.raises(SystemExit):
+            parse(*argv)
+    # Island options are only offered to generators of islands
+    with pytest.raises(SystemExit):
+        parse("--lod", "1")
+    monkeypatch.setattr(sys, "argv", ["script", "--lod", "1", "--no-cache"])
+    args = parse_arguments(
+        "description", resolution=(4, 2), spacings=(4, 2), islands=True
+    )
+    assert args.lod == 1 and args.no_cache
+    # Streamed islands are always instanced and can only be laid out as such
+    for argv in (["--streamed", "--lod", "1"], ["--iterations", "-1"]):
+        monkeypatch.setattr(sys, "argv", ["script", *argv])
+        with pytest.raises(SystemExit):
+            parse_arguments(
+                "description", resolution=(4, 2), spacings=(4, 2), islands=True
+            )
+    monkeypatch.setattr(
+        sys, "argv", ["script", "--streamed", "--iterations", "5"]
+    )
+    args = parse_arguments(
+        "description", resolution=(4, 2), spacings=(4, 2), islands=True
+    )
+    assert args.instanced and args.iterations == 5
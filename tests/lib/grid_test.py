@@ -1,10 +1,27 @@
 """Unit tests for module `lib.grid`."""
 
 from sympy import Matrix
+from typing import Any
+import numpy as np
+import random
 
-from lib.grid import generate_grid
-from lib.path import shift
-from lib.svg import SVGPath, SVGPathStyle
+from lib.gosper import gosper_island
+from lib.grid import (
+    generate_grid,
+    iter_grid,
+    make_random_color_element_style_fn,
+    share_strokes,
+    simplified_grid_paths,
+)
+from lib.path import scale, shift, simplified_path, to_array
+from lib.profiling import Profiler
+from lib.svg import (
+    SVGCompoundPath,
+    SVGPath,
+    SVGPathStyle,
+    SVGUse,
+    path_data,
+)
 
 
 rectangle = [
@@ -16,18 +33,31 @@ rectangle = [
 ]
 
 
-def test_rectangular_grid() -> None:
-    """Test path generation for a 3x3 rectangular grid with seamless style."""
+def element_style_fn(ix, iy):
+    """Return a style that encodes the cell indices in its colors."""
+    return [
+        SVGPathStyle(
+            fill_color=f"#{str(ix)*6}",
+            stroke_color=f"#{str(iy)*6}",
+            stroke_width=1,
+        )
+    ]
+
+
+def make_grid(**overrides: Any) -> list[SVGPath | SVGUse]:
+    """Return a grid of rectangles with `overrides` of `generate_grid` args."""
+    arguments: dict[str, Any] = dict(
+        element_paths=[rectangle],
+        spacings=(4, 2),
+        offsets_fn=None,
+        resolution=(8, 4),
+        element_style_fn=element_style_fn,
+    )
+    return generate_grid(**(arguments | overrides))
 
-    def element_style_fn(ix, iy):
-        return [
-            SVGPathStyle(
-                fill_color=f"#{str(ix)*6}",
-                stroke_color=f"#{str(iy)*6}",
-                stroke_width=1,
-            )
-        ]
 
+def test_rectangular_grid() -> None:
+    """Test path generation for a 3x3 rectangular grid with seamless style."""
     paths = generate_grid(
         element_paths=[rectangle],
         spacings=(4, 2),
@@ -95,3 +125,391 @@ def test_rectangular_grid() -> None:
             ),
         ),
     ]
+
+
+def test_array_grid() -> None:
+    """Test that array element paths yield the same grid as exact ones."""
+    exact_paths, array_paths = (
+        make_grid(element_paths=[path], offsets_fn=lambda ix, iy: (iy % 2, 0))
+        for path in (rectangle, to_array(rectangle))
+    )
+    assert len(array_paths) == len(exact_paths)
+    for array_path, exact_path in zip(array_paths, exact_paths):
+        assert array_path.style == exact_path.style
+        np.testing.assert_array_equal(
+            array_path.points, to_array(exact_path.points)
+        )
+
+
+def test_uneven_grid() -> None:
+    """Test covering a resolution that is not a multiple of the spacings."""
+    paths = generate_grid(
+        element_paths=[rectangle],
+        spacings=(4, 2),
+        offsets_fn=None,
+        resolution=(10, 5),
+        element_style_fn=element_style_fn,
+    )
+    # The cells are counted up to the edges, and their styles do not wrap
+    assert len(paths) == 4 * 4
+    assert [path.style.fill_color[1] for path in paths[:4]] == list("0123")
+    assert [path.style.stroke_color[1] for path in paths[::4]] == list("0123")
+
+
+def test_simplified_grid_paths() -> None:
+    """Test keeping the same points along the edges shared by neighbors."""
+    # A Gosper island tiles a hexagonal grid with shifted odd rows
+    island = scale(gosper_island(2, "numpy"), (32 / np.sqrt(3), 18))
+    spacings = (32, 27)
+
+    def offsets_fn(ix: int, iy: int) -> tuple[int, int]:
+        return (16 * (iy % 2), 0)
+
+    def shared_points(paths):
+        # Return the points that each path keeps of those it shares with
+        # each neighbor, the latter being shifted relative to the former
+        def quantized(array):
+            return set(map(tuple, np.round(array, 6).tolist()))
+
+        for ix, iy in ((1, 0), (0, 1), (-1, 1)):
+            offsets = np.add(offsets_fn(ix, iy), (ix * 32, iy * 27))
+            shared = quantized(island) & quantized(island + offsets)
+            yield (
+                quantized(paths[0]) & shared,
+                quantized(paths[0] + offsets) & shared,
+            )
+
+    [simplified] = simplified_grid_paths(
+        [island], spacings=spacings, offsets_fn=offsets_fn, tolerance=1
+    )
+    assert len(simplified) < len(island)
+    assert all(a == b for a, b in shared_points([simplified]))
+    # Simplifying each island on its own keeps different points
+    alone = simplified_path(island, 1)
+    assert any(a != b for a, b in shared_points([alone]))
+    # The junctions of three islands are kept
+    corners = island[:: (len(island) - 1) // 6]
+    assert {tuple(p) for p in corners} <= {tuple(p) for p in simplified}
+
+
+def test_instanced_grid() -> None:
+    """Test that an instanced grid shares a single element path definition."""
+    paths = generate_grid(
+        element_paths=[rectangle],
+        spacings=(4, 2),
+        offsets_fn=None,
+        resolution=(8, 4),
+        element_style_fn=element_style_fn,
+        instance_id="rectangle",
+    )
+    assert len(paths) == 9
+    assert all(isinstance(path, SVGUse) for path in paths)
+    uses = [path for path in paths if isinstance(path, SVGUse)]
+    assert {path.path.id for path in uses} == {"rectangle-0"}
+    assert all(path.path.points is rectangle for path in uses)
+    assert [path.offsets for path in uses] == [
+        (ix * 4, iy * 2) for iy in range(3) for ix in range(3)
+    ]
+    assert uses[4].style == SVGPathStyle(
+        fill_color="#111111", stroke_color="#111111", stroke_width=1
+    )
+
+
+def test_streamed_instanced_grid() -> None:
+    """Test instancing element paths streamed in chunks, never stored."""
+    array = to_array(rectangle)
+    calls = []
+
+    def chunks_fn():
+        calls.append(None)
+        return [array[:2], array[2:]]
+
+    paths = make_grid(
+        element_paths=[chunks_fn],
+        offsets_fn=lambda ix, iy: (-3, 0),
+        instance_id="rectangle",
+        cull=True,
+    )
+    expected = make_grid(
+        element_paths=[array],
+        offsets_fn=lambda ix, iy: (-3, 0),
+        instance_id="rectangle",
+        cull=True,
+    )
+    assert [(path.offsets, path.style) for path in paths] == [
+        (path.offsets, path.style) for path in expected
+    ]
+    uses = [path for path in paths if isinstance(path, SVGUse)]
+    assert all(path.path.points is None for path in uses)
+    # The chunks are only gone through for the bounding box of the element
+    assert len(calls) == 1
+
+
+def test_lazy_grid() -> None:
+    """Test that grid paths are produced lazily in row-major order."""
+    styled_cells = []
+
+    def recording_style_fn(ix, iy):
+        styled_cells.append((ix, iy))
+        return element_style_fn(ix, iy)
+
+    paths = iter_grid(
+        element_paths=[to_array(rectangle)],
+        spacings=(4, 2),
+        offsets_fn=None,
+        resolution=(8, 4),
+        element_style_fn=recording_style_fn,
+    )
+    assert styled_cells == []
+    first = next(paths)
+    assert isinstance(first, SVGPath)
+    np.testing.assert_array_equal(first.points, to_array(rectangle))
+    assert styled_cells == [(0, 0)]
+    assert len(list(paths)) == 8
+
+
+def test_culled_and_clipped_grid() -> None:
+    """Test dropping hidden cells and clipping cells at the image edges."""
+    full = make_grid(offsets_fn=lambda ix, iy: (-3, 0))
+    culled = make_grid(offsets_fn=lambda ix, iy: (-3, 0), cull=True)
+    # The last column of cells spans 3 < x < 7 and is thus visible, while the
+    # first one spans -5 < x < -1 (-5.5 < x < -0.5 with strokes) and is not
+    assert culled == [path for i, path in enumerate(full) if i % 3 != 0]
+    clipped = make_grid(
+        offsets_fn=lambda ix, iy: (-3, 0), cull=True, clip=True
+    )
+    assert len(clipped) == 6
+    for path in clipped:
+        assert isinstance(path, SVGPath)
+        xmin, ymin = np.min(path.points, axis=0)
+        xmax, ymax = np.max(path.points, axis=0)
+        assert xmin >= -1 and ymin >= -1 and xmax <= 9 and ymax <= 5
+    # Open element paths are left unclipped
+    polyline = np.array([[0, 0], [3, 0], [3, 3]], dtype=np.float64)
+    open_paths = make_grid(
+        element_paths=[polyline], offsets_fn=lambda ix, iy: (-3, 0), clip=True
+    )
+    assert len(open_paths) == 9
+    for path in open_paths:
+        assert isinstance(path, SVGPath)
+        assert len(path.points) == 3
+
+
+def test_parallel_grid() -> None:
+    """Test laying out rows of cells in worker processes."""
+    style_fn = make_random_color_element_style_fn(
+        fill_color=["#111111", "#222222", "#333333"],
+        stroke_color="#000000",
+        stroke_width=1,
+    )
+    for kwargs in (
+        dict(element_style_fn=style_fn),
+        dict(element_style_fn=element_style_fn, cull=True, clip=True),
+    ):
+        kwargs |= dict(
+            element_paths=[to_array(rectangle)],
+            offsets_fn=lambda ix, iy: (-3 * (iy % 2), 0),
+            resolution=(16, 8),
+        )
+        random.seed(3)
+        expected = make_grid(**kwargs)
+        for max_workers in (2, 3):
+            random.seed(3)
+            paths = make_grid(max_workers=max_workers, **kwargs)
+            assert len(paths) == len(expected)
+            for path, expected_path in zip(paths, expected):
+                assert isinstance(path, SVGPath)
+                assert path.style == expected_path.style
+                np.testing.assert_array_equal(
+                    to_array(path.points), to_array(expected_path.points)
+                )
+                # Path data rendered by workers are those of the points
+                assert path.rendered == (None, path_data(path.points))
+                assert str(path) == str(expected_path)
+
+
+def test_random_color_draws() -> None:
+    """Test drawing colors in bulk like `random.choice` for any count."""
+    for n in (1, 2, 3, 4, 5, 7, 8, 9, 31, 33, 100, 257):
+        colors = [f"#{i:06x}" for i in range(n)]
+        for style_fn in (
+            make_random_color_element_style_fn(
+                fill_color=colors, stroke_color="#000000", stroke_width=1
+            ),
+            make_random_color_element_style_fn(
+                fill_color="#000000", stroke_color=colors, stroke_width=1
+            ),
+        ):
+            random.seed(n)
+            expected = [random.choice(range(n)) for _ in range(500)]
+            expected_next = random.random()
+            random.seed(n)
+            assert style_fn.choose(500).tolist() == expected
+            # The generator is advanced by exactly the draws used
+            assert random.random() == expected_next
+    # A single color given as a sequence is drawn as well
+    style_fn = make_random_color_element_style_fn(
+        fill_color=["#000000"],
+        stroke_color=["#111111", "#222222", "#333333"],
+        stroke_width=1,
+    )
+    random.seed(1)
+    expected = [
+        random.choice(range(1)) * 3 + random.choice(range(3))
+        for _ in range(500)
+    ]
+    expected_next = random.random()
+    random.seed(1)
+    assert style_fn.choose(500).tolist() == expected
+    assert random.random() == expected_next
+
+
+def test_profiled_grid_styles() -> None:
+    """Test attributing the drawing of grid styles to a profiler stage."""
+    style_fn = make_random_color_element_style_fn(
+        fill_color=["#111111", "#222222"],
+        stroke_color="#000000",
+        stroke_width=1,
+    )
+    for fn, calls in ((style_fn, 1), (element_style_fn, 16)):
+        profiler = Profiler()
+        paths = iter_grid(
+            element_paths=[rectangle],
+            spacings=(4, 2),
+            offsets_fn=None,
+            resolution=(16, 8),
+            element_style_fn=fn,
+            profiler=profiler,
+        )
+        assert len(list(paths)) == 25
+        assert profiler.stages["styling"].calls == calls
+
+
+def test_random_color_styles() -> None:
+    """Test drawing shared random styles equal to per-path choices."""
+    colors = ["#111111", "#222222", "#333333"]
+    style_fn = make_random_color_element_style_fn(
+        fill_color=colors, stroke_color="#000000", stroke_width=1, count=2
+    )
+    assert len(style_fn.styles) == 3
+    random.seed(1)
+    cells = [style_fn(0, 0) for _ in range(500)]
+    after = random.random()
+    random.seed(1)
+    expected = [[random.choice(colors) for _ in range(2)] for _ in range(500)]
+    # The random generator is advanced exactly as by `random.choice`
+    assert random.random() == after
+    assert [[style.fill_color for style in cell] for cell in cells] == expected
+    assert all(
+        style is style_fn.styles[colors.index(style.fill_color)]
+        for cell in cells
+        for style in cell
+    )
+
+
+def test_random_color_grid() -> None:
+    """Test drawing the random styles of a whole grid at once."""
+    colors = ["#111111", "#222222", "#333333", "#444444", "#555555"]
+    style_fn = make_random_color_element_style_fn(
+        fill_color=colors, stroke_color="#000000", stroke_width=1, count=2
+    )
+
+    def reference_style_fn(ix, iy):
+        return [
+            SVGPathStyle(
+                fill_color=random.choice(colors),
+                stroke_color="#000000",
+                stroke_width=1,
+            )
+            for _ in range(2)
+        ]
+
+    random.seed(2)
+    paths = make_grid(
+        element_paths=[rectangle, rectangle],
+        resolution=(16, 8),
+        element_style_fn=style_fn,
+    )
+    state = random.getstate()
+    random.seed(2)
+    expected = make_grid(
+        element_paths=[rectangle, rectangle],
+        resolution=(16, 8),
+        element_style_fn=reference_style_fn,
+    )
+    assert paths == expected
+    assert random.getstate() == state
+
+
+def test_keyed_color_grid() -> None:
+    """Test hashing random styles of cells independently of each other."""
+    colors = ["#111111", "#222222", "#333333"]
+    style_fn = make_random_color_element_style_fn(
+        fill_color=colors,
+        stroke_color=["#000000", "#444444"],
+        stroke_width=1,
+        count=2,
+        seed=5,
+    )
+    assert len(style_fn.styles) == 6
+    kwargs: dict[str, Any] = dict(
+        element_paths=[to_array(rectangle)] * 2,
+        offsets_fn=lambda ix, iy: (-3, 0),
+        element_style_fn=style_fn,
+    )
+    random.seed(1)
+    paths = make_grid(resolution=(16, 8), **kwargs)
+    # The global random generator is left alone
+    assert random.random() == random.Random(1).random()
+    # Cells are styled alike by random access and in grids of any size
+    assert [path.style for path in paths[:8]] == [
+        style for ix in range(4) for style in style_fn(ix, 0)
+    ]
+    larger = make_grid(resolution=(24, 8), **kwargs)
+    assert [path.style for path in larger[:8]] == [
+        path.style for path in paths[:8]
+    ]
+    # Culling the first column does not change the styles of the others
+    culled = make_grid(resolution=(16, 8), cull=True, **kwargs)
+    kept = [path for i, path in enumerate(paths) if i // 2 % 5]
+    assert [path.style for path in culled] == [path.style for path in kept]
+    for path, kept_path in zip(culled, kept):
+        np.testing.assert_array_equal(path.points, kept_path.points)
+    assert len({path.style for path in paths}) > 1
+
+
+def test_shared_strokes() -> None:
+    """Test stroking each edge shared by the cells of a grid once."""
+    paths = generate_grid(
+        element_paths=[rectangle],
+        spacings=(4, 2),
+        offsets_fn=None,
+        resolution=(8, 4),
+        element_style_fn=element_style_fn,
+    )
+    shared = list(share_strokes(paths))
+    fills, network = shared[:9], shared[9:]
+    for path, fill in zip(paths, fills):
+        assert isinstance(fill, SVGPath)
+        assert fill.points is path.points
+        assert fill.style.fill_color == path.style.fill_color
+        assert fill.style.stroke_width == 0
+    # Strokes are grouped by the stroke colors of the rows of cells
+    assert [path.style.stroke_color for path in network] == [
+        "#000000",
+        "#111111",
+    ]
+    assert all(isinstance(path, SVGCompoundPath) for path in network)
+    assert all(path.style.fill_color == "none" for path in network)
+    edges = {
+        (float(x0), float(y0), float(x1), float(y1)): path.style.stroke_color
+        for path in network
+        if isinstance(path, SVGCompoundPath)
+        for points in path.subpaths
+        for (x0, y0), (x1, y1) in zip(to_array(points), to_array(points)[1:])
+    }
+    # The 3x3 cells have 12 horizontal and 12 vertical distinct edges, and
+    # edges between rows take the stroke of the upper row painted last
+    assert len(edges) == 24
+    assert edges[-2.0, 1.0, 2.0, 1.0] == "#111111"
+    assert edges[-2.0, -1.0, 2.0, -1.0] == "#000000"
@@ -0,0 +1,116 @@
+"""Unit tests for module `lib.lattice`."""
+
+from sympy import Matrix, Rational, eye, sqrt
+import numpy as np
+import pytest
+
+from lib.gosper import gosper_rule
+from lib.koch import koch_island, koch_lattice_island, koch_rule
+from lib.lattice import (
+    Lattice,
+    LatticePath,
+    lattice_polygon_path,
+    lattice_rule,
+    refined_lattice_path,
+)
+from lib.minkowski import minkowski_rule
+from lib.path import iter_refined_path, to_array
+from lib.poly import regular_polygon_path
+
+
+def test_lattice_polygon_path() -> None:
+    """Test regular polygons with vertices on lattices."""
+    hexagonal, square = Lattice(order=6), Lattice(order=4)
+    triangle = lattice_polygon_path(3, hexagonal)
+    assert triangle.coords.tolist() == [[1, 0], [0, -1], [-1, 1], [1, 0]]
+    for n, lattice in ((3, hexagonal), (6, hexagonal), (4, square)):
+        path = lattice_polygon_path(n, lattice)
+        assert path.to_backend("sympy") == regular_polygon_path(n)
+        np.testing.assert_allclose(
+            path.to_backend("numpy"),
+            regular_polygon_path(n, "numpy"),
+            atol=1e-15,
+        )
+    with pytest.raises(AssertionError):
+        lattice_polygon_path(4, hexagonal)
+
+
+def test_lattice_rule() -> None:
+    """Test expressing island rules as integer matrices on lattices."""
+    hexagonal, square = Lattice(order=6), Lattice(order=4)
+    assert lattice_rule(koch_rule("numpy"), hexagonal, 3).tolist() == [
+        [[1, 0], [0, 1]],
+        [[0, -1], [1, 1]],
+        [[1, 1], [-1, 0]],
+        [[1, 0], [0, 1]],
+    ]
+    assert lattice_rule(gosper_rule("numpy"), hexagonal, 7).tolist() == [
+        [[2, -1], [1, 3]],
+        [[3, 2], [-2, 1]],
+        [[2, -1], [1, 3]],
+    ]
+    assert lattice_rule(minkowski_rule("numpy"), square, 5).tolist() == [
+        [[2, -1], [1, 2]],
+        [[1, 2], [-2, 1]],
+        [[2, -1], [1, 2]],
+    ]
+    # Rotations by 45 degrees do not map the square lattice onto itself
+    with pytest.raises(AssertionError):
+        lattice_rule([Matrix([[1, -1], [1, 1]]) / sqrt(2)], square, 2)
+
+
+def test_refined_lattice_path() -> None:
+    """Test exact refinement with integer coordinates."""
+    lattice = Lattice(order=4)
+    path = LatticePath(
+        lattice=lattice,
+        coords=np.array([[0, 0], [2, 0], [2, 2], [0, 0]], dtype=np.int64),
+        denominator=2,
+    )
+    rule = [eye(2) / 2, Matrix([[0, -1], [1, 0]]) / 2, eye(2) / 2]
+    refined = refined_lattice_path(path, lattice_rule(rule, lattice, 2), 2, 2)
+    assert refined.denominator == 8
+    assert refined.coords.dtype == np.int64
+    exact = sum(iter_refined_path(path.to_backend("sympy"), rule, 2), [])
+    assert refined.to_backend("sympy") == exact
+    assert exact[4] == Matrix([-Rational(1, 2), Rational(1, 2)])
+    np.testing.assert_allclose(
+        refined.to_backend("numpy"), to_array(exact), atol=1e-15
+    )
+    with pytest.raises(AssertionError, match="int64"):
+        refined_lattice_path(path, lattice_rule(rule, lattice, 2), 2, 40)
+
+
+def test_level_of_detail() -> None:
+    """Test stopping refinement at segments of a minimum length."""
+    # All segments of the Koch island after n iterations have the length
+    # sqrt(3) / 3**n
+    full = koch_lattice_island(3)
+    assert koch_lattice_island(3, min_length=0.05).coords.tolist() == (
+        full.coords.tolist()
+    )
+    coarse = koch_lattice_island(3, min_length=0.2)
+    assert coarse.denominator == 9
+    assert len(coarse.coords) == 3 * 4**2 + 1
+    assert koch_island(3, min_length=0.2) == koch_island(2)
+    # Segments are refined or not individually
+    lattice = Lattice(order=4)
+    path = LatticePath(
+        lattice=lattice,
+        coords=np.array([[0, 0], [4, 0], [4, 1], [0, 0]], dtype=np.int64),
+    )
+    halving = lattice_rule([eye(2) / 2, eye(2) / 2], lattice, 2)
+    refined = refined_lattice_path(path, halving, 2, 2, min_length=2)
+    assert refined.denominator == 4
+    # The long side is halved once and the short side never, while the
+    # halves of the diagonal are still long enough to be halved again
+    assert refined.coords.tolist() == [
+        [0, 0],
+        [8, 0],
+        [16, 0],
+        [16, 4],
+        [12, 3],
+        [8, 2],
+        [4, 1],
+        [0, 0],
+    ]
@@ -1,14 +1,22 @@
 """Unit tests for module `lib.path`."""
 
-from sympy import Matrix, Rational, pi
+from sympy import Matrix, Rational, eye, pi
+import numpy as np
 
 from lib.path import (
+    bounding_box,
+    clip_to_box,
+    iter_refined_path,
     points_to_segments,
     refined_segments,
     rotate,
     scale,
     segments_to_points,
     shift,
+    simplification_mask,
+    simplified_path,
+    to_array,
+    to_matrices,
 )
 
 
@@ -115,3 +123,115 @@ def test_division_refinement() -> None:
         Matrix([0, -1]),
         Matrix([0, -1]),
     ]
+
+
+def test_array_conversion() -> None:
+    """Test converting path points to an array and back."""
+    array = to_array(points)
+    assert array.shape == (5, 2)
+    assert array.dtype == np.float64
+    np.testing.assert_array_equal(to_array(to_matrices(array)), array)
+
+
+def test_array_points_segments_conversion() -> None:
+    """Test segment conversion of array points against the exact reference."""
+    array = to_array(points)
+    segments = points_to_segments(array)
+    np.testing.assert_array_equal(
+        segments, to_array(points_to_segments(points))
+    )
+    np.testing.assert_array_equal(
+        segments_to_points(segments, array[0]), array
+    )
+
+
+def test_array_transformations() -> None:
+    """Test array transformations against the exact reference."""
+    array = to_array(points)
+    np.testing.assert_array_equal(
+        scale(array, (Rational(1, 2), 3)),
+        to_array(scale(points, (Rational(1, 2), 3))),
+    )
+    np.testing.assert_array_equal(
+        shift(array, (1, 2)), to_array(shift(points, (1, 2)))
+    )
+    np.testing.assert_allclose(
+        rotate(array, pi / 2),
+        to_array(rotate(points, pi / 2)),
+        atol=1e-15,
+    )
+
+
+def test_iter_refined_path() -> None:
+    """Test producing refined exact and array points in chunks."""
+    rule = [eye(2) / 2, Matrix([[0, -1], [1, 0]]) / 2, eye(2) / 2]
+    segments = points_to_segments(points)
+    for _ in range(3):
+        segments = list(
+            refined_segments(segments, lambda v: [T * v for T in rule])
+        )
+    exact = segments_to_points(segments, points[0])
+    assert len(exact) == 4 * 3**3 + 1 and exact[-1] == points[0]
+    chunks = list(iter_refined_path(points, rule, 3, chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [10] * 10 + [9]
+    assert sum(chunks, []) == exact
+    array = to_array(points)
+    for chunk_size in (1, 5, 9, 2**16):
+        chunks = list(iter_refined_path(array, rule, 3, chunk_size))
+        assert all(len(chunk) for chunk in chunks)
+        np.testing.assert_allclose(
+            np.concatenate(chunks), to_array(exact), atol=1e-15
+        )
+        assert np.array_equal(chunks[-1][-1], array[0])
+
+
+def test_simplified_path() -> None:
+    """Test Douglas-Peucker simplification of exact and array points."""
+    zigzag = np.array(
+        [[0, 0], [1, 0.1], [2, 0], [3, -0.1], [4, 0], [4, 2], [0, 0]]
+    )
+    np.testing.assert_array_equal(
+        simplified_path(zigzag, 0.2), zigzag[[0, 4, 5, 6]]
+    )
+    # Collinear points are dropped at any tolerance
+    np.testing.assert_array_equal(
+        simplified_path(zigzag, 0.05), zigzag[[0, 1, 3, 4, 5, 6]]
+    )
+    assert len(simplified_path(zigzag, 5)) == 2
+    # Exact points are kept as they are
+    assert simplified_path(points, 0.5) == points
+    assert simplified_path(points, 3) == [points[0], points[2], points[4]]
+    # Pinned points are kept and split the path
+    np.testing.assert_array_equal(
+        simplified_path(zigzag, 0.2, pins=[2]), zigzag[[0, 2, 4, 5, 6]]
+    )
+    assert simplification_mask(zigzag, 5, pins=[3]).tolist() == [
+        True,
+        False,
+        False,
+        True,
+        False,
+        False,
+        True,
+    ]
+
+
+def test_bounding_box() -> None:
+    """Test bounding box computation of exact and array points."""
+    assert bounding_box(points) == (-2, -1, 2, 1)
+    assert bounding_box(to_array(points)) == (-2, -1, 2, 1)
+
+
+def test_clip_to_box() -> None:
+    """Test clipping a rectangle to a box overlapping a corner."""
+    clipped = clip_to_box(to_array(points), (0, 0, 3, 3))
+    np.testing.assert_array_equal(
+        clipped, [[0, 1], [0, 0], [2, 0], [2, 1], [0, 1]]
+    )
+
+
+def test_clip_to_outer_box() -> None:
+    """Test clipping a rectangle to a box containing or missing it."""
+    array = to_array(points)
+    np.testing.assert_array_equal(clip_to_box(array, (-5, -5, 5, 5)), array)
+    assert clip_to_box(array, (3, 3, 5, 5)).shape == (0, 2)
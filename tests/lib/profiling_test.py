@@ -0,0 +1,53 @@
+"""Unit tests for module `lib.profiling`."""
+
+from pathlib import Path
+import io
+import pstats
+
+from lib.profiling import Profiler, profiling
+
+
+def test_nested_stages() -> None:
+    """Test attributing calls, exclusive times and memory to stages."""
+    profiler = Profiler()
+
+    def produce():
+        for i in range(3):
+            yield profiler.wrap("styling", lambda: bytearray(2**20))()
+
+    with profiling(enabled=True, file=io.StringIO()):
+        with profiler.stage("serialization"):
+            items = list(profiler.iterate("layout", produce()))
+    assert len(items) == 3
+    assert list(profiler.stages) == ["styling", "layout", "serialization"]
+    styling = profiler.stages["styling"]
+    layout = profiler.stages["layout"]
+    serialization = profiler.stages["serialization"]
+    assert (styling.calls, layout.calls, serialization.calls) == (3, 4, 1)
+    assert min(styling.seconds, layout.seconds, serialization.seconds) >= 0
+    assert styling.peak_bytes >= 2**20
+    assert serialization.peak_bytes >= layout.peak_bytes >= 2**20
+
+
+def test_disabled_profiler() -> None:
+    """Test that a disabled profiler leaves functions and iterables as is."""
+    profiler = Profiler(enabled=False)
+    items = [1, 2]
+    assert profiler.iterate("layout", items) is items
+    assert profiler.wrap("styling", len) is len
+    with profiler.stage("islands"):
+        pass
+    assert profiler.stages == {}
+
+
+def test_profiling_report_and_dump(tmp_path: Path) -> None:
+    """Test reporting stage statistics and dumping cProfile statistics."""
+    report = io.StringIO()
+    dump_path = tmp_path / "profile.prof"
+    with profiling(True, str(dump_path), report) as profiler:
+        with profiler.stage("islands"):
+            sorted(range(1000))
+    lines = report.getvalue().splitlines()
+    assert lines[0].split() == ["stage", "calls", "time", "peak", "memory"]
+    assert lines[1].split()[:2] == ["islands", "1"]
+    assert pstats.Stats(str(dump_path)).get_stats_profile().func_profiles
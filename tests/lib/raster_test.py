@@ -0,0 +1,209 @@
+"""Unit tests for module `lib.raster`."""
+
+import io
+import numpy as np
+import struct
+import zlib
+
+from lib.grid import iter_grid
+from lib.raster import rasterize, write_png
+from lib.svg import (
+    SVGCompoundPath,
+    SVGPath,
+    SVGPathDef,
+    SVGPathStyle,
+    SVGStreamedPath,
+    SVGUse,
+)
+
+
+def square(x: float, y: float, size: float) -> np.ndarray:
+    """Return a closed square path with its bottom left corner at (x, y)."""
+    return np.array(
+        [[x, y], [x + size, y], [x + size, y + size], [x, y + size], [x, y]],
+        dtype=np.float64,
+    )
+
+
+fill_style = SVGPathStyle(
+    stroke_width=0, stroke_color="#000000", fill_color="#ffffff"
+)
+
+
+def test_rasterize_fill() -> None:
+    """Test filling a square with the y axis flipped."""
+    image = rasterize(
+        [SVGPath(points=square(1, 0, 2), style=fill_style)],
+        resolution=(4, 3),
+        background_color="#000000",
+    )
+    assert image.shape == (3, 4, 3)
+    assert (
+        image[:, :, 0] == [[0, 0, 0, 0], [0, 255, 255, 0], [0, 255, 255, 0]]
+    ).all()
+
+
+def test_rasterize_stroke() -> None:
+    """Test stroking a square over its fill."""
+    style = SVGPathStyle(
+        stroke_width=2, stroke_color="#ff0000", fill_color="#0000ff"
+    )
+    image = rasterize(
+        [SVGPath(points=square(2, 2, 4), style=style)],
+        resolution=(8, 8),
+        background_color="#000000",
+    )
+    red, blue = image[:, :, 0] == 255, image[:, :, 2] == 255
+    # The stroke covers one pixel on both sides of the edges
+    assert red[1:7, 1:7].sum() == red.sum() == 32
+    assert blue.sum() == 4
+    assert blue[3:5, 3:5].all()
+
+
+def test_rasterize_use_and_supersampling() -> None:
+    """Test anti-aliasing partially covered pixels of an instanced path."""
+    path = SVGPathDef(id="square", points=square(0, 0, 1.5))
+    image = rasterize(
+        [SVGUse(path=path, offsets=(0, 0.5), style=fill_style)],
+        resolution=(2, 2),
+        background_color="#000000",
+        scale=2,
+        supersampling=2,
+    )
+    assert image.shape == (4, 4, 3)
+    assert image[:, :, 1].tolist() == [
+        [255, 255, 255, 0],
+        [255, 255, 255, 0],
+        [255, 255, 255, 0],
+        [0, 0, 0, 0],
+    ]
+    image = rasterize(
+        [SVGUse(path=path, offsets=(0, 0.5), style=fill_style)],
+        resolution=(2, 2),
+        background_color="#000000",
+        supersampling=2,
+    )
+    assert image[:, :, 1].tolist() == [[255, 128], [128, 64]]
+
+
+def test_rasterize_compound_path() -> None:
+    """Test filling subpaths together, where opposite windings cut holes."""
+    image = rasterize(
+        [
+            SVGCompoundPath(
+                subpaths=[square(0, 0, 4), square(1, 1, 2)[::-1]],
+                style=fill_style,
+            ),
+            SVGCompoundPath(
+                subpaths=[square(5, 0, 1), square(5, 2, 600)],
+                style=fill_style,
+            ),
+        ],
+        resolution=(6, 700),
+        background_color="#000000",
+    )
+    assert (
+        image[-4:, :, 0]
+        == [
+            [255, 255, 255, 255, 0, 255],
+            [255, 0, 0, 255, 0, 255],
+            [255, 0, 0, 255, 0, 0],
+            [255, 255, 255, 255, 0, 255],
+        ]
+    ).all()
+    # The rows of the tall square span several bands
+    top, bottom = 700 - 602, 700 - 2
+    assert (image[top:bottom, 5, 0] == 255).all()
+    assert (image[:top, 5, 0] == 0).all()
+
+
+def test_rasterize_streamed_path() -> None:
+    """Test painting a path chunk by chunk like a whole one."""
+    style = SVGPathStyle(
+        stroke_width=1, stroke_color="#ff0000", fill_color="#0000ff"
+    )
+    angles = np.linspace(0, 2 * np.pi, 101)
+    # A star polygon winding around its center twice
+    radii = 8 + 6 * np.cos(5 * angles)
+    points = np.column_stack(
+        [10 + radii * np.cos(2 * angles), 10 + radii * np.sin(2 * angles)]
+    )
+    points[-1] = points[0]
+    expected = rasterize(
+        [SVGPath(points=points, style=style)],
+        resolution=(20, 20),
+        background_color="#000000",
+        supersampling=2,
+    )
+    image = rasterize(
+        [
+            SVGStreamedPath(
+                points_fn=lambda: np.array_split(points, 7), style=style
+            )
+        ],
+        resolution=(20, 20),
+        background_color="#000000",
+        supersampling=2,
+    )
+    np.testing.assert_array_equal(image, expected)
+    assert (image[10, 10] == [0, 0, 255]).all()
+
+
+def test_rasterize_tile() -> None:
+    """Test repeating a tile like the grid that it is periodic in."""
+    styles = [
+        SVGPathStyle(stroke_width=1, stroke_color="#ff0000", fill_color=color)
+        for color in ("#0000ff", "#00ff00")
+    ]
+
+    def layout(resolution: tuple[int, int]) -> list[SVGPath | SVGUse]:
+        # Squares centered on the grid points with alternating fills
+        return list(
+            iter_grid(
+                element_paths=[square(-2, -2, 4)],
+                spacings=(4, 4),
+                offsets_fn=None,
+                resolution=resolution,
+                element_style_fn=lambda ix, iy: [styles[ix % 2]],
+            )
+        )
+
+    for scale in (1, 1.5):
+        expected = rasterize(
+            layout((16, 12)),
+            resolution=(16, 12),
+            background_color="#000000",
+            scale=scale,
+            supersampling=2,
+        )
+        # The tile is repeated from the bottom left corner
+        image = rasterize(
+            layout((8, 8)),
+            resolution=(14, 10),
+            background_color="#000000",
+            scale=scale,
+            supersampling=2,
+            tile=(8, 8),
+        )
+        height, width = round(10 * scale), round(14 * scale)
+        assert image.shape == (height, width, 3)
+        np.testing.assert_array_equal(image, expected[-height:, :width])
+
+
+def test_write_png() -> None:
+    """Test the PNG chunks and the decoded image data."""
+    image = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+    file = io.BytesIO()
+    write_png(file, image)
+    file.seek(0)
+    assert file.read(8) == b"\x89PNG\r\n\x1a\n"
+    chunks = {}
+    while header := file.read(8):
+        length, tag = struct.unpack(">I4s", header)
+        chunks[tag] = file.read(length)
+        assert file.read(4) == struct.pack(">I", zlib.crc32(tag + chunks[tag]))
+    assert struct.unpack(">II", chunks[b"IHDR"][:8]) == (3, 2)
+    assert zlib.decompress(chunks[b"IDAT"]) == b"".join(
+        b"\x00" + row.tobytes() for row in image
+    )
+    assert chunks[b"IEND"] == b""
@@ -0,0 +1,33 @@
+"""Unit tests for module `lib.rng`."""
+
+import numpy as np
+
+from lib.rng import hash_indices, randbelow_indices, splitmix64
+
+
+def test_splitmix64() -> None:
+    """Test the first outputs of SplitMix64 seeded with zero."""
+    gamma = 0x9E3779B97F4A7C15
+    outputs = splitmix64(np.array([0, gamma], dtype=np.uint64))
+    assert outputs.tolist() == [0xE220A8397B1DCDAF, 0x6E789E6AA1B965F4]
+    assert int(splitmix64(-1)) == int(splitmix64(2**64 - 1))
+
+
+def test_hash_indices() -> None:
+    """Test hashing index arrays element-wise and independently."""
+    ix, iy = np.meshgrid(np.arange(5), np.arange(4))
+    hashes = hash_indices(7, ix, iy, 1)
+    assert hashes.shape == (4, 5)
+    assert len(set(hashes.ravel().tolist())) == 20
+    assert int(hash_indices(7, 3, 2, 1)) == hashes[2, 3]
+    assert int(hash_indices(8, 3, 2, 1)) != hashes[2, 3]
+    assert int(hash_indices(7, 2, 3, 1)) != hashes[2, 3]
+
+
+def test_randbelow_indices() -> None:
+    """Test drawing roughly uniform integers below a bound."""
+    values = randbelow_indices(5, 1, np.arange(10000))
+    assert values.dtype == np.intp
+    counts = np.bincount(values, minlength=5)
+    assert len(counts) == 5 and counts.min() > 1800
+    assert randbelow_indices(1, 1, np.arange(10)).tolist() == [0] * 10
@@ -1,8 +1,24 @@
 """Unit tests for module `lib.svg`."""
 
 from sympy import Matrix
+import io
+import numpy as np
+import pytest
 
-from lib.svg import SVGPath, SVGPathStyle, generate_svg
+from lib.svg import (
+    SVGCompoundPath,
+    SVGPath,
+    SVGPathDef,
+    SVGPathStyle,
+    SVGStreamedPath,
+    SVGUse,
+    generate_svg,
+    intern_style,
+    iter_path_data,
+    merge_paths,
+    path_data,
+    write_svg,
+)
 
 
 expected_svg = """\
@@ -27,6 +43,9 @@ expected_svg = """\
 </svg>"""  # noqa: E501
 
 
+expected_path = '<path style="fill:#000000;stroke:#ffffff;stroke-width:1;stroke-linecap:square" d="M -2.0,-1.0 2.0,-1.0 2.0,1.0 -2.0,1.0 z"/>'  # noqa: E501
+
+
 def test_svg_generation() -> None:
     """Test SVG code generation featuring a single rectangular path."""
     svg = generate_svg(
@@ -53,3 +72,323 @@ def test_svg_generation() -> None:
         resolution=(200, 100),
     )
     assert svg == expected_svg
+
+
+def test_array_path() -> None:
+    """Test SVG path serialization of array points."""
+    path = SVGPath(
+        points=np.array([[-2, -1], [2, -1], [2, 1], [-2, 1], [-2, -1]], float),
+        style=SVGPathStyle(
+            fill_color="#000000",
+            stroke_color="#ffffff",
+            stroke_width=1,
+        ),
+    )
+    assert str(path) == expected_path
+
+
+def test_rendered_path() -> None:
+    """Test reusing path data rendered beforehand at the same precision."""
+    path = SVGPath(
+        points=np.array([[0, 0], [1, 0], [1, 1], [0, 0]], float),
+        style=SVGPathStyle(
+            fill_color="#000000",
+            stroke_color="#ffffff",
+            stroke_width=1,
+        ),
+        rendered=(2, "M0,0 h1 v1 z"),
+    )
+    assert path.format(2).endswith(' d="M0,0 h1 v1 z"/>')
+    assert path.format().endswith(' d="M 0.0,0.0 1.0,0.0 1.0,1.0 z"/>')
+
+
+def test_instanced_svg_generation() -> None:
+    """Test that instanced paths are defined once and then used."""
+    style = SVGPathStyle(
+        fill_color="#000000",
+        stroke_color="#ffffff",
+        stroke_width=1,
+    )
+    path = SVGPathDef(
+        id="rect",
+        points=[
+            Matrix([-2, -1]),
+            Matrix([2, -1]),
+            Matrix([2, 1]),
+            Matrix([-2, 1]),
+            Matrix([-2, -1]),
+        ],
+    )
+    svg = generate_svg(
+        author="author",
+        title="title",
+        palette=["#000000", "#ffffff"],
+        background_color="#000000",
+        paths=[
+            SVGUse(path=path, offsets=(0, 0), style=style),
+            SVGUse(path=path, offsets=(4, 2), style=style),
+        ],
+        resolution=(200, 100),
+    )
+    assert svg == expected_svg.replace(
+        expected_path,
+        """\
+<defs>
+<path id="rect" d="M -2.0,-1.0 2.0,-1.0 2.0,1.0 -2.0,1.0 z"/>
+</defs>
+<use href="#rect" x="0.0" y="0.0" style="fill:#000000;stroke:#ffffff;stroke-width:1;stroke-linecap:square"/>
+<use href="#rect" x="4.0" y="2.0" style="fill:#000000;stroke:#ffffff;stroke-width:1;stroke-linecap:square"/>""",  # noqa: E501
+    )
+
+
+def test_streamed_path_def() -> None:
+    """Test that a definition streamed in chunks is written as if given."""
+    points = np.array([[-2, -1], [2, -1], [2, 1], [-2, 1], [-2, -1]], float)
+    style = SVGPathStyle(
+        fill_color="#000000", stroke_color="#ffffff", stroke_width=1
+    )
+
+    def write(path: SVGPathDef) -> str:
+        file = io.StringIO()
+        write_svg(
+            file,
+            author="author",
+            title="title",
+            palette=["#000000", "#ffffff"],
+            background_color="#000000",
+            paths=[SVGUse(path=path, offsets=(0, 0), style=style)],
+            resolution=(200, 100),
+            precision=1,
+        )
+        return file.getvalue()
+
+    streamed = SVGPathDef(
+        id="rect", points_fn=lambda: [points[:2], points[2:]]
+    )
+    assert write(streamed) == write(SVGPathDef(id="rect", points=points))
+    np.testing.assert_array_equal(
+        np.concatenate(list(streamed.iter_points())), points
+    )
+    with pytest.raises(AssertionError):
+        SVGPathDef(id="rect")
+
+
+def test_streaming_svg_writing() -> None:
+    """Test writing paths produced lazily by a generator to a file."""
+    produced = []
+
+    def paths():
+        for offset in range(3):
+            path = SVGPath(
+                points=np.array([[0, 0], [1, 0], [0, 1], [0, 0]], float)
+                + offset,
+                style=SVGPathStyle(
+                    fill_color="#000000",
+                    stroke_color="#ffffff",
+                    stroke_width=1,
+                ),
+            )
+            produced.append(path)
+            yield path
+
+    file = io.StringIO()
+    write_svg(
+        file,
+        author="author",
+        title="title",
+        palette=["#000000", "#ffffff"],
+        background_color="#000000",
+        paths=paths(),
+        resolution=(200, 100),
+    )
+    assert file.getvalue() == (
+        expected_svg.replace(
+            expected_path, "\n".join(str(path) for path in produced)
+        )
+        + "\n"
+    )
+
+
+def test_compact_path_data() -> None:
+    """Test compact relative encoding of path data with rounding."""
+    points = np.array(
+        [[0, 0], [1.004, 0], [1, 2.5], [-0.5, 1.2], [-0.5, 1.2], [0, 0]]
+    )
+    assert path_data(points) == (
+        "M 0.0,0.0 1.004,0.0 1.0,2.5 -0.5,1.2 -0.5,1.2 z"
+    )
+    assert path_data(points, precision=2) == "M0,0 h1 v2.5 l-1.5-1.3 z"
+    assert path_data(points, precision=0) == "M0,0 h1 v2 l-1-1 z"
+    assert path_data(points[:-1], precision=1) == "M0,0 h1 v2.5 l-1.5-1.3"
+
+
+def test_iter_path_data() -> None:
+    """Test encoding path data chunk by chunk as a whole."""
+    points = np.array(
+        [[0, 0], [1.004, 0], [1, 2.5], [-0.5, 1.2], [-0.5, 1.2], [0, 0]]
+    )
+    for precision in (None, 2, 0):
+        for path in (points, points[:-1]):
+            expected = path_data(path, precision)
+            for size in (1, 2, 4, 6):
+                chunks = np.array_split(path, range(size, len(path), size))
+                data = "".join(iter_path_data(chunks, precision))
+                assert data == expected
+        # Paths without points are rejected before any data are yielded
+        for empty_chunks in ([], [points[:0], points[:0]]):
+            pieces = iter_path_data(empty_chunks, precision)
+            with pytest.raises(ValueError):
+                next(pieces)
+
+
+def test_streamed_path() -> None:
+    """Test writing a path whose points are produced in chunks."""
+    style = SVGPathStyle(
+        fill_color="#000000", stroke_color="#ffffff", stroke_width=1
+    )
+    points = [Matrix([-2, -1]), Matrix([2, -1]), Matrix([2, 1])]
+    points += [Matrix([-2, 1]), Matrix([-2, -1])]
+    path = SVGStreamedPath(
+        points_fn=lambda: [points[:2], points[2:]], style=style
+    )
+    assert str(path) == expected_path
+    assert path.format(precision=1, style_class="s0") == (
+        '<path class="s0" d="M-2-1 h4 v2 h-4 z"/>'
+    )
+    file = io.StringIO()
+    write_svg(
+        file,
+        author="author",
+        title="title",
+        palette=["#000000", "#ffffff"],
+        background_color="#000000",
+        paths=[path],
+        resolution=(200, 100),
+    )
+    assert file.getvalue() == expected_svg + "\n"
+
+
+def test_compact_use() -> None:
+    """Test rounding of instance offsets."""
+    use = SVGUse(
+        path=SVGPathDef(id="p", points=[]),
+        offsets=(Matrix([1, 3])[0] / 3, -2),
+        style=SVGPathStyle(
+            fill_color="#000000",
+            stroke_color="#ffffff",
+            stroke_width=1,
+        ),
+    )
+    assert use.format(precision=3).startswith(
+        '<use href="#p" x="0.333" y="-2" '
+    )
+
+
+def test_interned_style() -> None:
+    """Test sharing a single instance per distinct style."""
+    style = intern_style(
+        fill_color="#ffffff", stroke_color="#000000", stroke_width=1
+    )
+    assert style is intern_style(
+        stroke_width=1, stroke_color="#000000", fill_color="#ffffff"
+    )
+    assert style == SVGPathStyle(
+        fill_color="#ffffff", stroke_color="#000000", stroke_width=1
+    )
+    assert style is not intern_style(
+        fill_color="#ffffff", stroke_color="#000000", stroke_width=2
+    )
+    assert str(style) == (
+        "fill:#ffffff;stroke:#000000;stroke-width:1;stroke-linecap:square"
+    )
+
+
+def test_css_class_svg_generation() -> None:
+    """Test styling paths by CSS classes defined in a style block."""
+    styles = [
+        SVGPathStyle(fill_color=color, stroke_color="#000000", stroke_width=1)
+        for color in ("#ffffff", "#000000", "#ffffff")
+    ]
+    svg = generate_svg(
+        author="author",
+        title="title",
+        palette=["#000000", "#ffffff"],
+        background_color="#000000",
+        paths=[
+            SVGPath(points=np.array([[0, 0], [i, 1]]), style=style)
+            for i, style in enumerate(styles)
+        ],
+        resolution=(200, 100),
+        css_classes=True,
+    )
+    assert svg.endswith("""\
+<path class="s0" d="M 0.0,0.0 0.0,1.0"/>
+<path class="s1" d="M 0.0,0.0 1.0,1.0"/>
+<path class="s0" d="M 0.0,0.0 2.0,1.0"/>
+</g>
+<style>
+.s0{fill:#ffffff;stroke:#000000;stroke-width:1;stroke-linecap:square}
+.s1{fill:#000000;stroke:#000000;stroke-width:1;stroke-linecap:square}
+</style>
+</svg>""")
+
+
+def test_pattern_svg_generation() -> None:
+    """Test filling the image with a tile of paths as a pattern."""
+    svg = generate_svg(
+        author="author",
+        title="title",
+        palette=["#000000", "#ffffff"],
+        background_color="#000000",
+        paths=[
+            SVGPath(
+                points=np.array(
+                    [[-2, -1], [2, -1], [2, 1], [-2, 1], [-2, -1]]
+                ),
+                style=SVGPathStyle(
+                    fill_color="#000000",
+                    stroke_color="#ffffff",
+                    stroke_width=1,
+                ),
+            )
+        ],
+        resolution=(200, 100),
+        tile=(4, 2),
+    )
+    header, _, rest = expected_svg.partition("<path")
+    assert svg == header + (
+        '<pattern id="tile" width="4" height="2" '
+        'patternUnits="userSpaceOnUse">\n'
+        + expected_path
+        + '\n</pattern>\n<rect width="200" height="100" fill="url(#tile)"/>\n'
+        + rest.partition("\n")[2]
+    )
+
+
+def test_merge_paths() -> None:
+    """Test merging paths of the same style into compound paths."""
+    styles = [
+        intern_style(fill_color=color, stroke_color="#000000", stroke_width=1)
+        for color in ("#ffffff", "#000000")
+    ]
+    definition = SVGPathDef(id="a", points=np.array([[0, 0], [1, 1]]))
+    use = SVGUse(path=definition, offsets=(0, 0), style=styles[0])
+    paths = [
+        SVGPath(points=np.array([[i, 0], [i, 1], [i, 0]]), style=styles[i % 2])
+        for i in range(4)
+    ]
+    merged = merge_paths([paths[0], use, *paths[1:]])
+    assert [type(path) for path in merged] == [
+        SVGCompoundPath,
+        SVGUse,
+        SVGCompoundPath,
+    ]
+    assert merged[1] is use
+    assert [path.style for path in merged] == [styles[0], styles[0], styles[1]]
+    assert merged[0].format(precision=0) == (
+        '<path style="fill:#ffffff;stroke:#000000;stroke-width:1;'
+        'stroke-linecap:square" d="M0,0 v1 z M2,0 v1 z"/>'
+    )
+    assert merged[2].format(style_class="s1") == (
+        '<path class="s1" d="M 1.0,0.0 1.0,1.0 z M 3.0,0.0 3.0,1.0 z"/>'
+    )
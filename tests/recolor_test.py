@@ -1,6 +1,20 @@
 """Unit tests for the recolor script functions."""
 
-from recolor import extract_palette, replace_palette
+from pathlib import Path
+import io
+import numpy as np
+import pytest
+
+from lib.svg import SVGPath, SVGPathStyle, generate_svg
+from recolor import (
+    ColorIndex,
+    extract_palette,
+    load_color_index,
+    recolor_directory,
+    recolor_file,
+    recolor_variants,
+    replace_palette,
+)
 
 
 INPUT_SVG = """\
@@ -46,3 +60,111 @@ def test_replace_palette() -> None:
         new=["#ffffff", "#777777", "#000000"],
     )
     assert obtained == OUTPUT_SVG
+
+
+def test_recolor_file(tmp_path: Path) -> None:
+    """Test streaming palette replacement of a memory-mapped file."""
+    input_path = tmp_path / "input.svg"
+    input_path.write_text(INPUT_SVG)
+    output_file = io.BytesIO()
+    recolor_file(input_path, output_file, ["#ffffff", "#777777", "#000000"])
+    assert output_file.getvalue().decode() == OUTPUT_SVG
+
+
+def test_recolor_directory(tmp_path: Path) -> None:
+    """Test palette replacement of all files in a directory."""
+    input_dir = tmp_path / "input"
+    input_dir.mkdir()
+    for name in ("a.svg", "b.svg"):
+        (input_dir / name).write_text(INPUT_SVG)
+    (input_dir / "c.txt").write_text(INPUT_SVG)
+    output_dir = tmp_path / "output"
+    recolor_directory(input_dir, output_dir, ["#ffffff", "#777777", "#000000"])
+    assert sorted(path.name for path in output_dir.iterdir()) == [
+        "a.svg",
+        "b.svg",
+    ]
+    assert (output_dir / "a.svg").read_text() == OUTPUT_SVG
+    assert (output_dir / "b.svg").read_text() == OUTPUT_SVG
+    # Recoloring a directory into itself would truncate its files
+    with pytest.raises(ValueError):
+        recolor_directory(
+            input_dir, input_dir / ".." / "input", ["#ffffff", "#777777"]
+        )
+    assert (input_dir / "a.svg").read_text() == INPUT_SVG
+
+
+def test_color_index() -> None:
+    """Test indexing the byte offsets of palette colors."""
+    svg = INPUT_SVG.encode()
+    index = ColorIndex.scan(svg)
+    assert index.palette == ["#000000", "#777777", "#ffffff"]
+    assert [svg[i:][:7] for i in index.offsets] == [
+        b"#000000",
+        b"#777777",
+        b"#ffffff",
+        b"#ffffff",
+    ]
+    assert list(index.colors) == [0, 1, 2, 2]
+
+
+def test_recolor_variants(tmp_path: Path) -> None:
+    """Test writing several palette variants reusing a sidecar index."""
+    input_path = tmp_path / "input.svg"
+    input_path.write_text(INPUT_SVG)
+    outputs = [io.BytesIO(), io.BytesIO()]
+    recolor_variants(
+        input_path,
+        [
+            (outputs[0], ["#ffffff", "#777777", "#000000"]),
+            (outputs[1], ["#000000", "#777777", "#ffffff"]),
+        ],
+        sidecar=True,
+    )
+    assert outputs[0].getvalue().decode() == OUTPUT_SVG
+    assert outputs[1].getvalue().decode() == INPUT_SVG
+    index_path = tmp_path / "input.svg.colorindex"
+    assert index_path.exists()
+    # The sidecar index is reused as long as the SVG is unchanged
+    index = load_color_index(input_path, b"", sidecar=True)
+    assert list(index.offsets) == list(
+        ColorIndex.scan(INPUT_SVG.encode()).offsets
+    )
+    # A stale index is rebuilt
+    input_path.write_text(OUTPUT_SVG + "\n")
+    output_file = io.BytesIO()
+    recolor_file(input_path, output_file, ["#ffffff"] * 3, sidecar=True)
+    assert "#000000" not in output_file.getvalue().decode()
+
+
+def test_recolor_css_classes(tmp_path: Path) -> None:
+    """Test recoloring only the style block of SVG styled by CSS classes."""
+    old = ["#000000", "#777777", "#ffffff"]
+    new = ["#ffffff", "#000000", "#777777"]
+    svg = generate_svg(
+        author="author",
+        title="title",
+        palette=old,
+        background_color="#000000",
+        paths=[
+            SVGPath(
+                points=np.array([[0, 0], [i, 1]]),
+                style=SVGPathStyle(
+                    fill_color=old[i % 3], stroke_color=old[0], stroke_width=1
+                ),
+            )
+            for i in range(10)
+        ],
+        resolution=(200, 100),
+        css_classes=True,
+    )
+    input_path = tmp_path / "input.svg"
+    input_path.write_text(svg + "\n")
+    index = ColorIndex.scan(svg.encode() + b"\n")
+    # Palette tag, background and style block
+    assert len(index.offsets) == 3 + 1 + 2 * 3
+    output_file = io.BytesIO()
+    recolor_file(input_path, output_file, new)
+    assert output_file.getvalue().decode() == (
+        replace_palette(svg, old, new) + "\n"
+    )